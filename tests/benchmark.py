@@ -0,0 +1,275 @@
+"""
+Offline benchmarks of the `pipeline.get_*_data` and `transform.wrangle_*` functions, at several synthetic scales
+(number of matches/players). Pages are served by a local stand-in for understat.com (see `standin_server.py`),
+so no network access is needed. Results are stored as JSON files in the 'benchmark_results' folder, and can be
+compared against a baseline run.
+Usage examples (run inside the `tests` directory):
+    - python benchmark.py --name before
+    - python benchmark.py --scales 1 100 --baseline benchmark_results/before.json
+    - python benchmark.py --recordings recordings   (serves the pages recorded via `--record` where available)
+    - python benchmark.py --record recordings       (records real pages of the default entities; needs network)
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+TESTS_FOLDERPATH = os.path.dirname(os.path.abspath(__file__))
+SOURCE_FOLDERPATH = os.path.join(os.path.dirname(TESTS_FOLDERPATH), 'understat_wrangler')
+sys.path.insert(0, SOURCE_FOLDERPATH)
+
+from client import configure_client, get_client
+import pipeline
+import standin_server
+import transform
+import pandas as pd
+
+SCALES = [1, 100, 10000]
+# Pages of single matches/players keep realistic sizes in the batch benchmarks, wherein the number of entities scales
+BATCH_PAGE_SCALES = {'match': 24, 'player': 100}
+REGRESSION_THRESHOLD = 1.25
+MIN_REGRESSION_SECONDS = 0.005
+LEAGUE_NAME, SEASON, TEAM_NAME, MATCH_ID, PLAYER_ID = 'EPL', 2020, 'Team 0', '10000', '1000'
+
+
+def get_pipeline_benchmarks():
+    """ Returns dictionary of benchmarks of the pipeline functions, that fetch pages of the given scale """
+    return {
+        'pipeline.get_league_fixtures_data': lambda scale: pipeline.get_league_fixtures_data(league_name=LEAGUE_NAME,
+                                                                                           season=SEASON),
+        'pipeline.get_league_players_data': lambda scale: pipeline.get_league_players_data(league_name=LEAGUE_NAME,
+                                                                                         season=SEASON),
+        'pipeline.get_league_results_data': lambda scale: pipeline.get_league_results_data(league_name=LEAGUE_NAME,
+                                                                                         season=SEASON),
+        'pipeline.get_match_players_data': lambda scale: pipeline.get_match_players_data(match_id=MATCH_ID),
+        'pipeline.get_match_shots_data': lambda scale: pipeline.get_match_shots_data(match_id=MATCH_ID),
+        'pipeline.get_player_grouped_stats_data': lambda scale: pipeline.get_player_grouped_stats_data(player_id=PLAYER_ID),
+        'pipeline.get_player_matches_data': lambda scale: pipeline.get_player_matches_data(player_id=PLAYER_ID),
+        'pipeline.get_player_shots_data': lambda scale: pipeline.get_player_shots_data(player_id=PLAYER_ID),
+        'pipeline.get_player_stats_data': lambda scale: pipeline.get_player_stats_data(player_id=PLAYER_ID),
+        'pipeline.get_stats_data': lambda scale: pipeline.get_stats_data(),
+        'pipeline.get_team_fixtures_data': lambda scale: pipeline.get_team_fixtures_data(team_name=TEAM_NAME,
+                                                                                       season=SEASON),
+        'pipeline.get_team_players_data': lambda scale: pipeline.get_team_players_data(team_name=TEAM_NAME,
+                                                                                     season=SEASON),
+        'pipeline.get_team_results_data': lambda scale: pipeline.get_team_results_data(team_name=TEAM_NAME,
+                                                                                     season=SEASON),
+        'pipeline.get_team_stats_data': lambda scale: pipeline.get_team_stats_data(team_name=TEAM_NAME, season=SEASON),
+        'pipeline.get_teams_data': lambda scale: pipeline.get_teams_data(league_name=LEAGUE_NAME, season=SEASON),
+    }
+
+
+def get_batch_benchmarks(max_concurrency):
+    """ Returns dictionary of benchmarks of the pipeline's batch functions, that fetch as many entities as the scale """
+    def get_match_ids(scale):
+        return [str(10000 + index) for index in range(scale)]
+
+    def get_player_ids(scale):
+        return [str(1000 + index) for index in range(scale)]
+
+    return {
+        'pipeline.get_league_season_matches_data': lambda scale: pipeline.get_league_season_matches_data(
+            league_name=LEAGUE_NAME, season=SEASON, max_concurrency=max_concurrency),
+        'pipeline.get_match_players_batch_data': lambda scale: pipeline.get_match_players_batch_data(
+            match_ids=get_match_ids(scale), max_concurrency=max_concurrency),
+        'pipeline.get_match_shots_batch_data': lambda scale: pipeline.get_match_shots_batch_data(
+            match_ids=get_match_ids(scale), max_concurrency=max_concurrency),
+        'pipeline.get_player_grouped_stats_batch_data': lambda scale: pipeline.get_player_grouped_stats_batch_data(
+            player_ids=get_player_ids(scale), max_concurrency=max_concurrency),
+        'pipeline.get_player_stats_batch_data': lambda scale: pipeline.get_player_stats_batch_data(
+            player_ids=get_player_ids(scale), max_concurrency=max_concurrency),
+    }
+
+
+def get_min_max_records(rng):
+    """ Returns player's max, min, avg stats in the format returned by the 'player_stats' endpoint """
+    return [dict(stats, position=position)
+            for position, stats in standin_server.get_min_max_player_stats(rng=rng).items()]
+
+
+def get_transform_benchmarks(scale):
+    """
+    Returns dictionary of benchmarks of the transform functions, on synthetic decoded payloads of the given scale.
+    Values are tuples of (function, function that builds its keyword arguments), so that the payloads are only
+    built for the benchmarks that are run, and outside of the timings.
+    """
+    rng = random.Random(scale)
+    match_ids = [10000 + index for index in range(scale)]
+    player_ids = [str(1000 + index) for index in range(scale)]
+    return {
+        'transform.convert_json_to_dataframe': (transform.convert_json_to_dataframe, lambda: {
+            'json_data': standin_server.get_players_data(num_players=scale, rng=rng)}),
+        'transform.wrangle_list_to_dataframe': (transform.wrangle_list_to_dataframe, lambda: {
+            'list_data': standin_server.get_player_matches(num_matches=scale, rng=rng)}),
+        'transform.wrangle_results': (transform.wrangle_results, lambda: {
+            'dataframe': transform.convert_json_to_dataframe(
+                json_data=standin_server.get_dates_data(num_matches=scale, rng=rng, num_fixtures=0))}),
+        'transform.wrangle_upcoming_fixtures': (transform.wrangle_upcoming_fixtures, lambda: {
+            'dataframe': transform.convert_json_to_dataframe(
+                json_data=standin_server.get_dates_data(num_matches=0, rng=rng, num_fixtures=scale))}),
+        'transform.wrangle_match_players': (transform.wrangle_match_players, lambda: {
+            'dict_data': standin_server.get_rosters(match_id=10000, rng=rng, num_players=max(scale, 2))}),
+        'transform.wrangle_match_players_batch': (transform.wrangle_match_players_batch, lambda: {
+            'dict_data_by_match': {str(match_id): standin_server.get_rosters(match_id=match_id, rng=rng)
+                                   for match_id in match_ids}}),
+        'transform.wrangle_match_shots': (transform.wrangle_match_shots, lambda: {
+            'dict_data': standin_server.get_match_shots(match_id=10000, num_shots=max(scale, 2), rng=rng)}),
+        'transform.wrangle_match_shots_batch': (transform.wrangle_match_shots_batch, lambda: {
+            'dict_data_by_match': {str(match_id): standin_server.get_match_shots(match_id=match_id, num_shots=24, rng=rng)
+                                   for match_id in match_ids}}),
+        'transform.wrangle_max_min_avg': (transform.wrangle_max_min_avg, lambda: {
+            'dataframe': transform.wrangle_list_to_dataframe(list_data=get_min_max_records(rng=rng))}),
+        'transform.wrangle_player_stats_batch': (transform.wrangle_player_stats_batch, lambda: {
+            'dict_data_by_player': {player_id: get_min_max_records(rng=rng) for player_id in player_ids}}),
+        'transform.wrangle_player_grouped_stats': (transform.wrangle_player_grouped_stats, lambda: {
+            'dict_player_grouped_stats': standin_server.get_grouped_stats(rng=rng)}),
+        'transform.wrangle_player_grouped_stats_batch': (transform.wrangle_player_grouped_stats_batch, lambda: {
+            'dict_data_by_player': {player_id: standin_server.get_grouped_stats(rng=rng) for player_id in player_ids}}),
+        'transform.wrangle_team_stats': (transform.wrangle_team_stats, lambda: {
+            'dict_raw_team_stats': standin_server.get_team_statistics(rng=rng), 'team_name': TEAM_NAME,
+            'season': SEASON}),
+    }
+
+
+def get_num_rows(data):
+    """ Returns total number of rows in the given DataFrame, or in the DataFrames of a dictionary/tuple """
+    if isinstance(data, dict):
+        return sum(get_num_rows(value) for value in data.values())
+    if isinstance(data, (list, tuple)):
+        return sum(get_num_rows(value) for value in data)
+    return len(data)
+
+
+def time_function(func, repeats, max_seconds):
+    """
+    Returns tuple of (seconds, result) of the fastest of the given number of calls of the function.
+    The calls are preceded by an untimed warm-up call (which has the stand-in server render its pages), and
+    no more calls are made once a call takes longer than `max_seconds`.
+    """
+    func()
+    best_seconds, result = None, None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        seconds = time.perf_counter() - start
+        best_seconds = seconds if best_seconds is None else min(best_seconds, seconds)
+        if seconds > max_seconds:
+            break
+    return best_seconds, result
+
+
+def run_benchmarks(scales, repeats=3, max_seconds=5, max_concurrency=20, recordings_folderpath=None, pattern=None):
+    """ Runs all the benchmarks (whose names contain the pattern, if any), and returns list of results """
+    server = standin_server.StandInServer(recordings_folderpath=recordings_folderpath)
+    base_url = server.start()
+    # Neither cached nor rate limited; and the pages kept in memory are cleared before every call (see
+    # `fetch_afresh`), so that every call fetches its pages, of the current scale, from the stand-in server
+    client = configure_client(base_url=base_url)
+    results = []
+
+    def record(benchmark, scale, func):
+        if pattern is not None and pattern not in benchmark:
+            return None
+
+        def fetch_afresh():
+            client.pages.clear()
+            return func()
+
+        seconds, data = time_function(func=fetch_afresh, repeats=repeats, max_seconds=max_seconds)
+        results.append({'benchmark': benchmark, 'scale': scale, 'seconds': seconds, 'rows': get_num_rows(data)})
+        print("{:<50} scale={:<6} {:>10.4f}s  rows={}".format(benchmark, scale, seconds, results[-1]['rows']))
+        return None
+
+    for scale in scales:
+        server.scale, server.page_scales = scale, dict()
+        for benchmark, func in get_pipeline_benchmarks().items():
+            record(benchmark=benchmark, scale=scale, func=lambda: func(scale))
+        server.page_scales = BATCH_PAGE_SCALES
+        for benchmark, func in get_batch_benchmarks(max_concurrency=max_concurrency).items():
+            record(benchmark=benchmark, scale=scale, func=lambda: func(scale))
+        for benchmark, (func, get_kwargs) in get_transform_benchmarks(scale=scale).items():
+            if pattern is None or pattern in benchmark:
+                kwargs = get_kwargs()
+                record(benchmark=benchmark, scale=scale, func=lambda: func(**kwargs))
+    server.stop()
+    return results
+
+
+def save_results(results, name, folderpath=os.path.join(TESTS_FOLDERPATH, 'benchmark_results')):
+    """ Stores results (with details of the run) as a JSON file, and returns its path """
+    os.makedirs(folderpath, exist_ok=True)
+    filepath = os.path.join(folderpath, "{}.json".format(name))
+    run = {
+        'name': name,
+        'created_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python_version': platform.python_version(),
+        'pandas_version': pd.__version__,
+        'results': results,
+    }
+    with open(filepath, 'w') as file:
+        json.dump(run, file, indent=2)
+    return filepath
+
+
+def compare_results(results, baseline_filepath, threshold=REGRESSION_THRESHOLD):
+    """ Prints comparison of the results against a baseline run, and returns number of regressions """
+    with open(baseline_filepath) as file:
+        baseline = json.load(file)
+    baseline_seconds = {(result['benchmark'], result['scale']): result['seconds'] for result in baseline['results']}
+    num_regressions = 0
+    print("\nComparison against baseline: '{}' ({})".format(baseline['name'], baseline['created_at']))
+    for result in results:
+        key = (result['benchmark'], result['scale'])
+        if key not in baseline_seconds:
+            continue
+        ratio = result['seconds'] / baseline_seconds[key]
+        is_regression = ratio > threshold and result['seconds'] - baseline_seconds[key] > MIN_REGRESSION_SECONDS
+        num_regressions += is_regression
+        print("{:<50} scale={:<6} {:>10.4f}s -> {:>10.4f}s  x{:.2f}{}".format(
+            result['benchmark'], result['scale'], baseline_seconds[key], result['seconds'], ratio,
+            '  REGRESSION' if is_regression else ''))
+    print("{} regression(s)".format(num_regressions))
+    return num_regressions
+
+
+def record_default_pages(recordings_folderpath):
+    """ Records real pages of the entities used in the benchmarks (the IDs must be valid on Understat) """
+    paths = ['/', '/league/{}/{}'.format(LEAGUE_NAME, SEASON), '/team/{}/{}'.format(TEAM_NAME.replace(' ', '_'), SEASON),
+             '/match/{}'.format(MATCH_ID), '/player/{}'.format(PLAYER_ID)]
+    standin_server.record_pages(paths=paths, recordings_folderpath=recordings_folderpath)
+    return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmarks of the pipeline and transform functions")
+    parser.add_argument('--scales', type=int, nargs='+', default=SCALES, help="Numbers of matches/players")
+    parser.add_argument('--repeats', type=int, default=3, help="Calls per benchmark (the fastest is kept)")
+    parser.add_argument('--max-concurrency', type=int, default=20, help="Concurrency of the batch benchmarks")
+    parser.add_argument('--filter', default=None, help="Only runs benchmarks whose names contain this")
+    parser.add_argument('--name', default=datetime.datetime.now().strftime("%Y_%m_%d_%H_%M_%S"),
+                        help="Name of the stored results")
+    parser.add_argument('--baseline', default=None, help="Path of results of a baseline run, to compare against")
+    parser.add_argument('--recordings', default=None, help="Folder of recorded pages, served instead of synthetic ones")
+    parser.add_argument('--record', default=None, help="Records real pages into this folder (needs network), and exits")
+    args = parser.parse_args()
+
+    if args.record:
+        record_default_pages(recordings_folderpath=args.record)
+        sys.exit(0)
+    recordings_folderpath = os.path.abspath(args.recordings) if args.recordings else None
+    baseline_filepath = os.path.abspath(args.baseline) if args.baseline else None
+    # The Pickle files of IDs are read from the source folder
+    os.chdir(SOURCE_FOLDERPATH)
+    results = run_benchmarks(scales=args.scales,
+                             repeats=args.repeats,
+                             max_concurrency=args.max_concurrency,
+                             recordings_folderpath=recordings_folderpath,
+                             pattern=args.filter)
+    print("\nResults stored in: '{}'".format(save_results(results=results, name=args.name)))
+    if baseline_filepath:
+        num_regressions = compare_results(results=results, baseline_filepath=baseline_filepath)
+        sys.exit(1 if num_regressions else 0)
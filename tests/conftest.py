@@ -0,0 +1,47 @@
+"""
+Fixtures of the tests, which run offline against the local stand-in for Understat (see `standin_server.py`)
+"""
+import os
+import sys
+
+TESTS_FOLDERPATH = os.path.dirname(os.path.abspath(__file__))
+SOURCE_FOLDERPATH = os.path.join(os.path.dirname(TESTS_FOLDERPATH), 'understat_wrangler')
+sys.path.insert(0, SOURCE_FOLDERPATH)
+
+from client import configure_client
+from ratelimit import AdaptiveRateLimiter
+import pytest
+import standin_server
+
+
+@pytest.fixture(autouse=True)
+def source_folder(monkeypatch):
+    # The ID registries are loaded from the Pickle files in the source folder
+    monkeypatch.chdir(SOURCE_FOLDERPATH)
+    return SOURCE_FOLDERPATH
+
+
+@pytest.fixture(scope='session')
+def server():
+    server = standin_server.StandInServer()
+    server.base_url = server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture(autouse=True)
+def client(server):
+    """
+    Process-wide client, pointing at the stand-in server. It has neither a response cache nor a request rate,
+    so that every page is fetched from the server
+    """
+    return configure_client(base_url=server.base_url, rate_limiter=AdaptiveRateLimiter(requests_per_second=None))
+
+
+@pytest.fixture
+def standin(server, client):
+    """ Stand-in server with a scale of 1, and its request count reset """
+    server.scale = 1
+    server.page_scales = dict()
+    server.num_requests = 0
+    return server
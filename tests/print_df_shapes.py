@@ -16,7 +16,7 @@ if __name__ == "__main__":
     filenames = get_filenames()
     for index, filename in enumerate(filenames):
         try:
-            df = pd.read_csv(filename, encoding='latin-1')
+            df = pd.read_csv(filename)
             print(f"Shape: {df.shape} --> File #{index+1}: '{filename}'")
         except pd.errors.EmptyDataError:
             print(f"EMPTY --> File #{index+1}: '{filename}'")
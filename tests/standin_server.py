@@ -0,0 +1,290 @@
+"""
+Local stand-in for understat.com, that serves pages with recorded or synthetic payloads for every endpoint.
+Used by `benchmark.py`, so that benchmarks run without network access.
+"""
+import asyncio
+import json
+import os
+import random
+import socket
+import threading
+from aiohttp import web
+
+LEAGUE_NAMES = ['EPL', 'La_liga', 'Bundesliga', 'Serie_A', 'Ligue_1']
+POSITIONS = ['FW', 'AMC', 'MC', 'DC', 'GK', 'Sub']
+SITUATIONS = ['OpenPlay', 'FromCorner', 'SetPiece', 'DirectFreekick', 'Penalty']
+SHOT_TYPES = ['RightFoot', 'LeftFoot', 'Head', 'OtherBodyPart']
+SHOT_RESULTS = ['Goal', 'SavedShot', 'MissedShots', 'BlockedShot', 'ShotOnPost']
+NUM_TEAMS = 20
+
+
+def get_team(team_index):
+    return {'id': str(100 + team_index), 'title': "Team {}".format(team_index), 'short_title': "T{}".format(team_index)}
+
+
+def get_dates_data(num_matches, rng, team_index=None, num_fixtures=10):
+    """ Returns datesData of a league (or of a team, if team_index is given) with the given number of matches """
+    dates_data = []
+    for index in range(num_matches + num_fixtures):
+        is_result = index < num_matches
+        h, a = index % NUM_TEAMS, (index + 1 + index // NUM_TEAMS) % NUM_TEAMS
+        if a == h:
+            a = (a + 1) % NUM_TEAMS
+        if team_index is not None:
+            h, a = (team_index, a) if index % 2 == 0 else (a, team_index)
+        match = {
+            'id': str(10000 + index),
+            'isResult': is_result,
+            'h': get_team(h),
+            'a': get_team(a),
+            'goals': {'h': str(rng.randint(0, 4)) if is_result else None,
+                      'a': str(rng.randint(0, 3)) if is_result else None},
+            'xG': {'h': "{:.5f}".format(rng.random() * 3) if is_result else None,
+                   'a': "{:.5f}".format(rng.random() * 3) if is_result else None},
+            'datetime': "{}-{:02d}-{:02d} {:02d}:30:00".format(2020 + index // 336, 1 + index // 28 % 12,
+                                                              1 + index % 28, 12 + index % 9),
+        }
+        if is_result:
+            match['forecast'] = {'w': "{:.4f}".format(rng.random() / 2), 'd': "{:.4f}".format(rng.random() / 4),
+                                 'l': "{:.4f}".format(rng.random() / 4)}
+        if team_index is not None:
+            match['side'] = 'h' if index % 2 == 0 else 'a'
+            if is_result:
+                match['result'] = 'wdl'[index % 3]
+        dates_data.append(match)
+    return dates_data
+
+
+def get_players_data(num_players, rng):
+    return [{'id': str(1000 + index), 'player_name': "Player {}".format(index), 'games': str(rng.randint(1, 38)),
+             'time': str(rng.randint(1, 3420)), 'goals': str(rng.randint(0, 30)), 'xG': str(rng.random() * 25),
+             'assists': str(rng.randint(0, 15)), 'xA': str(rng.random() * 12), 'shots': str(rng.randint(0, 120)),
+             'key_passes': str(rng.randint(0, 90)), 'yellow_cards': str(rng.randint(0, 10)),
+             'red_cards': str(rng.randint(0, 2)), 'position': rng.choice(['F S', 'M S', 'D S', 'GK']),
+             'team_title': "Team {}".format(index % NUM_TEAMS), 'npg': str(rng.randint(0, 25)),
+             'npxG': str(rng.random() * 20), 'xGChain': str(rng.random() * 30), 'xGBuildup': str(rng.random() * 15)}
+            for index in range(num_players)]
+
+
+def get_shot(index, rng, match_id, h_a):
+    return {'id': str(100000 + index), 'minute': str(rng.randint(0, 95)), 'result': rng.choice(SHOT_RESULTS),
+            'X': str(rng.uniform(0.6, 1)), 'Y': str(rng.uniform(0.2, 0.8)), 'xG': str(rng.random() / 2),
+            'player': "Player {}".format(index % 40), 'h_a': h_a, 'player_id': str(1000 + index % 40),
+            'situation': rng.choice(SITUATIONS), 'season': '2020', 'shotType': rng.choice(SHOT_TYPES),
+            'match_id': str(match_id), 'h_team': 'Team 0', 'a_team': 'Team 1', 'h_goals': '2', 'a_goals': '1',
+            'date': '2020-09-18 18:30:00', 'player_assisted': None, 'lastAction': 'Pass'}
+
+
+def get_match_shots(match_id, num_shots, rng):
+    return {'h': [get_shot(index, rng, match_id, 'h') for index in range(0, num_shots, 2)],
+            'a': [get_shot(index, rng, match_id, 'a') for index in range(1, num_shots, 2)]}
+
+
+def get_rosters(match_id, rng, num_players=28):
+    rosters = {'h': {}, 'a': {}}
+    for index in range(num_players):
+        h_a = 'h' if index < num_players // 2 else 'a'
+        rosters[h_a][str(match_id * 100 + index)] = {
+            'id': str(match_id * 100 + index), 'goals': str(rng.randint(0, 1)), 'own_goals': '0',
+            'shots': str(rng.randint(0, 5)), 'xG': str(rng.random()), 'time': str(rng.randint(1, 90)),
+            'player_id': str(1000 + index), 'team_id': '100' if h_a == 'h' else '101',
+            'position': rng.choice(POSITIONS), 'player': "Player {}".format(index), 'h_a': h_a,
+            'yellow_card': '0', 'red_card': '0', 'roster_in': '0', 'roster_out': '0',
+            'key_passes': str(rng.randint(0, 4)), 'assists': '0', 'xA': str(rng.random() / 2),
+            'xGChain': str(rng.random()), 'xGBuildup': str(rng.random() / 2), 'positionOrder': str(index % 17)}
+    return rosters
+
+
+def get_player_matches(num_matches, rng):
+    return [{'goals': str(rng.randint(0, 2)), 'shots': str(rng.randint(0, 6)), 'xG': str(rng.random()),
+             'time': str(rng.randint(1, 90)), 'position': rng.choice(POSITIONS), 'h_team': 'Team 0',
+             'a_team': 'Team 1', 'h_goals': '1', 'a_goals': '2',
+             'date': "{}-{:02d}-{:02d}".format(2014 + index // 336, 1 + index // 28 % 12, 1 + index % 28),
+             'id': str(10000 + index), 'season': str(2014 + index // 336), 'roster_id': str(index),
+             'xA': str(rng.random() / 2), 'assists': '0', 'key_passes': '1', 'npg': '0', 'npxG': str(rng.random()),
+             'xGChain': str(rng.random()), 'xGBuildup': str(rng.random() / 2)} for index in range(num_matches)]
+
+
+def get_min_max_player_stats(rng):
+    stats = ['goals', 'xG', 'shots', 'assists', 'xA', 'key_passes', 'xGChain', 'xGBuildup']
+    return {position: {stat: {'min': str(rng.random() / 10), 'max': str(rng.random()), 'avg': str(rng.random() / 2)}
+                       for stat in stats} for position in POSITIONS}
+
+
+def get_grouped_stats(rng, seasons=range(2014, 2021)):
+    totals = ['shots', 'goals', 'xG', 'assists', 'key_passes', 'xA', 'npg', 'npxG', 'time']
+    grouped_stats = {'season': [dict({total: str(rng.randint(1, 50)) for total in totals}, games='30', yellow='2',
+                                     red='0', xGChain='10.5', xGBuildup='4.2', position='FW', team='Team 0',
+                                     season=str(season)) for season in reversed(seasons)]}
+    groups = {'position': POSITIONS, 'situation': SITUATIONS, 'shotZones': ['shotOboxTotal', 'shotPenaltyArea',
+                                                                           'shotSixYardBox'],
+              'shotTypes': SHOT_TYPES}
+    for group, keys in groups.items():
+        grouped_stats[group] = {str(season): {key: dict({total: str(rng.randint(0, 20)) for total in totals},
+                                                        season=str(season), **{group: key}) for key in keys}
+                                for season in seasons}
+    return grouped_stats
+
+
+def get_team_statistics(rng):
+    def get_block(keys, with_time=False):
+        block = {}
+        for key in keys:
+            stats = {'shots': rng.randint(1, 300), 'goals': rng.randint(0, 40), 'xG': rng.random() * 40,
+                     'against': {'shots': rng.randint(1, 300), 'goals': rng.randint(0, 40), 'xG': rng.random() * 40}}
+            if with_time:
+                stats['stat'] = key
+                stats['time'] = rng.randint(1, 3000)
+            block[key] = stats
+        return block
+    return {'situation': get_block(SITUATIONS), 'formation': get_block(['4-2-3-1', '4-3-3', '3-5-2'], True),
+            'gameState': get_block(['Goal diff 0', 'Goal diff +1', 'Goal diff -1'], True),
+            'timing': get_block(['1-15', '16-30', '31-45', '46-60', '61-75', '76+'], True),
+            'shotZone': get_block(['shotOboxTotal', 'shotPenaltyArea', 'shotSixYardBox']),
+            'attackSpeed': get_block(['Normal', 'Standard', 'Slow', 'Fast']), 'result': get_block(SHOT_RESULTS)}
+
+
+def get_stat_data(rng):
+    return [{'league_id': str(1 + index % 5), 'league': LEAGUE_NAMES[index % 5].replace('_', ' '),
+             'h': str(1 + rng.random()), 'a': str(1 + rng.random()), 'hxg': str(1 + rng.random()),
+             'axg': str(1 + rng.random()), 'year': str(2014 + index // 60), 'month': str(1 + index // 5 % 12),
+             'matches': str(rng.randint(20, 40))} for index in range(420)]
+
+
+def encode_data(data):
+    """ Encodes data the way Understat embeds it in its pages (JSON, with special characters hex-escaped) """
+    text = json.dumps(data)
+    escaped = ''.join(char if char.isalnum() or char in ' .,:-_{}[]' else ''.join('\\x{:02x}'.format(byte)
+                                                                                   for byte in char.encode('utf-8'))
+                      for char in text)
+    return escaped
+
+
+def get_page(**dict_data):
+    scripts = ''.join("<script>\n\tvar {} = JSON.parse('{}');\n</script>".format(data_type, encode_data(data))
+                      for data_type, data in dict_data.items())
+    return "<html><head></head><body>{}</body></html>".format(scripts)
+
+
+def get_synthetic_page(path, scale):
+    """
+    Returns synthetic HTML page of the given Understat path (eg: '/league/EPL/2020'), wherein the number of
+    matches/players/shots in the payloads is the given scale. Payloads are the same for the same path and scale.
+    """
+    parts = [part for part in path.split('/') if part]
+    rng = random.Random("{}:{}".format(path, scale))
+    if not parts:
+        return get_page(statData=get_stat_data(rng))
+    if parts[0] == 'league':
+        teams_data = {str(100 + index): dict(get_team(index), history=[]) for index in range(NUM_TEAMS)}
+        return get_page(teamsData=teams_data, datesData=get_dates_data(num_matches=scale, rng=rng),
+                        playersData=get_players_data(num_players=scale, rng=rng))
+    if parts[0] == 'team':
+        return get_page(datesData=get_dates_data(num_matches=scale, rng=rng, team_index=0),
+                        statisticsData=get_team_statistics(rng), playersData=get_players_data(num_players=scale, rng=rng))
+    if parts[0] == 'match':
+        match_id = int(parts[1])
+        return get_page(rostersData=get_rosters(match_id=match_id, rng=rng),
+                        shotsData=get_match_shots(match_id=match_id, num_shots=max(scale, 2), rng=rng))
+    if parts[0] == 'player':
+        list_of_shots = [get_shot(index, rng, 10000 + index // 3, 'h') for index in range(scale)]
+        return get_page(groupsData=get_grouped_stats(rng), matchesData=get_player_matches(num_matches=scale, rng=rng),
+                        shotsData=list_of_shots, minMaxPlayerStats=get_min_max_player_stats(rng))
+    return None
+
+
+def get_recorded_filename(path):
+    """ Returns name of the file that a page of the given Understat path is recorded in """
+    return (path.strip('/').replace('/', '_') or 'index') + '.html'
+
+
+class StandInServer:
+    """
+    Local HTTP stand-in for understat.com, running in a background thread.
+    Pages are read from the recordings folder (if any, and if recorded), and are generated synthetically otherwise.
+    Parameters:
+        - scale (int): Number of matches/players/shots in the synthetic payloads. Can be changed while running. Default: 1
+        - page_scales (dict): Scales that override `scale` for some kinds of pages, wherein keys are the first part
+          of the path (eg: {'match': 24} for 24 shots per match page). Can be changed while running. Default: None
+        - recordings_folderpath (str): Path of folder of recorded pages (see `record_pages`). Default: None
+    Usage example:
+        - server = StandInServer(scale=100)
+        - base_url = server.start()
+        - client.configure_client(base_url=base_url)
+    """
+
+    def __init__(self, scale=1, page_scales=None, recordings_folderpath=None):
+        self.scale = scale
+        self.page_scales = page_scales or dict()
+        self.recordings_folderpath = recordings_folderpath
+        self.pages = dict()
+        self.num_requests = 0
+        self.loop = None
+        self.runner = None
+
+    def get_page(self, path):
+        scale = self.page_scales.get(path.strip('/').split('/')[0], self.scale)
+        key = (path, scale)
+        if key not in self.pages:
+            filepath = None
+            if self.recordings_folderpath is not None:
+                filepath = os.path.join(self.recordings_folderpath, get_recorded_filename(path=path))
+            if filepath is not None and os.path.isfile(filepath):
+                with open(filepath, encoding='utf-8') as file:
+                    self.pages[key] = file.read()
+            else:
+                self.pages[key] = get_synthetic_page(path=path, scale=scale)
+        return self.pages[key]
+
+    async def handle(self, request):
+        self.num_requests += 1
+        page = self.get_page(path=request.path)
+        if page is None:
+            return web.Response(status=404)
+        return web.Response(text=page, content_type='text/html')
+
+    def start(self):
+        """ Starts serving on a free local port, and returns the base URL (to be used instead of Understat's) """
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        self.loop = asyncio.new_event_loop()
+        app = web.Application()
+        app.router.add_get('/{path:.*}', self.handle)
+        self.runner = web.AppRunner(app)
+        started = threading.Event()
+
+        def serve():
+            asyncio.set_event_loop(self.loop)
+            self.loop.run_until_complete(self.runner.setup())
+            self.loop.run_until_complete(web.TCPSite(self.runner, '127.0.0.1', port).start())
+            started.set()
+            self.loop.run_forever()
+
+        threading.Thread(target=serve, daemon=True).start()
+        started.wait()
+        return "http://127.0.0.1:{}/".format(port)
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(self.runner.cleanup(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        return None
+
+
+def record_pages(paths, recordings_folderpath, base_url='https://understat.com/'):
+    """ Records pages of the given Understat paths (eg: '/league/EPL/2020') into the recordings folder. Needs network """
+    import aiohttp
+
+    async def record():
+        async with aiohttp.ClientSession() as session:
+            for path in paths:
+                async with session.get(base_url + path.lstrip('/')) as response:
+                    response.raise_for_status()
+                    page = await response.text()
+                filepath = os.path.join(recordings_folderpath, get_recorded_filename(path=path))
+                with open(filepath, 'w', encoding='utf-8') as file:
+                    file.write(page)
+
+    os.makedirs(recordings_folderpath, exist_ok=True)
+    asyncio.new_event_loop().run_until_complete(record())
+    return None
@@ -0,0 +1,16 @@
+import benchmark
+
+# Benchmarks whose number of rows grows with the scale of the stand-in server's pages
+SCALED_BENCHMARKS = ['pipeline.get_league_players_data', 'pipeline.get_league_results_data',
+                     'pipeline.get_match_shots_data', 'pipeline.get_player_matches_data',
+                     'pipeline.get_player_shots_data', 'pipeline.get_team_players_data',
+                     'pipeline.get_team_results_data', 'pipeline.get_league_season_matches_data',
+                     'pipeline.get_match_players_batch_data', 'pipeline.get_match_shots_batch_data']
+
+
+def test_rows_follow_the_scale():
+    # Pages of a previous scale (or call) mustn't be served from memory
+    results = benchmark.run_benchmarks(scales=[1, 7], repeats=2, pattern='pipeline.')
+    rows = {(result['benchmark'], result['scale']): result['rows'] for result in results}
+    for name in SCALED_BENCHMARKS:
+        assert rows[(name, 7)] > rows[(name, 1)], name
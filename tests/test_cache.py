@@ -0,0 +1,78 @@
+from cache import ResponseCache, TTL_FIXTURES, get_ttl
+from client import configure_client
+from ratelimit import AdaptiveRateLimiter
+import pipeline
+
+
+def get_shots(season):
+    return {'h': [{'id': '1', 'season': str(season), 'h_team': 'Team 0', 'a_team': 'Team 1'}], 'a': []}
+
+
+def test_ttl_of_match_data():
+    # Data of a match in progress (or partially scraped) expires, unless the match is known to be finished
+    assert get_ttl(endpoint='match_shots', arguments={'match_id': '1'}, data=get_shots(season=2099)) == TTL_FIXTURES
+    assert get_ttl(endpoint='match_players', arguments={'match_id': '1'}, data={'h': {'1': {}}, 'a': {}}) \
+        == TTL_FIXTURES
+    assert get_ttl(endpoint='match_players', arguments={'match_id': '1'}, data={'h': {'1': {}}, 'a': {}},
+                   match_finished=True) is None
+    assert get_ttl(endpoint='match_shots', arguments={'match_id': '1'}, data=get_shots(season=2015)) is None
+    assert get_ttl(endpoint='league_results', arguments={'league_name': 'EPL', 'season': 2015}, data=[]) is None
+
+
+def test_matches_of_cached_results_are_kept_forever(tmp_path):
+    cache = ResponseCache(path=str(tmp_path / 'cache.sqlite'))
+    results = [{'id': '10', 'isResult': True}, {'id': '11', 'isResult': False}]
+    cache.set(endpoint='league_results', arguments={'league_name': 'EPL', 'season': 2099}, data=results)
+    for match_id in ['10', '11']:
+        cache.set(endpoint='match_players', arguments={'match_id': match_id}, data={'h': {}, 'a': {}})
+    expires_at = dict(cache.connection.execute("SELECT key, expires_at FROM responses WHERE endpoint = 'match_players'"))
+    assert expires_at[cache.get_key(endpoint='match_players', arguments={'match_id': '10'})] is None
+    assert expires_at[cache.get_key(endpoint='match_players', arguments={'match_id': '11'})] is not None
+    cache.close()
+
+
+def test_size_and_eviction(tmp_path):
+    cache = ResponseCache(path=str(tmp_path / 'cache.sqlite'), max_size_mb=0.001)
+    for match_id in range(20):
+        cache.set(endpoint='match_shots', arguments={'match_id': match_id}, data=get_shots(season=2015))
+        assert cache.size_bytes == cache.get_size() <= cache.max_size_bytes
+    # Replacing an entry doesn't count it twice
+    cache.set(endpoint='match_shots', arguments={'match_id': 19}, data=get_shots(season=2015))
+    assert cache.size_bytes == cache.get_size()
+    assert cache.get(endpoint='match_shots', arguments={'match_id': 19}) == (True, get_shots(season=2015))
+    assert cache.get(endpoint='match_shots', arguments={'match_id': 0}) == (False, None)
+    cache.close()
+
+
+def test_access_times_are_written_in_batches(tmp_path):
+    path = str(tmp_path / 'cache.sqlite')
+    cache = ResponseCache(path=path)
+    arguments = {'match_id': 1}
+    cache.set(endpoint='match_shots', arguments=arguments, data=get_shots(season=2015))
+    key = cache.get_key(endpoint='match_shots', arguments=arguments)
+    last_accessed = cache.connection.execute("SELECT last_accessed FROM responses").fetchone()[0]
+    assert cache.get(endpoint='match_shots', arguments=arguments)[0]
+    assert key in cache.pending_accesses
+    assert cache.connection.execute("SELECT last_accessed FROM responses").fetchone()[0] == last_accessed
+    cache.close()
+    cache = ResponseCache(path=path)
+    assert cache.connection.execute("SELECT last_accessed FROM responses").fetchone()[0] > last_accessed
+    cache.close()
+
+
+def test_cached_matches_are_not_fetched_again(standin, tmp_path):
+    standin.scale = 10
+    configure_client(base_url=standin.base_url, cache=ResponseCache(path=str(tmp_path / 'cache.sqlite')),
+                     rate_limiter=AdaptiveRateLimiter(requests_per_second=None))
+    data = pipeline.get_league_season_matches_data(league_name='EPL', season=2099)
+    assert standin.num_requests == 11
+    configure_client(base_url=standin.base_url, cache=ResponseCache(path=str(tmp_path / 'cache.sqlite')),
+                     rate_limiter=AdaptiveRateLimiter(requests_per_second=None))
+    assert pipeline.get_league_season_matches_data(league_name='EPL', season=2099)[1].equals(data[1])
+    assert standin.num_requests == 11
+    # The season isn't finished, but its played matches are (as per the league's results)
+    cache = ResponseCache(path=str(tmp_path / 'cache.sqlite'))
+    expires_at = [row[0] for row in cache.connection.execute("SELECT expires_at FROM responses "
+                                                             "WHERE endpoint IN ('match_players', 'match_shots')")]
+    assert len(expires_at) == 20 and set(expires_at) == {None}
+    cache.close()
@@ -0,0 +1,98 @@
+from checkpoint import Checkpoint, run_unit_async
+import regenerate_ids
+import stream
+import utils
+import os
+import pandas as pd
+import pytest
+
+
+def test_checkpoint(tmp_path):
+    checkpoint = Checkpoint(folderpath=str(tmp_path / 'checkpoint'))
+    assert not checkpoint.is_done(unit=('EPL', 2020)) and checkpoint.get_units() == []
+    checkpoint.save(unit=('EPL', 2020), result={'1': 'Team 1'})
+    checkpoint.save(unit=('matches', *[str(match_id) for match_id in range(100)]), result=pd.DataFrame({'a': [1]}))
+    assert checkpoint.is_done(unit=('EPL', 2020)) and checkpoint.load(unit=('EPL', 2020)) == {'1': 'Team 1'}
+    assert len(checkpoint.get_units()) == 2
+    # Saves are atomic, so no temporary files are left behind
+    assert all(filename.endswith('.pkl') for filename in os.listdir(checkpoint.folderpath))
+    checkpoint.clear()
+    assert not os.path.exists(checkpoint.folderpath) and checkpoint.get_units() == []
+
+
+def test_completed_units_are_not_run_again(tmp_path, client):
+    checkpoint = Checkpoint(folderpath=str(tmp_path / 'checkpoint'))
+    calls = []
+
+    async def coroutine_function():
+        calls.append(1)
+        return len(calls)
+
+    for _ in range(2):
+        assert client.run(run_unit_async(checkpoint=checkpoint, unit=('unit',), coroutine_function=coroutine_function)) == 1
+    assert len(calls) == 1
+    assert client.run(run_unit_async(checkpoint=None, unit=('unit',), coroutine_function=coroutine_function)) == 2
+
+
+def test_ids_generation_resumes_after_a_failure(standin, client, monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    league_season_pairs = regenerate_ids.get_league_season_pairs()
+    fetch_ids_by_league_season_async = regenerate_ids.fetch_ids_by_league_season_async
+
+    async def fetch_ids_failing_async(league_name, season, limiter):
+        if (league_name, season) == league_season_pairs[3]:
+            raise ConnectionError("Connection lost")
+        return await fetch_ids_by_league_season_async(league_name=league_name, season=season, limiter=limiter)
+
+    monkeypatch.setattr(regenerate_ids, 'fetch_ids_by_league_season_async', fetch_ids_failing_async)
+    with pytest.raises(ConnectionError):
+        regenerate_ids.generate_all_ids(incremental=False, requests_per_second=None)
+    # All the other league seasons are checkpointed, and nothing else is stored
+    assert len(Checkpoint(folderpath=regenerate_ids.FOLDER_CHECKPOINT).get_units()) == len(league_season_pairs) - 1
+    assert not os.path.isfile('ids_of_players.pkl')
+
+    monkeypatch.setattr(regenerate_ids, 'fetch_ids_by_league_season_async', fetch_ids_by_league_season_async)
+    standin.num_requests = 0
+    regenerate_ids.generate_all_ids(incremental=False, requests_per_second=None)
+    assert standin.num_requests == 1
+    assert not os.path.exists(regenerate_ids.FOLDER_CHECKPOINT)
+    dict_player_ids = utils.pickle_load(filename='ids_of_players.pkl')
+
+    # From scratch, with no pages in memory
+    client.pages.clear()
+    standin.num_requests = 0
+    regenerate_ids.generate_all_ids(incremental=False, requests_per_second=None)
+    assert standin.num_requests == len(league_season_pairs)
+    assert list(utils.pickle_load(filename='ids_of_players.pkl').items()) == list(dict_player_ids.items())
+
+
+def test_match_crawl_resumes_after_a_failure(standin, monkeypatch, tmp_path):
+    standin.scale = 40
+    checkpoint = Checkpoint(folderpath=str(tmp_path / 'checkpoint'))
+    get_matches_data_async = stream.pipeline.get_matches_data_async
+    calls = []
+
+    async def get_matches_data_failing_async(match_ids, **kwargs):
+        calls.append(match_ids)
+        if len(calls) == 2:
+            raise ConnectionError("Connection lost")
+        return await get_matches_data_async(match_ids=match_ids, **kwargs)
+
+    monkeypatch.setattr(stream.pipeline, 'get_matches_data_async', get_matches_data_failing_async)
+    os.mkdir(tmp_path / 'failed')
+    with pytest.raises(ConnectionError):
+        stream.stream_to_files(batches=stream.generate_match_batches_async(league_season_pairs=[('EPL', 2020)],
+                                                                          batch_size=15, checkpoint=checkpoint),
+                               folderpath=str(tmp_path / 'failed'))
+    # The league season's match IDs, and the first chunk of matches
+    assert len(checkpoint.get_units()) == 2
+
+    standin.num_requests = 0
+    os.mkdir(tmp_path / 'resumed')
+    dict_num_rows = stream.stream_to_files(batches=stream.generate_match_batches_async(
+        league_season_pairs=[('EPL', 2020)], batch_size=15, checkpoint=checkpoint), folderpath=str(tmp_path / 'resumed'))
+    # Only the matches of the last 2 chunks are fetched
+    assert standin.num_requests == 40 - 15
+    assert dict_num_rows == {'Match players': 40 * 28, 'Match shots': 40 * 40}
+    data_match_shots = pd.read_csv(tmp_path / 'resumed' / 'Match shots.csv')
+    assert data_match_shots['match_id'].nunique() == 40
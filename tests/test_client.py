@@ -0,0 +1,62 @@
+import pipeline
+import stream
+import utils
+import asyncio
+import pytest
+
+
+def test_matches_data_fetches_each_match_page_once(standin, tmp_path):
+    standin.scale = 100
+    data_match_players, data_match_shots = pipeline.get_league_season_matches_data(league_name='EPL', season=2020)
+    assert data_match_players['match_id'].nunique() == data_match_shots['match_id'].nunique() == 100
+    # 1 league page, and 1 page per match
+    assert standin.num_requests == 101
+
+    standin.num_requests = 0
+    batches = stream.generate_match_batches_async(league_season_pairs=[('EPL', 2020)], batch_size=30)
+    dict_num_rows = stream.stream_to_files(batches=batches, folderpath=str(tmp_path))
+    assert dict_num_rows == {'Match players': len(data_match_players), 'Match shots': len(data_match_shots)}
+    assert standin.num_requests == 101
+
+
+def test_team_endpoints_share_one_fetch_of_the_team_page(standin, client):
+    async def get_team_data_async():
+        return await asyncio.gather(pipeline.get_team_fixtures_data_async(team_name='Team 0', season=2020),
+                                    pipeline.get_team_players_data_async(team_name='Team 0', season=2020),
+                                    pipeline.get_team_results_data_async(team_name='Team 0', season=2020),
+                                    pipeline.get_team_stats_data_async(team_name='Team 0', season=2020))
+
+    client.run(get_team_data_async())
+    assert standin.num_requests == 1
+
+
+def test_league_endpoints_share_one_fetch_of_the_league_page(standin, client):
+    async def get_league_data_async():
+        return await asyncio.gather(pipeline.get_league_fixtures_data_async(league_name='EPL', season=2020),
+                                    pipeline.get_league_players_data_async(league_name='EPL', season=2020),
+                                    pipeline.get_league_results_data_async(league_name='EPL', season=2020),
+                                    pipeline.get_teams_data_async(league_name='EPL', season=2020))
+
+    client.run(get_league_data_async())
+    assert standin.num_requests == 1
+    # The page is then served from memory, for `page_ttl` seconds
+    client.run(get_league_data_async())
+    assert standin.num_requests == 1
+
+
+def test_pages_that_fail_to_be_fetched_are_not_kept(standin, client):
+    # The stand-in server doesn't serve unknown pages
+    url = standin.base_url + 'unknown/1'
+    for _ in range(2):
+        with pytest.raises(Exception):
+            client.run(client.get_page(url=url))
+        assert url not in client.pages
+    assert standin.num_requests == 2
+
+
+def test_pipeline_fetches_each_page_once(standin, monkeypatch, tmp_path):
+    monkeypatch.setattr(utils, 'get_global_results_folderpath', lambda: str(tmp_path))
+    pipeline.execute_pipeline(concurrent=True, file_format='csv')
+    # League, team, match, player and league stats pages
+    assert standin.num_requests == 5
+    assert len(list(tmp_path.iterdir())) == 24
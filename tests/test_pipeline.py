@@ -0,0 +1,16 @@
+import pipeline
+import utils
+import pytest
+
+
+@pytest.mark.parametrize('concurrent', [False, True])
+def test_failing_dataset_is_reported_the_same_way(concurrent, standin, monkeypatch, tmp_path, capsys):
+    async def get_stats_data_async(sort_by_date=False, options=None):
+        raise ValueError("No stats")
+
+    monkeypatch.setattr(pipeline, 'get_stats_data_async', get_stats_data_async)
+    monkeypatch.setattr(utils, 'get_global_results_folderpath', lambda: str(tmp_path))
+    pipeline.execute_pipeline(concurrent=concurrent, file_format='csv')
+    lines = [line for line in capsys.readouterr().out.splitlines() if line.startswith('Problem')]
+    assert lines == ["Problem with stat: stats (All league stats - TimeSeries) --> ErrorMsg: No stats"]
+    assert (tmp_path / 'League results - 2020-21 - Bundesliga.csv').is_file()
@@ -0,0 +1,35 @@
+from cache import ResponseCache
+from client import configure_client
+from ratelimit import AdaptiveRateLimiter
+import pull_league_matches_data
+import pandas as pd
+
+
+def sync(watermarks):
+    return pull_league_matches_data.sync_league_results(league_name='EPL', season=2099, country='England',
+                                                        watermarks=watermarks)
+
+
+def test_sync_of_new_results(standin, monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    standin.scale = 3
+    configure_client(base_url=standin.base_url, cache=ResponseCache(path=str(tmp_path / 'cache.sqlite')),
+                     rate_limiter=AdaptiveRateLimiter(requests_per_second=None))
+    watermarks = dict()
+    assert sync(watermarks=watermarks) == 3
+    # Results played since the last sync are fetched, though the league's results are in the response cache
+    standin.scale = 5
+    configure_client(base_url=standin.base_url, cache=ResponseCache(path=str(tmp_path / 'cache.sqlite')),
+                     rate_limiter=AdaptiveRateLimiter(requests_per_second=None))
+    assert sync(watermarks=watermarks) == 2
+    assert sync(watermarks=watermarks) == 0
+    df_league_results = pd.read_csv('EPL - 2099-00.csv')
+    assert len(df_league_results) == 5
+
+    # A postponed match, played after results that are already stored, is merged in by date
+    watermarks[('EPL', 2099)]['match_ids'].remove('10001')
+    df_league_results.drop(index=1).to_csv('EPL - 2099-00.csv', index=False)
+    assert sync(watermarks=watermarks) == 1
+    # The stand-in server's goals differ by scale, so only the matches are compared
+    columns = ['HomeTeam', 'AwayTeam', 'Date']
+    pd.testing.assert_frame_equal(pd.read_csv('EPL - 2099-00.csv')[columns], df_league_results[columns])
@@ -0,0 +1,31 @@
+import server
+from aiohttp.test_utils import TestClient, TestServer
+
+
+async def get_async(path):
+    """ Returns tuple of (status, JSON body) of a GET request of the path to the server's app """
+    async with TestClient(TestServer(server.create_app())) as test_client:
+        response = await test_client.get(path)
+        return response.status, await response.json()
+
+
+def test_internal_functions_are_not_served(client):
+    status, body = client.run(get_async(path='/match_raw?match_id=10000'))
+    assert status == 404
+    assert 'match_raw' not in client.run(get_async(path='/'))[1]
+
+
+def test_endpoint(standin, client):
+    status, body = client.run(get_async(path='/league_results?league_name=EPL&season=2020'))
+    assert status == 200
+    assert len(body) == 1
+
+
+def test_serialisation_errors_are_reported_as_json(client, monkeypatch):
+    def to_json_body(data):
+        raise ValueError("Unserialisable")
+
+    monkeypatch.setattr(server, 'to_json_body', to_json_body)
+    status, body = client.run(get_async(path='/league_results?league_name=EPL&season=2020'))
+    assert status == 500
+    assert body == {'error': 'ValueError: Unserialisable'}
@@ -0,0 +1,40 @@
+from store import DataStore
+import pipeline
+import pandas as pd
+
+
+def test_upsert_is_idempotent(standin, tmp_path):
+    data_match_shots = pipeline.get_match_shots_data(match_id='10000')
+    with DataStore(path=str(tmp_path / 'data.sqlite')) as store:
+        for _ in range(2):
+            store.upsert(name='match_shots', data=data_match_shots, scope={'match_id': '10000'})
+        assert len(store.read(name='match_shots')) == len(data_match_shots)
+        # Another match is added next to it, rather than replacing it
+        store.upsert(name='match_shots', data=pipeline.get_match_shots_data(match_id='10001'),
+                     scope={'match_id': '10001'})
+        assert store.read(name='match_shots', columns=['match_id'])['match_id'].value_counts().to_dict() \
+            == {'10000': len(data_match_shots), '10001': 2}
+        data = store.read(name='match_shots', match_id='10000')
+        assert data['xG'].round(4).tolist() == data_match_shots['xG'].astype(float).round(4).tolist()
+
+
+def test_upsert_of_dataset_with_sub_stats(standin, tmp_path):
+    data_team_stats = pipeline.get_team_stats_data(team_name='Team 0', season=2020)
+    scope = {'team': 'Team 0', 'season': 2020}
+    with DataStore(path=str(tmp_path / 'data.sqlite')) as store:
+        for _ in range(2):
+            store.upsert(name='team_stats', data=data_team_stats, scope=scope)
+        assert sorted(store.get_table_names()) == sorted("team_stats_{}".format(sub_stat)
+                                                         for sub_stat in data_team_stats)
+        for sub_stat, sub_df in data_team_stats.items():
+            data = store.read(name="team_stats_{}".format(sub_stat), **scope)
+            assert len(data) == len(sub_df)
+
+
+def test_upsert_adds_new_columns(tmp_path):
+    with DataStore(path=str(tmp_path / 'data.sqlite')) as store:
+        store.upsert(name='players', data=pd.DataFrame({'player_id': ['1'], 'goals': [3]}), scope={'player_id': '1'})
+        store.upsert(name='players', data=pd.DataFrame({'player_id': ['2'], 'goals': [1], 'xG': [0.5]}),
+                     scope={'player_id': '2'})
+        data = store.read(name='players')
+        assert data['player_id'].tolist() == ['1', '2'] and data['xG'].isna().tolist() == [True, False]
@@ -0,0 +1,54 @@
+import schemas
+import stream
+import utils
+import pandas as pd
+import pytest
+
+
+def get_shots_batch(num_shots, minute, player_assisted):
+    dataframe = pd.DataFrame({'id': [str(index) for index in range(num_shots)],
+                              'minute': [str(minute)] * num_shots,
+                              'xG': ['0.25'] * num_shots,
+                              'result': ['Goal'] * num_shots,
+                              'player_assisted': [player_assisted] * num_shots})
+    return schemas.apply_schema(data=dataframe, name='match_shots')
+
+
+@pytest.mark.parametrize('file_format', ['csv', 'parquet', 'feather'])
+def test_streamed_batches_with_different_dtypes(file_format, tmp_path):
+    if file_format != 'csv':
+        pytest.importorskip('pyarrow')
+    # Players aren't assisted in the first batch (a column without values), and minutes beyond the range of the
+    # declared 16-bit integers in the second one (which is left with 64-bit integers). The assisting player's
+    # name can't be encoded as Latin-1
+    batches = [get_shots_batch(num_shots=3, minute=5, player_assisted=None),
+               get_shots_batch(num_shots=2, minute=70000, player_assisted='Łukasz Fabiański')]
+    assert str(batches[0]['minute'].dtype) == 'int16' and str(batches[1]['minute'].dtype) == 'int64'
+    with stream.DatasetSink(file_format=file_format, folderpath=str(tmp_path)) as sink:
+        for batch in batches:
+            sink.write(batch={'Match shots': batch})
+    data = utils.load_data(filepath=str(tmp_path / "Match shots.{}".format(file_format)))
+    assert data['minute'].tolist() == [5, 5, 5, 70000, 70000]
+    assert data['player_assisted'].tolist()[3:] == ['Łukasz Fabiański'] * 2
+    assert data['xG'].tolist() == [0.25] * 5
+
+
+def test_streamed_match_batches(standin, tmp_path):
+    pytest.importorskip('pyarrow')
+    standin.scale = 40
+    batches = stream.generate_match_batches_async(league_season_pairs=[('EPL', 2020)], batch_size=15)
+    dict_num_rows = stream.stream_to_files(batches=batches, file_format='parquet', folderpath=str(tmp_path))
+    data_match_shots = utils.load_data(filepath=str(tmp_path / "Match shots.parquet"))
+    assert len(data_match_shots) == dict_num_rows['Match shots'] == 40 * 40
+    assert data_match_shots['match_id'].nunique() == 40
+
+
+def test_batches_with_new_columns_are_not_dropped(tmp_path):
+    with stream.BatchWriter(name='Match shots', folderpath=str(tmp_path)) as writer:
+        writer.write(dataframe=pd.DataFrame({'id': ['1'], 'minute': [5]}))
+        # Missing columns are left empty, but new ones can't be stored
+        writer.write(dataframe=pd.DataFrame({'id': ['2']}))
+        with pytest.raises(ValueError):
+            writer.write(dataframe=pd.DataFrame({'id': ['3'], 'minute': [7], 'xG': [0.25]}))
+    data = utils.load_data(filepath=str(tmp_path / "Match shots.csv"))
+    assert data['id'].tolist() == [1, 2] and data['minute'].isna().tolist() == [False, True]
@@ -0,0 +1,9 @@
+import transform
+
+
+def test_match_shots_are_sorted_by_minute_as_numbers():
+    dict_data = {'h': [{'id': '1', 'minute': '10'}, {'id': '2', 'minute': '9'}],
+                 'a': [{'id': '3', 'minute': '90'}, {'id': '4', 'minute': '9'}]}
+    assert transform.wrangle_match_shots(dict_data=dict_data)['id'].tolist() == ['2', '4', '1', '3']
+    data = transform.wrangle_match_shots_batch(dict_data_by_match={'1': dict_data, '2': dict_data})
+    assert data['id'].tolist() == ['2', '4', '1', '3'] * 2
@@ -0,0 +1,184 @@
+import utils
+import json
+import sqlite3
+import time
+
+TTL_CURRENT_SEASON = 60 * 60
+TTL_FIXTURES = 15 * 60
+SEASON_ENDPOINTS = ['league_players', 'league_results', 'team_players', 'team_results', 'team_stats', 'teams']
+FIXTURE_ENDPOINTS = ['league_fixtures', 'team_fixtures']
+MATCH_ENDPOINTS = ['match_players', 'match_shots']
+# Endpoints whose data lists results (with 'isResult' set), whose matches are known to be finished
+RESULT_ENDPOINTS = ['league_results', 'team_results']
+# Number of hits whose access times are held in memory, before they're written to the cache in one transaction
+MAX_PENDING_ACCESSES = 100
+
+
+class CacheMissError(Exception):
+    """ Raised in cache-only mode, when the requested data isn't in the cache """
+    pass
+
+
+def is_match_shots_finished(data):
+    """ Returns True if the given shots data of a match is of a finished season """
+    if not isinstance(data, dict):
+        return False
+    list_of_shots = data.get('h', []) + data.get('a', [])
+    return bool(list_of_shots) and utils.is_season_finished(season=int(list_of_shots[0]['season']))
+
+
+def get_ttl(endpoint, arguments, data, match_finished=False):
+    """
+    Definition:
+        Gets time-to-live (in seconds) of the data returned by the given endpoint, for the given arguments.
+        Data of finished seasons and finished matches never changes, so it's kept forever.
+        Data of a match is only kept forever if the match is known to be finished (`match_finished`, or shots of a
+        finished season); as data of a match in progress (or partially scraped) changes until it's finished.
+    Returns:
+        TTL in seconds (int), or None if the data never expires.
+    """
+    if endpoint in SEASON_ENDPOINTS + FIXTURE_ENDPOINTS:
+        if utils.is_season_finished(season=arguments['season']):
+            return None
+        if endpoint in FIXTURE_ENDPOINTS:
+            return TTL_FIXTURES
+        return TTL_CURRENT_SEASON
+    if endpoint in MATCH_ENDPOINTS:
+        if match_finished or (endpoint == 'match_shots' and is_match_shots_finished(data=data)):
+            return None
+        return TTL_FIXTURES
+    return TTL_CURRENT_SEASON
+
+
+class ResponseCache:
+    """
+    Persistent on-disk (SQLite) cache of decoded Understat responses, keyed by endpoint and arguments.
+    Entries expire as per `get_ttl`, and the least recently used entries are evicted once the cache
+    grows beyond the maximum size. IDs of the matches in cached results are recorded as finished, so that their
+    match data is then kept forever.
+    Access times of hits are written in batches (of `MAX_PENDING_ACCESSES`, and before evictions), and the total
+    size of the payloads is kept in memory; so hits and stores don't scan or write the whole cache.
+    Parameters:
+        - path (str): Path of the SQLite file. Default: 'understat_cache.sqlite'
+        - max_size_mb (float): Maximum size of the cached payloads, in megabytes. Default: 512
+        - cache_only (bool): Offline mode. If True, data is only ever read from the cache (even if it has expired),
+          and CacheMissError is raised for data that isn't cached. Default: False
+    """
+
+    def __init__(self, path='understat_cache.sqlite', max_size_mb=512, cache_only=False):
+        self.path = path
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.cache_only = cache_only
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                endpoint TEXT NOT NULL,
+                data TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                expires_at REAL,
+                last_accessed REAL NOT NULL
+            )
+        """)
+        self.connection.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_accessed ON responses (last_accessed)")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS finished_matches (match_id TEXT PRIMARY KEY)")
+        self.connection.commit()
+        self.pending_accesses = dict()
+        self.size_bytes = self.get_size()
+
+    @staticmethod
+    def get_key(endpoint, arguments):
+        # IDs and seasons are keyed as strings, so that (eg) season=2020 and season='2020' share an entry
+        arguments = {name: value if isinstance(value, (dict, list, type(None))) else str(value)
+                     for name, value in arguments.items()}
+        return endpoint + ':' + json.dumps(arguments, sort_keys=True)
+
+    def get(self, endpoint, arguments):
+        """
+        Returns tuple of (is_hit, data) for the given endpoint and arguments.
+        Raises CacheMissError in cache-only mode, if the data isn't cached.
+        """
+        key = self.get_key(endpoint=endpoint, arguments=arguments)
+        row = self.connection.execute("SELECT data, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+        now = time.time()
+        if row is None or (row[1] is not None and row[1] < now and not self.cache_only):
+            if self.cache_only:
+                raise CacheMissError("Not in cache: {}".format(key))
+            return False, None
+        self.pending_accesses[key] = now
+        if len(self.pending_accesses) >= MAX_PENDING_ACCESSES:
+            self.flush_accesses()
+        return True, json.loads(row[0])
+
+    def flush_accesses(self):
+        """ Writes the access times of the hits held in memory to the cache """
+        if not self.pending_accesses:
+            return None
+        self.connection.executemany("UPDATE responses SET last_accessed = ? WHERE key = ?",
+                                    [(now, key) for key, now in self.pending_accesses.items()])
+        self.connection.commit()
+        self.pending_accesses.clear()
+        return None
+
+    def is_match_finished(self, match_id):
+        row = self.connection.execute("SELECT 1 FROM finished_matches WHERE match_id = ?", (str(match_id),)).fetchone()
+        return row is not None
+
+    def set(self, endpoint, arguments, data):
+        """ Stores data of the given endpoint and arguments, with the TTL given by `get_ttl` """
+        key = self.get_key(endpoint=endpoint, arguments=arguments)
+        match_finished = endpoint in MATCH_ENDPOINTS and self.is_match_finished(match_id=arguments['match_id'])
+        ttl = get_ttl(endpoint=endpoint, arguments=arguments, data=data, match_finished=match_finished)
+        now = time.time()
+        expires_at = None if ttl is None else now + ttl
+        json_data = json.dumps(data)
+        row = self.connection.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+        self.connection.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                                (key, endpoint, json_data, len(json_data), expires_at, now))
+        if endpoint in RESULT_ENDPOINTS:
+            self.connection.executemany("INSERT OR IGNORE INTO finished_matches VALUES (?)",
+                                        [(str(result['id']),) for result in data if result.get('isResult')])
+        self.connection.commit()
+        self.size_bytes += len(json_data) - (row[0] if row is not None else 0)
+        if self.size_bytes > self.max_size_bytes:
+            self.evict()
+        return None
+
+    def get_size(self):
+        """ Returns total size (in bytes) of the cached payloads """
+        return self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def evict(self):
+        """ Evicts least recently used entries until the cache is within its maximum size """
+        self.flush_accesses()
+        # Re-counted, as other processes can share the cache
+        self.size_bytes = self.get_size()
+        excess_bytes = self.size_bytes - self.max_size_bytes
+        if excess_bytes <= 0:
+            return None
+        keys_to_evict = []
+        for key, size in self.connection.execute("SELECT key, size FROM responses ORDER BY last_accessed ASC"):
+            if excess_bytes <= 0:
+                break
+            keys_to_evict.append((key,))
+            excess_bytes -= size
+            self.size_bytes -= size
+        self.connection.executemany("DELETE FROM responses WHERE key = ?", keys_to_evict)
+        self.connection.commit()
+        return None
+
+    def clear(self):
+        """ Deletes all cached entries """
+        self.pending_accesses.clear()
+        self.connection.execute("DELETE FROM responses")
+        self.connection.execute("DELETE FROM finished_matches")
+        self.connection.commit()
+        self.size_bytes = 0
+        return None
+
+    def close(self):
+        self.flush_accesses()
+        self.connection.close()
+        return None
@@ -0,0 +1,71 @@
+import utils
+import hashlib
+import json
+import os
+import shutil
+
+
+class Checkpoint:
+    """
+    Durable record of the completed units (eg: league seasons, chunks of matches or players) of a long-running job,
+    along with the result of each unit; so that a job that fails or is interrupted can be restarted, and resumes by
+    only running the units that weren't completed. Each unit's result is saved in its own Pickle file in the
+    checkpoint's folder (created on first save), atomically (see `utils.pickle_save`) and as soon as the unit
+    completes; so a failure never loses completed units, nor leaves a partial one behind.
+    The folder should be cleared once the whole job has completed, so that the next run starts afresh.
+    Parameters:
+        - folderpath (str): Path of the checkpoint's folder
+    Usage example:
+        - checkpoint = Checkpoint(folderpath='checkpoints/ids')
+        - data = checkpoint.load(unit=('EPL', 2020)) if checkpoint.is_done(unit=('EPL', 2020)) else fetch(...)
+        - checkpoint.save(unit=('EPL', 2020), result=data)
+        - checkpoint.clear()
+    """
+
+    def __init__(self, folderpath):
+        self.folderpath = folderpath
+
+    def get_filepath(self, unit):
+        # Units (tuples of IDs, names and seasons) are hashed, as they can be too long for a filename (eg: chunks)
+        key = json.dumps([str(part) for part in unit])
+        return os.path.join(self.folderpath, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.pkl')
+
+    def is_done(self, unit):
+        return os.path.isfile(self.get_filepath(unit=unit))
+
+    def load(self, unit):
+        """ Returns result of the given completed unit """
+        _, result = utils.pickle_load(filename=self.get_filepath(unit=unit))
+        return result
+
+    def save(self, unit, result):
+        """ Marks the given unit as completed, with its result """
+        os.makedirs(self.folderpath, exist_ok=True)
+        utils.pickle_save(data_obj=(unit, result), filename=self.get_filepath(unit=unit))
+        return None
+
+    def get_units(self):
+        """ Returns list of the completed units """
+        if not os.path.isdir(self.folderpath):
+            return []
+        return [utils.pickle_load(filename=os.path.join(self.folderpath, filename))[0]
+                for filename in sorted(os.listdir(self.folderpath)) if filename.endswith('.pkl')]
+
+    def clear(self):
+        """ Deletes the checkpoint's folder, along with all the completed units """
+        shutil.rmtree(self.folderpath, ignore_errors=True)
+        return None
+
+
+async def run_unit_async(checkpoint, unit, coroutine_function):
+    """
+    Returns result of the given unit of a job; loaded from the checkpoint if the unit has already been completed,
+    or else by awaiting the coroutine function (without parameters), in which case the result is checkpointed.
+    Nothing is checkpointed if `checkpoint` is None.
+    """
+    if checkpoint is not None and checkpoint.is_done(unit=unit):
+        return checkpoint.load(unit=unit)
+    result = await coroutine_function()
+    if checkpoint is not None:
+        checkpoint.save(unit=unit, result=result)
+    return result
@@ -0,0 +1,346 @@
+from understat.constants import BASE_URL, LEAGUE_URL, MATCH_URL, PATTERN, PLAYER_URL, TEAM_URL
+from understat.utils import decode_data, filter_by_positions, filter_data, find_match, to_league_name
+from bs4 import BeautifulSoup
+from cache import ResponseCache
+from ratelimit import AdaptiveRateLimiter, RETRY_STATUSES, ThrottledError
+import metrics
+import asyncio
+import atexit
+import collections
+import functools
+import inspect
+import re
+import time
+import aiohttp
+
+
+def cached_endpoint(coroutine_function):
+    """
+    Decorator for the endpoints of UnderstatClient, that serves data from the client's cache (if any),
+    and caches freshly fetched data. The cache is keyed by the endpoint's name and arguments.
+    Endpoints take the extra keyword argument `refresh` (default: False); if True, the data is fetched afresh
+    instead of being served from the cache, and the cached data is replaced.
+    """
+    endpoint = coroutine_function.__name__.replace('get_', '', 1)
+    signature = inspect.signature(coroutine_function)
+
+    @functools.wraps(coroutine_function)
+    async def wrapper(self, *args, refresh=False, **kwargs):
+        if self.cache is None:
+            return await coroutine_function(self, *args, **kwargs)
+        bound_arguments = signature.bind(self, *args, **kwargs)
+        bound_arguments.apply_defaults()
+        arguments = dict(bound_arguments.arguments)
+        arguments.pop('self')
+        start = time.perf_counter()
+        is_hit, data = (False, None) if refresh else self.cache.get(endpoint=endpoint, arguments=arguments)
+        if not is_hit:
+            data = await coroutine_function(self, *args, **kwargs)
+            self.cache.set(endpoint=endpoint, arguments=arguments, data=data)
+        metrics.record(stage='cache', name=endpoint, seconds=time.perf_counter() - start, cache_hit=is_hit)
+        return data
+    return wrapper
+
+
+class Page:
+    """
+    HTML of an Understat page, whose scripts are parsed (and payload of each data type is found) once, no matter
+    how many times its data types (eg: 'datesData', 'playersData') are decoded.
+    Each decode returns new objects, so they can be modified freely.
+    """
+
+    def __init__(self, html):
+        self.html = html
+        self.scripts = None
+        self.matches = dict()
+
+    def get_data(self, data_type):
+        """ Returns data of the given data type from the page """
+        if data_type not in self.matches:
+            if self.scripts is None:
+                self.scripts = BeautifulSoup(self.html, "html.parser").find_all("script")
+            self.matches[data_type] = find_match(self.scripts, re.compile(PATTERN.format(data_type)))
+        return decode_data(self.matches[data_type])
+
+
+def decode_page(html, data_type):
+    """ Returns data of the given data type (eg: 'datesData') from the HTML of an Understat page """
+    return Page(html=html).get_data(data_type=data_type)
+
+
+class UnderstatClient:
+    """
+    Long-lived Understat client that owns one event loop and one pooled aiohttp session.
+    All the endpoints of the understat module are exposed as coroutines, which can be run
+    synchronously via the `run` method.
+    Parameters:
+        - limit (int): Maximum number of simultaneous connections. Default: 100
+        - limit_per_host (int): Maximum number of simultaneous connections to understat.com. Default: 10
+        - keepalive_timeout (int): Seconds for which idle connections are kept alive. Default: 30
+        - ttl_dns_cache (int): Seconds for which resolved DNS entries are cached. Default: 300
+        - timeout (int): Total timeout (in seconds) of each request. Default: 60
+        - cache (ResponseCache): On-disk cache of responses. Nothing is cached if None. Default: None
+        - rate_limiter (AdaptiveRateLimiter): Shared limiter (with retries) of the requests sent to Understat.
+          Requests are neither limited nor retried if None. Default: None
+        - base_url (str): Base URL of Understat, which can point to a local stand-in server (eg: for benchmarks).
+          Default: 'https://understat.com/'
+        - page_ttl (int): Seconds for which fetched pages are kept in memory, and shared by all endpoints that
+          read the same page (eg: league fixtures, results, players and teams; or match players and shots).
+          Default: 60
+        - max_pages (int): Maximum number of pages kept in memory. Default: 32
+    Usage example:
+        - client = UnderstatClient(limit_per_host=5)
+        - data = client.run(client.get_league_results(league_name='EPL', season=2020))
+        - client.close()
+    """
+
+    def __init__(self, limit=100, limit_per_host=10, keepalive_timeout=30, ttl_dns_cache=300, timeout=60,
+                 cache=None, rate_limiter=None, base_url=BASE_URL, page_ttl=60, max_pages=32):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.ttl_dns_cache = ttl_dns_cache
+        self.timeout = timeout
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.base_url = base_url
+        self.page_ttl = page_ttl
+        self.max_pages = max_pages
+        self.pages = collections.OrderedDict()
+        self.loop = asyncio.new_event_loop()
+        self.session = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return None
+
+    def run(self, coroutine):
+        """ Runs coroutine on the client's event loop, and returns its result """
+        return self.loop.run_until_complete(coroutine)
+
+    def get_url(self, url_template, *args):
+        """ Returns URL of an Understat page (eg: LEAGUE_URL with league name and season), under the client's base URL """
+        return self.base_url + url_template.format(*args)[len(BASE_URL):]
+
+    async def get_session(self):
+        """ Returns the pooled aiohttp session, creating it (on the client's loop) if necessary """
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.limit,
+                                             limit_per_host=self.limit_per_host,
+                                             keepalive_timeout=self.keepalive_timeout,
+                                             ttl_dns_cache=self.ttl_dns_cache,
+                                             use_dns_cache=True)
+            self.session = aiohttp.ClientSession(connector=connector,
+                                                 timeout=aiohttp.ClientTimeout(total=self.timeout))
+        return self.session
+
+    async def fetch(self, url):
+        """ Returns HTML of the given Understat URL. Raises ThrottledError for responses worth retrying """
+        session = await self.get_session()
+        start = time.perf_counter()
+        async with session.get(url) as response:
+            if response.status in RETRY_STATUSES:
+                retry_after = response.headers.get('Retry-After')
+                raise ThrottledError(status=response.status,
+                                     retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None)
+            response.raise_for_status()
+            body = await response.read()
+            html = body.decode(response.get_encoding())
+        metrics.record(stage='fetch', name='fetch', seconds=time.perf_counter() - start, num_bytes=len(body))
+        return html
+
+    async def get_html(self, url):
+        """ Returns HTML of the given Understat URL, via the rate limiter (if any) """
+        if self.rate_limiter is None:
+            return await self.fetch(url=url)
+        return await self.rate_limiter.call(self.fetch, url=url)
+
+    async def fetch_page(self, url):
+        return Page(html=await self.get_html(url=url))
+
+    async def get_page(self, url):
+        """
+        Returns Page of the given Understat URL. Requests of a page that is already being fetched wait for that
+        fetch, rather than fetching it again; and the page is then served from memory for `page_ttl` seconds.
+        Pages whose fetch fails aren't kept.
+        """
+        entry = self.pages.get(url)
+        if entry is None or time.monotonic() - entry[0] > self.page_ttl:
+            entry = (time.monotonic(), asyncio.ensure_future(self.fetch_page(url=url)))
+            self.pages[url] = entry
+            while len(self.pages) > self.max_pages:
+                self.pages.popitem(last=False)
+        else:
+            self.pages.move_to_end(url)
+        try:
+            # Shielded, so that a cancelled request doesn't cancel the fetch shared with other requests
+            return await asyncio.shield(entry[1])
+        except Exception:
+            if self.pages.get(url) is entry:
+                del self.pages[url]
+            raise
+
+    def decode(self, page, data_type):
+        start = time.perf_counter()
+        data = page.get_data(data_type=data_type)
+        metrics.record(stage='decode', name=data_type, seconds=time.perf_counter() - start,
+                       num_rows=metrics.get_num_rows(data))
+        return data
+
+    async def get_data(self, url, data_type):
+        """ Returns data of the given data type (eg: 'datesData') from the given Understat URL (fetched afresh) """
+        page = await self.fetch_page(url=url)
+        return self.decode(page=page, data_type=data_type)
+
+    async def get_page_data(self, url, data_type):
+        """ Returns data of the given data type from the given Understat URL, whose page is shared (see `get_page`) """
+        page = await self.get_page(url=url)
+        return self.decode(page=page, data_type=data_type)
+
+    @cached_endpoint
+    async def get_league_fixtures(self, league_name, season, options=None):
+        url = self.get_url(LEAGUE_URL, to_league_name(league_name), season)
+        dates_data = await self.get_page_data(url=url, data_type="datesData")
+        fixtures = [fixture for fixture in dates_data if not fixture["isResult"]]
+        return filter_data(fixtures, options)
+
+    @cached_endpoint
+    async def get_league_players(self, league_name, season, options=None):
+        url = self.get_url(LEAGUE_URL, to_league_name(league_name), season)
+        players_data = await self.get_page_data(url=url, data_type="playersData")
+        return filter_data(players_data, options)
+
+    @cached_endpoint
+    async def get_league_results(self, league_name, season, options=None):
+        url = self.get_url(LEAGUE_URL, to_league_name(league_name), season)
+        dates_data = await self.get_page_data(url=url, data_type="datesData")
+        results = [result for result in dates_data if result["isResult"]]
+        return filter_data(results, options)
+
+    @cached_endpoint
+    async def get_match_players(self, match_id, options=None):
+        url = self.get_url(MATCH_URL, match_id)
+        players_data = await self.get_page_data(url=url, data_type="rostersData")
+        return filter_data(players_data, options)
+
+    @cached_endpoint
+    async def get_match_shots(self, match_id, options=None):
+        url = self.get_url(MATCH_URL, match_id)
+        shots_data = await self.get_page_data(url=url, data_type="shotsData")
+        return filter_data(shots_data, options)
+
+    @cached_endpoint
+    async def get_player_grouped_stats(self, player_id):
+        url = self.get_url(PLAYER_URL, player_id)
+        grouped_stats = await self.get_page_data(url=url, data_type="groupsData")
+        return grouped_stats
+
+    @cached_endpoint
+    async def get_player_matches(self, player_id, options=None):
+        url = self.get_url(PLAYER_URL, player_id)
+        matches_data = await self.get_page_data(url=url, data_type="matchesData")
+        return filter_data(matches_data, options)
+
+    @cached_endpoint
+    async def get_player_shots(self, player_id, options=None):
+        url = self.get_url(PLAYER_URL, player_id)
+        shots_data = await self.get_page_data(url=url, data_type="shotsData")
+        return filter_data(shots_data, options)
+
+    @cached_endpoint
+    async def get_player_stats(self, player_id, positions=None):
+        url = self.get_url(PLAYER_URL, player_id)
+        player_stats = await self.get_page_data(url=url, data_type="minMaxPlayerStats")
+        return filter_by_positions(player_stats, positions)
+
+    @cached_endpoint
+    async def get_stats(self, options=None):
+        stats = await self.get_page_data(url=self.get_url(BASE_URL), data_type="statData")
+        return filter_data(stats, options)
+
+    @cached_endpoint
+    async def get_team_fixtures(self, team_name, season, side, options=None):
+        url = self.get_url(TEAM_URL, team_name.replace(" ", "_"), season)
+        dates_data = await self.get_page_data(url=url, data_type="datesData")
+        fixtures = [fixture for fixture in dates_data if not fixture["isResult"]]
+        return filter_data(fixtures, options or {'side': side})
+
+    @cached_endpoint
+    async def get_team_players(self, team_name, season, options=None):
+        url = self.get_url(TEAM_URL, team_name.replace(" ", "_"), season)
+        players_data = await self.get_page_data(url=url, data_type="playersData")
+        return filter_data(players_data, options)
+
+    @cached_endpoint
+    async def get_team_results(self, team_name, season, options=None):
+        url = self.get_url(TEAM_URL, team_name.replace(" ", "_"), season)
+        dates_data = await self.get_page_data(url=url, data_type="datesData")
+        results = [result for result in dates_data if result["isResult"]]
+        return filter_data(results, options)
+
+    @cached_endpoint
+    async def get_team_stats(self, team_name, season):
+        url = self.get_url(TEAM_URL, team_name.replace(" ", "_"), season)
+        team_stats = await self.get_page_data(url=url, data_type="statisticsData")
+        return team_stats
+
+    @cached_endpoint
+    async def get_teams(self, league_name, season, options=None):
+        url = self.get_url(LEAGUE_URL, to_league_name(league_name), season)
+        teams_data = await self.get_page_data(url=url, data_type="teamsData")
+        return filter_data(list(teams_data.values()), options)
+
+    async def close_async(self):
+        self.pages.clear()
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+        return None
+
+    def close(self):
+        """ Closes the pooled session, the client's event loop and the cache (if any) """
+        if self.loop.is_closed():
+            return None
+        self.run(self.close_async())
+        self.loop.close()
+        if self.cache is not None:
+            self.cache.close()
+        return None
+
+
+_default_client = None
+
+
+def get_client():
+    """
+    Returns the process-wide UnderstatClient (with an on-disk response cache, and an adaptive rate limiter),
+    creating it on first use
+    """
+    global _default_client
+    if _default_client is None or _default_client.loop.is_closed():
+        _default_client = UnderstatClient(cache=ResponseCache(), rate_limiter=AdaptiveRateLimiter())
+    return _default_client
+
+
+def configure_client(**kwargs):
+    """
+    Replaces the process-wide UnderstatClient with one created with the given keyword arguments
+    (see UnderstatClient for the available options), and returns it.
+    Usage example:
+        - configure_client(limit_per_host=5, cache=ResponseCache(cache_only=True))
+    """
+    global _default_client
+    if _default_client is not None:
+        _default_client.close()
+    _default_client = UnderstatClient(**kwargs)
+    return _default_client
+
+
+@atexit.register
+def _close_default_client():
+    if _default_client is not None:
+        _default_client.close()
+    return None
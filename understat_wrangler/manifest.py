@@ -0,0 +1,110 @@
+from client import get_client
+from pipeline import (DATASET_ENTITIES, ENTITY_ARGUMENTS, fetch_and_save_dataset_async, get_dataset_coroutine_function,
+                      get_dataset_filename, get_dataset_scope, get_player_names_async)
+from store import DataStore
+import utils
+import asyncio
+import pandas as pd
+
+FILENAME_MANIFEST = 'manifest.csv'
+# Order in which the entities' datasets are started. Datasets of the same page (eg: league fixtures, results and
+# players) are started one after another, so that they share one fetch of the page
+ENTITY_ORDER = ['league', 'team', 'match', 'player', 'stats']
+
+
+def get_stats_of_datasets(datasets):
+    """
+    Returns list of the stats (keys of `pipeline.DATASET_ENTITIES`) of the given ';' separated datasets, wherein
+    each dataset is either a stat (eg: 'league_results') or an entity (eg: 'league') that stands for all its stats
+    """
+    stats = []
+    for dataset in datasets.split(';'):
+        dataset = dataset.strip()
+        if dataset in ENTITY_ARGUMENTS:
+            stats.extend(stat for stat, entity in DATASET_ENTITIES.items() if entity == dataset)
+        elif dataset in DATASET_ENTITIES:
+            stats.append(dataset)
+        elif dataset:
+            raise ValueError("Invalid dataset: '{}'. Options: {}".format(
+                dataset, list(dict.fromkeys(list(ENTITY_ARGUMENTS) + list(DATASET_ENTITIES)))))
+    return stats
+
+
+def get_arguments(stat, row):
+    """ Returns arguments of the stat's entity (eg: {'league_name': 'EPL', 'season': 2020}) from the manifest row """
+    arguments = dict()
+    for argument in ENTITY_ARGUMENTS[DATASET_ENTITIES[stat]]:
+        value = row.get(argument, '').strip()
+        if not value:
+            raise ValueError("Missing '{}' for dataset '{}'".format(argument, stat))
+        arguments[argument] = int(value) if argument == 'season' else value
+    return arguments
+
+
+def read_manifest(filepath=FILENAME_MANIFEST):
+    """
+    Definition:
+        Reads the manifest (CSV file) of datasets to fetch, wherein each row has the columns:
+            - datasets: ';' separated stats (eg: 'league_results;league_players') and/or entities (eg: 'league'),
+              wherein an entity stands for all its stats. Options: {league, team, match, player, stats}
+            - league_name, season, team_name, match_id, player_id: Arguments of the datasets' entities. Only the
+              ones needed by the row's datasets have to be filled in
+        Datasets that are listed more than once (by overlapping rows) are only kept once.
+    Returns:
+        List of tasks (tuples of stat and its arguments), ordered by entity and page (see `ENTITY_ORDER`).
+    """
+    df_manifest = pd.read_csv(filepath, dtype=str, keep_default_na=False)
+    tasks = dict()
+    for row_number, row in enumerate(df_manifest.to_dict(orient='records'), start=2):
+        try:
+            for stat in get_stats_of_datasets(datasets=row.get('datasets', '')):
+                arguments = get_arguments(stat=stat, row=row)
+                tasks.setdefault((stat, tuple(arguments.items())), arguments)
+        except ValueError as e:
+            raise ValueError("Invalid row {} of manifest '{}': {}".format(row_number, filepath, e))
+    # Sorting is stable, so datasets of the same entity keep the order in which they're listed
+    keys = sorted(tasks, key=lambda key: (ENTITY_ORDER.index(DATASET_ENTITIES[key[0]]), key[1]))
+    return [(stat, tasks[(stat, arguments)]) for stat, arguments in keys]
+
+
+async def run_manifest_async(tasks, max_concurrency=10, file_format='csv', store=None):
+    player_ids = list(dict.fromkeys(arguments['player_id'] for _, arguments in tasks if 'player_id' in arguments))
+    dict_player_names = await get_player_names_async(player_ids=player_ids) if player_ids else dict()
+    semaphore = asyncio.Semaphore(max_concurrency)
+    coroutines = []
+    for stat, arguments in tasks:
+        player_name = (dict_player_names.get(arguments.get('player_id')) or '').replace(' ', '')
+        coroutines.append(fetch_and_save_dataset_async(
+            stat=stat,
+            coroutine_function=get_dataset_coroutine_function(stat=stat, arguments=arguments),
+            name=get_dataset_filename(stat=stat, arguments=arguments, player_name=player_name),
+            semaphore=semaphore,
+            file_format=file_format,
+            store=store,
+            scope=get_dataset_scope(stat=stat, arguments=arguments)))
+    await asyncio.gather(*coroutines)
+    return None
+
+
+def run_manifest(filepath=FILENAME_MANIFEST, max_concurrency=10, file_format='csv', store_path=None):
+    """
+    Fetches, wrangles and stores all the datasets of the manifest (see `read_manifest`) concurrently, on the
+    process-wide client's event loop. Files are named and stored the same way as by `pipeline.execute_pipeline`.
+    Parameters:
+        - filepath (str): Path of the manifest. Default: 'manifest.csv'
+        - max_concurrency (int): Maximum number of datasets being fetched at once. Default: 10
+        - file_format (str): Options: ['csv', 'parquet', 'feather']. Default: 'csv'
+        - store_path (str): Path of SQLite file (see `store.DataStore`) that every dataset is also upserted into.
+          Default: None
+    """
+    tasks = read_manifest(filepath=filepath)
+    print("Processing {} datasets of manifest '{}'...".format(len(tasks), filepath))
+    utils.create_global_results_folder()
+    store = DataStore(path=store_path) if store_path else None
+    try:
+        get_client().run(run_manifest_async(tasks=tasks, max_concurrency=max_concurrency, file_format=file_format,
+                                            store=store))
+    finally:
+        if store is not None:
+            store.close()
+    return None
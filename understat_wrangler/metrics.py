@@ -0,0 +1,155 @@
+import contextvars
+import functools
+import inspect
+import json
+import time
+
+STAGES = ['fetch', 'decode', 'cache', 'retry', 'extract', 'transform', 'save']
+_current_stage = contextvars.ContextVar('current_stage', default=None)
+
+
+def get_num_rows(data):
+    """ Returns number of rows/records of a DataFrame, list, or dictionary of DataFrames (None for anything else) """
+    if isinstance(data, dict) and data and all(hasattr(value, 'shape') for value in data.values()):
+        return sum(len(value) for value in data.values())
+    if isinstance(data, tuple) and all(hasattr(value, 'shape') for value in data):
+        return sum(len(value) for value in data)
+    if hasattr(data, 'shape') or isinstance(data, (list, dict)):
+        return len(data)
+    return None
+
+
+class MetricsRecorder:
+    """
+    Records metrics (duration, payload bytes, row count, cache hit, retries) of each call of the instrumented
+    extract/transform/save functions, aggregated by stage and function name.
+    Parameters:
+        - jsonl_path (str): Path of file that every record is appended to, as a JSON line. Default: None
+    """
+
+    def __init__(self, jsonl_path=None):
+        self.jsonl_path = jsonl_path
+        self.aggregates = dict()
+
+    def record(self, stage, name, seconds=0.0, num_bytes=None, num_rows=None, cache_hit=None, nested=False):
+        """ Records one call. Nested calls (eg: a transform function called by another) don't add to the stage's totals """
+        key = (stage, name)
+        if key not in self.aggregates:
+            self.aggregates[key] = {'calls': 0, 'seconds': 0.0, 'max_seconds': 0.0, 'bytes': 0, 'rows': 0,
+                                    'cache_hits': 0, 'nested_calls': 0, 'nested_seconds': 0.0, 'nested_rows': 0}
+        aggregate = self.aggregates[key]
+        aggregate['calls'] += 1
+        if nested:
+            aggregate['nested_calls'] += 1
+            aggregate['nested_seconds'] += seconds
+            aggregate['nested_rows'] += num_rows or 0
+        aggregate['seconds'] += seconds
+        aggregate['max_seconds'] = max(aggregate['max_seconds'], seconds)
+        aggregate['bytes'] += num_bytes or 0
+        aggregate['rows'] += num_rows or 0
+        aggregate['cache_hits'] += bool(cache_hit)
+        if self.jsonl_path is not None:
+            record = {'timestamp': time.time(), 'stage': stage, 'name': name, 'seconds': round(seconds, 6),
+                      'bytes': num_bytes, 'rows': num_rows, 'cache_hit': cache_hit, 'nested': nested}
+            with open(self.jsonl_path, 'a') as file:
+                file.write(json.dumps(record) + '\n')
+        return None
+
+    def get_summary(self):
+        """
+        Returns list of dictionaries (one per stage, in order of the pipeline) of the number of calls, total and
+        max seconds, bytes, rows and cache hits. Nested calls are left out of the totals.
+        Note that stages overlap: 'extract' includes 'cache', which includes 'fetch' (with its retries) and 'decode'.
+        """
+        summary = []
+        for stage in STAGES + sorted({stage for stage, _ in self.aggregates if stage not in STAGES}):
+            aggregates = [aggregate for (stage_, _), aggregate in self.aggregates.items() if stage_ == stage]
+            if not aggregates:
+                continue
+            summary.append({
+                'stage': stage,
+                'calls': sum(aggregate['calls'] - aggregate['nested_calls'] for aggregate in aggregates),
+                'seconds': sum(aggregate['seconds'] - aggregate['nested_seconds'] for aggregate in aggregates),
+                'max_seconds': max(aggregate['max_seconds'] for aggregate in aggregates),
+                'bytes': sum(aggregate['bytes'] for aggregate in aggregates),
+                'rows': sum(aggregate['rows'] - aggregate['nested_rows'] for aggregate in aggregates),
+                'cache_hits': sum(aggregate['cache_hits'] for aggregate in aggregates),
+            })
+        return summary
+
+    def print_summary(self, top=10):
+        """ Prints a summary table by stage, followed by the slowest functions (by total seconds) """
+        print("\n{:<10} {:>7} {:>10} {:>10} {:>12} {:>9} {:>10}".format('Stage', 'Calls', 'Total (s)', 'Max (s)',
+                                                                        'Bytes', 'Rows', 'CacheHits'))
+        for row in self.get_summary():
+            print("{stage:<10} {calls:>7} {seconds:>10.3f} {max_seconds:>10.3f} {bytes:>12} {rows:>9} "
+                  "{cache_hits:>10}".format(**row))
+        slowest = sorted(self.aggregates.items(), key=lambda item: item[1]['seconds'], reverse=True)[:top]
+        print("\nSlowest functions:")
+        for (stage, name), aggregate in slowest:
+            print("{:<10} {:<45} {:>7} calls {:>10.3f}s".format(stage, name, aggregate['calls'], aggregate['seconds']))
+        return None
+
+    def reset(self):
+        self.aggregates.clear()
+        return None
+
+
+_recorder = MetricsRecorder()
+
+
+def get_recorder():
+    """ Returns the process-wide MetricsRecorder """
+    return _recorder
+
+
+def configure_metrics(jsonl_path=None):
+    """ Replaces the process-wide MetricsRecorder with one that also writes JSON lines to the given file (if any) """
+    global _recorder
+    _recorder = MetricsRecorder(jsonl_path=jsonl_path)
+    return _recorder
+
+
+def record(stage, name, **kwargs):
+    """ Records one call in the process-wide MetricsRecorder (see `MetricsRecorder.record`) """
+    _recorder.record(stage=stage, name=name, **kwargs)
+    return None
+
+
+def timed(stage):
+    """
+    Decorator that records the duration and row count of each call of the (sync or async) function,
+    under the given stage (eg: 'transform').
+    """
+    def decorator(func):
+        name = func.__name__
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                nested = _current_stage.get() == stage
+                token = _current_stage.set(stage)
+                start = time.perf_counter()
+                try:
+                    result = await func(*args, **kwargs)
+                finally:
+                    _current_stage.reset(token)
+                record(stage=stage, name=name, seconds=time.perf_counter() - start, num_rows=get_num_rows(result),
+                       nested=nested)
+                return result
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            nested = _current_stage.get() == stage
+            token = _current_stage.set(stage)
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                _current_stage.reset(token)
+            record(stage=stage, name=name, seconds=time.perf_counter() - start, num_rows=get_num_rows(result),
+                   nested=nested)
+            return result
+        return wrapper
+    return decorator
@@ -0,0 +1,108 @@
+import metrics
+import asyncio
+import atexit
+import multiprocessing
+import os
+import time
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+CHUNKS_PER_WORKER = 2
+
+
+def get_chunks_of_dict(dictionary, num_chunks):
+    """ Splits dictionary into (at most) the given number of smaller dictionaries of consecutive items, in order """
+    items = list(dictionary.items())
+    chunk_size = -(-len(items) // num_chunks)
+    return [dict(items[index:index + chunk_size]) for index in range(0, len(items), chunk_size)]
+
+
+def concat_results(results):
+    """
+    Concatenates results (DataFrames, or dictionaries of DataFrames) of a batch transform on chunks of its input,
+    in order of the chunks
+    """
+    if isinstance(results[0], dict):
+        return {key: pd.concat([result[key] for result in results], ignore_index=True) for key in results[0]}
+    return pd.concat(results, ignore_index=True)
+
+
+class ProcessPool:
+    """
+    Pool of worker processes that batch transforms (of `transform`) are spread over, so that wrangling many
+    entities at once isn't limited to one core. I/O stays on the client's event loop; only the CPU-bound
+    wrangling of the already fetched data runs in the workers.
+    Parameters:
+        - max_workers (int): Number of worker processes. Default: None (number of CPUs)
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        # Workers are spawned (rather than forked), as the parent process has event loop and network threads running
+        self.executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                            mp_context=multiprocessing.get_context('spawn'))
+
+    async def map_batch_async(self, wrangle_function, dict_data_by_entity):
+        """
+        Runs the batch transform (eg: `transform.wrangle_match_players_batch`) on chunks of the given dictionary
+        of raw data by entity ID, in the worker processes, and returns the concatenation of their results
+        (in input order); i.e; the same as `wrangle_function(dict_data_by_entity)`.
+        Entities without data are left out of the chunks, as they don't add any rows.
+        """
+        dict_data_by_entity = {entity_id: data for entity_id, data in dict_data_by_entity.items() if data}
+        if not dict_data_by_entity:
+            return wrangle_function(dict_data_by_entity)
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        chunks = get_chunks_of_dict(dictionary=dict_data_by_entity, num_chunks=self.max_workers * CHUNKS_PER_WORKER)
+        futures = [loop.run_in_executor(self.executor, wrangle_function, chunk) for chunk in chunks]
+        results = concat_results(results=await asyncio.gather(*futures))
+        metrics.record(stage='transform', name=wrangle_function.__name__, seconds=time.perf_counter() - start,
+                       num_rows=metrics.get_num_rows(results))
+        return results
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        return None
+
+
+_default_pool = None
+
+
+def get_process_pool():
+    """ Returns the process-wide ProcessPool, creating it on first use """
+    global _default_pool
+    if _default_pool is None:
+        _default_pool = ProcessPool()
+    return _default_pool
+
+
+def configure_process_pool(**kwargs):
+    """
+    Replaces the process-wide ProcessPool with one created with the given keyword arguments, and returns it.
+    Usage example:
+        - configure_process_pool(max_workers=4)
+    """
+    global _default_pool
+    if _default_pool is not None:
+        _default_pool.close()
+    _default_pool = ProcessPool(**kwargs)
+    return _default_pool
+
+
+async def wrangle_batch_async(wrangle_function, dict_data_by_entity, use_processes=False):
+    """
+    Runs the batch transform on the given dictionary of raw data by entity ID; spread over the process-wide
+    ProcessPool if `use_processes` is True, or in the current process otherwise.
+    """
+    if use_processes:
+        return await get_process_pool().map_batch_async(wrangle_function=wrangle_function,
+                                                        dict_data_by_entity=dict_data_by_entity)
+    return wrangle_function(dict_data_by_entity)
+
+
+@atexit.register
+def _close_default_pool():
+    if _default_pool is not None:
+        _default_pool.close()
+    return None
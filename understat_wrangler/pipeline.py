@@ -1,69 +1,278 @@
+from client import get_client
+from parallel import wrangle_batch_async
+from ratelimit import gather_with_limit
+from store import DataStore
 import get_user_input
+import registry
+import schemas
 import utils
 import extract
 import transform
+import asyncio
+import functools
 import json
 import pandas as pd
 
 
-def get_league_fixtures_data(league_name, season, options=None):
-    """
-    Get Pandas DataFrame of upcoming league fixtures, by ['league_name', 'season']
-    """
-    json_data = extract.get_league_fixtures(league_name=league_name, season=season, options=options)
-    data_league_fixtures = transform.convert_json_to_dataframe(json_data=json_data)
+async def get_player_names_async(player_ids, max_concurrency=5):
+    """
+    Definition:
+        Gets names of the given players from the (process-wide) ID registry.
+        Players that aren't registered are looked up in their own shots-data and registered, instead of
+        raising KeyError. Their name is None if they haven't taken any shots.
+    Returns:
+        Dictionary wherein keys are player IDs (str), and values are player names.
+    """
+    players = registry.get_player_registry()
+    player_ids = [str(player_id) for player_id in player_ids]
+    player_ids_missing = [player_id for player_id in dict.fromkeys(player_ids) if player_id not in players]
+    coroutines = [extract.get_player_shots_async(player_id=player_id) for player_id in player_ids_missing]
+    list_raw_data = await gather_with_limit(coroutines=coroutines, max_concurrency=max_concurrency)
+    for player_id, raw_data in zip(player_ids_missing, list_raw_data):
+        list_of_shots = transform.parse_json(json_data=raw_data)
+        if list_of_shots:
+            players.add(id_=player_id, name=list_of_shots[0]['player'])
+    dict_player_names = {player_id: players.get_name(player_id) for player_id in player_ids}
+    return dict_player_names
+
+
+async def register_team_names_of_match_async(match_id, data_match_players, dict_shots=None):
+    """
+    Registers names of the teams of the given match in the (process-wide) ID registry, if they aren't registered
+    yet. The names are looked up in the match's shots-data, which has the names of the home/away teams.
+    The shots-data is only fetched if it isn't passed in as `dict_shots`.
+    """
+    teams = registry.get_team_registry()
+    team_ids_by_side = data_match_players.drop_duplicates(subset=['h_a']).set_index('h_a')['team_id'].to_dict()
+    if all(team_id in teams for team_id in team_ids_by_side.values()):
+        return None
+    if dict_shots is None:
+        dict_shots = transform.parse_json(json_data=await extract.get_match_shots_async(match_id=match_id))
+    list_of_shots = dict_shots['h'] + dict_shots['a']
+    if list_of_shots:
+        for h_a, team_id in team_ids_by_side.items():
+            teams.add(id_=team_id, name=list_of_shots[0][h_a + '_team'])
+    return None
+
+
+async def get_league_fixtures_data_async(league_name, season, options=None):
+    raw_data = await extract.get_league_fixtures_async(league_name=league_name, season=season, options=options)
+    data_league_fixtures = transform.convert_json_to_dataframe(json_data=raw_data)
     if data_league_fixtures.empty:
         return pd.DataFrame()
     data_league_fixtures = transform.wrangle_upcoming_fixtures(dataframe=data_league_fixtures)
-    return data_league_fixtures
+    return schemas.apply_schema(data=data_league_fixtures, name='league_fixtures')
 
 
-def get_league_players_data(league_name, season, options=None):
+def get_league_fixtures_data(league_name, season, options=None):
     """
-    Get Pandas DataFrame of stats of players in same league, by ['league_name', 'season']
+    Get Pandas DataFrame of upcoming league fixtures, by ['league_name', 'season']
     """
-    json_data = extract.get_league_players(league_name=league_name, season=season, options=options)
-    data_league_players = transform.convert_json_to_dataframe(json_data=json_data)
-    data_league_players['goals'] = data_league_players['goals'].astype(int)
-    data_league_players['assists'] = data_league_players['assists'].astype(int)
+    return get_client().run(get_league_fixtures_data_async(league_name=league_name, season=season, options=options))
+
+
+async def get_league_players_data_async(league_name, season, options=None):
+    raw_data = await extract.get_league_players_async(league_name=league_name, season=season, options=options)
+    data_league_players = transform.convert_json_to_dataframe(json_data=raw_data)
+    data_league_players = schemas.apply_schema(data=data_league_players, name='league_players')
     data_league_players = data_league_players.sort_values(by=['goals', 'assists'], ascending=[False, False])\
                                              .reset_index(drop=True)
     return data_league_players
 
 
+def get_league_players_data(league_name, season, options=None):
+    """
+    Get Pandas DataFrame of stats of players in same league, by ['league_name', 'season']
+    """
+    return get_client().run(get_league_players_data_async(league_name=league_name, season=season, options=options))
+
+
+async def get_league_results_data_async(league_name, season, options=None):
+    raw_data = await extract.get_league_results_async(league_name=league_name, season=season, options=options)
+    data_league_results = transform.convert_json_to_dataframe(json_data=raw_data)
+    data_league_results = transform.wrangle_results(dataframe=data_league_results)
+    return schemas.apply_schema(data=data_league_results, name='league_results')
+
+
 def get_league_results_data(league_name, season, options=None):
     """
     Get Pandas DataFrame of all results (so far) of games in same league, by ['league_name', 'season']
     """
-    json_data = extract.get_league_results(league_name=league_name, season=season, options=options)
-    data_league_results = transform.convert_json_to_dataframe(json_data=json_data)
-    data_league_results = transform.wrangle_results(dataframe=data_league_results)
-    return data_league_results
+    return get_client().run(get_league_results_data_async(league_name=league_name, season=season, options=options))
+
+
+async def get_match_players_data_async(match_id, options=None):
+    raw_data = await extract.get_match_players_async(match_id=match_id, options=options)
+    dict_data = transform.parse_json(json_data=raw_data)
+    data_match_players = transform.wrangle_match_players(dict_data=dict_data)
+    data_match_players['match_id'] = match_id
+    await register_team_names_of_match_async(match_id=match_id, data_match_players=data_match_players)
+    data_match_players['team_name'] = registry.get_team_registry().get_names(ids=data_match_players['team_id'])
+    return schemas.apply_schema(data=data_match_players, name='match_players')
 
 
 def get_match_players_data(match_id, options=None):
     """
     Get Pandas DataFrame of stats of all players in a particular match, by ['match_id']
     """
-    json_data = extract.get_match_players(match_id=match_id, options=options)
-    dict_data = transform.parse_json(json_data=json_data)
-    data_match_players = transform.wrangle_match_players(dict_data=dict_data)
-    data_match_players['match_id'] = match_id
-    team_ids_all = utils.pickle_load(filename='ids_of_teams.pkl')
-    team_ids = data_match_players['team_id'].astype(str).unique().tolist()
-    data_match_players.loc[data_match_players['team_id'] == team_ids[0], 'team_name'] = team_ids_all[team_ids[0]]
-    data_match_players.loc[data_match_players['team_id'] == team_ids[1], 'team_name'] = team_ids_all[team_ids[1]]
-    return data_match_players
+    return get_client().run(get_match_players_data_async(match_id=match_id, options=options))
+
+
+async def get_match_shots_data_async(match_id, options=None):
+    raw_data = await extract.get_match_shots_async(match_id=match_id, options=options)
+    dict_data = transform.parse_json(json_data=raw_data)
+    data_match_shots = transform.wrangle_match_shots(dict_data=dict_data)
+    return schemas.apply_schema(data=data_match_shots, name='match_shots')
 
 
 def get_match_shots_data(match_id, options=None):
     """
     Get Pandas DataFrame of shots-data of all players in a particular match, by ['match_id']
     """
-    json_data = extract.get_match_shots(match_id=match_id, options=options)
-    dict_data = transform.parse_json(json_data=json_data)
-    data_match_shots = transform.wrangle_match_shots(dict_data=dict_data)
-    return data_match_shots
+    return get_client().run(get_match_shots_data_async(match_id=match_id, options=options))
+
+
+async def wrangle_match_players_batch_data_async(dict_data_by_match, max_concurrency=5, dict_shots_by_match=None,
+                                                 use_processes=False):
+    """
+    Wrangles raw match players data of many matches (keyed by match ID) into one DataFrame, with the teams' names.
+    Names of teams that aren't registered are looked up in the matches' shots-data (fetched if not passed in).
+    The wrangling is spread over the process pool (see `parallel.py`) if `use_processes` is True.
+    """
+    data_match_players = await wrangle_batch_async(wrangle_function=transform.wrangle_match_players_batch,
+                                                   dict_data_by_entity=dict_data_by_match,
+                                                   use_processes=use_processes)
+    if data_match_players.empty:
+        return pd.DataFrame()
+    dict_shots_by_match = dict_shots_by_match or {}
+    coroutines = [register_team_names_of_match_async(match_id=match_id,
+                                                     data_match_players=data_by_match,
+                                                     dict_shots=dict_shots_by_match.get(match_id))
+                  for match_id, data_by_match in data_match_players.groupby(by='match_id', sort=False)]
+    await gather_with_limit(coroutines=coroutines, max_concurrency=max_concurrency)
+    data_match_players['team_name'] = registry.get_team_registry().get_names(ids=data_match_players['team_id'])
+    return schemas.apply_schema(data=data_match_players, name='match_players')
+
+
+async def get_match_players_batch_data_async(match_ids, max_concurrency=5, use_processes=False):
+    match_ids = [str(match_id) for match_id in match_ids]
+    coroutines = [extract.get_match_players_async(match_id=match_id) for match_id in match_ids]
+    list_raw_data = await gather_with_limit(coroutines=coroutines, max_concurrency=max_concurrency)
+    dict_data_by_match = {match_id: transform.parse_json(json_data=raw_data)
+                          for match_id, raw_data in zip(match_ids, list_raw_data)}
+    data_match_players = await wrangle_match_players_batch_data_async(dict_data_by_match=dict_data_by_match,
+                                                                      max_concurrency=max_concurrency,
+                                                                      use_processes=use_processes)
+    return data_match_players
+
+
+def get_match_players_batch_data(match_ids, max_concurrency=5, use_processes=False):
+    """
+    Get Pandas DataFrame of stats of all players in many matches at once, by ['match_ids'].
+    The matches' data is fetched concurrently (at most `max_concurrency` at a time), and stacked into one
+    DataFrame keyed by 'match_id'. Pass `use_processes=True` to spread the wrangling over all cores.
+    """
+    return get_client().run(get_match_players_batch_data_async(match_ids=match_ids,
+                                                               max_concurrency=max_concurrency,
+                                                               use_processes=use_processes))
+
+
+async def get_match_shots_batch_data_async(match_ids, max_concurrency=5, use_processes=False):
+    match_ids = [str(match_id) for match_id in match_ids]
+    coroutines = [extract.get_match_shots_async(match_id=match_id) for match_id in match_ids]
+    list_raw_data = await gather_with_limit(coroutines=coroutines, max_concurrency=max_concurrency)
+    dict_data_by_match = {match_id: transform.parse_json(json_data=raw_data)
+                          for match_id, raw_data in zip(match_ids, list_raw_data)}
+    data_match_shots = await wrangle_batch_async(wrangle_function=transform.wrangle_match_shots_batch,
+                                                 dict_data_by_entity=dict_data_by_match,
+                                                 use_processes=use_processes)
+    return schemas.apply_schema(data=data_match_shots, name='match_shots')
+
+
+def get_match_shots_batch_data(match_ids, max_concurrency=5, use_processes=False):
+    """
+    Get Pandas DataFrame of shots-data of all players in many matches at once, by ['match_ids'].
+    The matches' data is fetched concurrently (at most `max_concurrency` at a time), and stacked into one
+    DataFrame keyed by 'match_id'. Pass `use_processes=True` to spread the wrangling over all cores.
+    """
+    return get_client().run(get_match_shots_batch_data_async(match_ids=match_ids,
+                                                             max_concurrency=max_concurrency,
+                                                             use_processes=use_processes))
+
+
+async def get_played_match_ids_async(league_name, season):
+    """ Gets list of IDs (str) of all matches played (so far) in the given league and season, in order of date """
+    raw_data = await extract.get_league_results_async(league_name=league_name, season=season)
+    list_of_results = transform.parse_json(json_data=raw_data)
+    match_ids = [str(result['id']) for result in sorted(list_of_results, key=lambda result: result['datetime'])]
+    return match_ids
+
+
+async def get_match_raw_data_async(match_id):
+    """
+    Gets tuple of raw data (players, shots) of the given match. Both are requested at once, so that they're
+    decoded from one fetch of the match page (see `UnderstatClient.get_page`).
+    """
+    raw_players, raw_shots = await asyncio.gather(extract.get_match_players_async(match_id=match_id),
+                                                  extract.get_match_shots_async(match_id=match_id))
+    return raw_players, raw_shots
+
+
+async def get_matches_data_async(match_ids, max_concurrency=5, use_processes=False):
+    """
+    Gets tuple of 2 Pandas DataFrames (match players, match shots) of the given matches, keyed by 'match_id'.
+    Players and shots of each match are read from one fetch of its page, and matches are fetched concurrently
+    (at most `max_concurrency` at a time).
+    The wrangling is spread over the process pool (see `parallel.py`) if `use_processes` is True.
+    """
+    match_ids = [str(match_id) for match_id in match_ids]
+    coroutines = [get_match_raw_data_async(match_id=match_id) for match_id in match_ids]
+    list_raw_data = await gather_with_limit(coroutines=coroutines, max_concurrency=max_concurrency)
+    dict_players_by_match = {match_id: transform.parse_json(json_data=raw_players)
+                             for match_id, (raw_players, _) in zip(match_ids, list_raw_data)}
+    dict_shots_by_match = {match_id: transform.parse_json(json_data=raw_shots)
+                           for match_id, (_, raw_shots) in zip(match_ids, list_raw_data)}
+    data_match_players = await wrangle_match_players_batch_data_async(dict_data_by_match=dict_players_by_match,
+                                                                      max_concurrency=max_concurrency,
+                                                                      dict_shots_by_match=dict_shots_by_match,
+                                                                      use_processes=use_processes)
+    data_match_shots = await wrangle_batch_async(wrangle_function=transform.wrangle_match_shots_batch,
+                                                 dict_data_by_entity=dict_shots_by_match,
+                                                 use_processes=use_processes)
+    return data_match_players, schemas.apply_schema(data=data_match_shots, name='match_shots')
+
+
+async def get_league_season_matches_data_async(league_name, season, max_concurrency=5, use_processes=False):
+    match_ids = await get_played_match_ids_async(league_name=league_name, season=season)
+    if not match_ids:
+        return pd.DataFrame(), pd.DataFrame()
+    data_match_players, data_match_shots = await get_matches_data_async(match_ids=match_ids,
+                                                                        max_concurrency=max_concurrency,
+                                                                        use_processes=use_processes)
+    return data_match_players, data_match_shots
+
+
+def get_league_season_matches_data(league_name, season, max_concurrency=5, use_processes=False):
+    """
+    Get tuple of 2 Pandas DataFrames (match players, match shots) of all matches played (so far) in a league season,
+    by ['league_name', 'season']. The match IDs are taken from the league's results, and the matches' data is
+    fetched concurrently (at most `max_concurrency` requests at a time). Both DataFrames are keyed by 'match_id'.
+    Pass `use_processes=True` to spread the wrangling over all cores.
+    """
+    return get_client().run(get_league_season_matches_data_async(league_name=league_name,
+                                                                 season=season,
+                                                                 max_concurrency=max_concurrency,
+                                                                 use_processes=use_processes))
+
+
+async def get_player_grouped_stats_data_async(player_id):
+    raw_data = await extract.get_player_grouped_stats_async(player_id=player_id)
+    parsed_dict_data = transform.parse_json(json_data=raw_data)
+    dict_player_grouped_stats_clean = transform.wrangle_player_grouped_stats(dict_player_grouped_stats=parsed_dict_data)
+    player_name = (await get_player_names_async(player_ids=[player_id]))[str(player_id)]
+    for _, df_by_substat in dict_player_grouped_stats_clean.items():
+        df_by_substat['PlayerName'] = player_name
+    return schemas.apply_schema(data=dict_player_grouped_stats_clean, name='player_grouped_stats')
 
 
 def get_player_grouped_stats_data(player_id):
@@ -71,67 +280,114 @@ def get_player_grouped_stats_data(player_id):
     Get dictionary of various stats of particular player, by ['player_id'].
     Includes multiple substats such as ['season', 'position', 'situation', 'shotZones', 'shotTypes']
     """
-    json_data = extract.get_player_grouped_stats(player_id=player_id)
-    parsed_dict_data = transform.parse_json(json_data=json_data)
-    dict_player_grouped_stats_clean = transform.wrangle_player_grouped_stats(dict_player_grouped_stats=parsed_dict_data)
-    player_ids_all = utils.pickle_load(filename='ids_of_players.pkl')
-    player_name = player_ids_all[str(player_id)]
+    return get_client().run(get_player_grouped_stats_data_async(player_id=player_id))
+
+
+async def get_player_grouped_stats_batch_data_async(player_ids, max_concurrency=5, use_processes=False):
+    coroutines = [extract.get_player_grouped_stats_async(player_id=player_id) for player_id in player_ids]
+    list_raw_data = await gather_with_limit(coroutines=coroutines, max_concurrency=max_concurrency)
+    dict_data_by_player = {str(player_id): transform.parse_json(json_data=raw_data)
+                           for player_id, raw_data in zip(player_ids, list_raw_data)}
+    dict_player_grouped_stats_clean = await wrangle_batch_async(
+        wrangle_function=transform.wrangle_player_grouped_stats_batch,
+        dict_data_by_entity=dict_data_by_player,
+        use_processes=use_processes)
+    dict_player_names = await get_player_names_async(player_ids=player_ids, max_concurrency=max_concurrency)
     for _, df_by_substat in dict_player_grouped_stats_clean.items():
-        df_by_substat['PlayerName'] = player_name
-    return dict_player_grouped_stats_clean
+        df_by_substat['PlayerName'] = df_by_substat['player_id'].map(dict_player_names)
+    return schemas.apply_schema(data=dict_player_grouped_stats_clean, name='player_grouped_stats')
 
 
-def get_player_matches_data(player_id, options=None):
+def get_player_grouped_stats_batch_data(player_ids, max_concurrency=5, use_processes=False):
     """
-    Get Pandas DataFrame of stats of particular player in all matches he's played, by ['player_id']
+    Get dictionary of various stats of many players at once, by ['player_ids'].
+    The players' data is fetched concurrently (at most `max_concurrency` at a time).
+    Includes multiple substats such as ['season', 'position', 'situation', 'shotZones', 'shotTypes'],
+    each of which is a long-format DataFrame keyed by 'player_id'.
+    Pass `use_processes=True` to spread the wrangling over all cores.
     """
-    json_data = extract.get_player_matches(player_id=player_id, options=options)
-    list_of_matches = transform.parse_json(json_data=json_data)
+    return get_client().run(get_player_grouped_stats_batch_data_async(player_ids=player_ids,
+                                                                      max_concurrency=max_concurrency,
+                                                                      use_processes=use_processes))
+
+
+async def get_player_matches_data_async(player_id, options=None):
+    raw_data = await extract.get_player_matches_async(player_id=player_id, options=options)
+    list_of_matches = transform.parse_json(json_data=raw_data)
     data_player_matches = transform.wrangle_list_to_dataframe(list_data=list_of_matches)
-    player_ids_all = utils.pickle_load(filename='ids_of_players.pkl')
-    player_name = player_ids_all[str(player_id)]
+    player_name = (await get_player_names_async(player_ids=[player_id]))[str(player_id)]
     data_player_matches['PlayerName'] = player_name
-    return data_player_matches
+    return schemas.apply_schema(data=data_player_matches, name='player_matches')
 
 
-def get_player_shots_data(player_id, options=None):
+def get_player_matches_data(player_id, options=None):
     """
-    Get Pandas DataFrame of shots-data of particular player in all matches he's played, by ['player_id']
+    Get Pandas DataFrame of stats of particular player in all matches he's played, by ['player_id']
     """
-    json_data = extract.get_player_shots(player_id=player_id, options=options)
-    list_of_matches = transform.parse_json(json_data=json_data)
+    return get_client().run(get_player_matches_data_async(player_id=player_id, options=options))
+
+
+async def get_player_shots_data_async(player_id, options=None):
+    raw_data = await extract.get_player_shots_async(player_id=player_id, options=options)
+    list_of_matches = transform.parse_json(json_data=raw_data)
     data_player_shots = transform.wrangle_list_to_dataframe(list_data=list_of_matches)
-    return data_player_shots
+    return schemas.apply_schema(data=data_player_shots, name='player_shots')
 
 
-def get_player_stats_data(player_id, positions=None):
+def get_player_shots_data(player_id, options=None):
     """
-    Get Pandas DataFrame of max, min, avg stats of player over the seasons, by ['player_id']
+    Get Pandas DataFrame of shots-data of particular player in all matches he's played, by ['player_id']
     """
-    json_data = extract.get_player_stats(player_id=player_id, positions=positions)
-    list_of_matches = transform.parse_json(json_data=json_data)
+    return get_client().run(get_player_shots_data_async(player_id=player_id, options=options))
+
+
+async def get_player_stats_data_async(player_id, positions=None):
+    raw_data = await extract.get_player_stats_async(player_id=player_id, positions=positions)
+    list_of_matches = transform.parse_json(json_data=raw_data)
     data_player_stats = transform.wrangle_list_to_dataframe(list_data=list_of_matches)
     data_player_stats = transform.wrangle_max_min_avg(dataframe=data_player_stats)
-    player_ids_all = utils.pickle_load(filename='ids_of_players.pkl')
-    player_name = player_ids_all[str(player_id)]
+    player_name = (await get_player_names_async(player_ids=[player_id]))[str(player_id)]
     data_player_stats['PlayerName'] = player_name
-    return data_player_stats
+    return schemas.apply_schema(data=data_player_stats, name='player_stats')
 
 
-def get_stats_data(sort_by_date=False, options=None):
+def get_player_stats_data(player_id, positions=None):
     """
-    Get Pandas DataFrame of all league stats in the top 5 leagues, over time.
-    Parameters:
-        - sort_by_date (bool): Sort data by league names if False. Sort data by dates if True. Default: False
-        - options (dict): options to filter out data to extract
-    NOTE: Can be used for time-series analysis.
+    Get Pandas DataFrame of max, min, avg stats of player over the seasons, by ['player_id']
     """
-    json_data = extract.get_stats(options=options)
-    list_of_stats = transform.parse_json(json_data=json_data)
-    data_stats = transform.wrangle_list_to_dataframe(list_data=list_of_stats)
+    return get_client().run(get_player_stats_data_async(player_id=player_id, positions=positions))
+
+
+async def get_player_stats_batch_data_async(player_ids, positions=None, max_concurrency=5, use_processes=False):
+    coroutines = [extract.get_player_stats_async(player_id=player_id, positions=positions) for player_id in player_ids]
+    list_raw_data = await gather_with_limit(coroutines=coroutines, max_concurrency=max_concurrency)
+    dict_data_by_player = {str(player_id): transform.parse_json(json_data=raw_data)
+                           for player_id, raw_data in zip(player_ids, list_raw_data)}
+    data_player_stats = await wrangle_batch_async(wrangle_function=transform.wrangle_player_stats_batch,
+                                                  dict_data_by_entity=dict_data_by_player,
+                                                  use_processes=use_processes)
+    dict_player_names = await get_player_names_async(player_ids=player_ids, max_concurrency=max_concurrency)
+    data_player_stats['PlayerName'] = data_player_stats['player_id'].map(dict_player_names)
+    return schemas.apply_schema(data=data_player_stats, name='player_stats')
+
+
+def get_player_stats_batch_data(player_ids, positions=None, max_concurrency=5, use_processes=False):
+    """
+    Get Pandas DataFrame of max, min, avg stats of many players (eg: a whole squad) over the seasons, by ['player_ids'].
+    The players' data is fetched concurrently (at most `max_concurrency` at a time), and stacked into one
+    DataFrame keyed by 'player_id'. Pass `use_processes=True` to spread the wrangling over all cores.
+    """
+    return get_client().run(get_player_stats_batch_data_async(player_ids=player_ids,
+                                                              positions=positions,
+                                                              max_concurrency=max_concurrency,
+                                                              use_processes=use_processes))
+
 
-    data_stats['year'] = data_stats['year'].astype(int)
-    data_stats['month'] = data_stats['month'].astype(int)
+async def get_stats_data_async(sort_by_date=False, options=None):
+    raw_data = await extract.get_stats_async(options=options)
+    list_of_stats = transform.parse_json(json_data=raw_data)
+    data_stats = transform.wrangle_list_to_dataframe(list_data=list_of_stats)
+    data_stats = schemas.apply_schema(data=data_stats, name='stats')
     data_stats = data_stats.sort_values(by=['league', 'year', 'month'], ascending=[True, True, True])\
                            .reset_index(drop=True)
     
@@ -142,15 +398,25 @@ def get_stats_data(sort_by_date=False, options=None):
     return data_stats
 
 
-def get_team_fixtures_data(team_name, season):
+def get_stats_data(sort_by_date=False, options=None):
     """
-    Get Pandas DataFrame of upcoming league fixtures for a particular team, by ['team_name', 'season']
+    Get Pandas DataFrame of all league stats in the top 5 leagues, over time.
+    Parameters:
+        - sort_by_date (bool): Sort data by league names if False. Sort data by dates if True. Default: False
+        - options (dict): options to filter out data to extract
+    NOTE: Can be used for time-series analysis.
     """
+    return get_client().run(get_stats_data_async(sort_by_date=sort_by_date, options=options))
+
+
+async def get_team_fixtures_data_async(team_name, season):
     data_new = pd.DataFrame()
-    json_upcoming_fixtures_home = extract.get_team_fixtures(team_name=team_name, season=season, side='h')
-    json_upcoming_fixtures_away = extract.get_team_fixtures(team_name=team_name, season=season, side='a')
-    list_of_matches_home = transform.parse_json(json_data=json_upcoming_fixtures_home)
-    list_of_matches_away = transform.parse_json(json_data=json_upcoming_fixtures_away)
+    raw_upcoming_fixtures_home, raw_upcoming_fixtures_away = await asyncio.gather(
+        extract.get_team_fixtures_async(team_name=team_name, season=season, side='h'),
+        extract.get_team_fixtures_async(team_name=team_name, season=season, side='a')
+    )
+    list_of_matches_home = transform.parse_json(json_data=raw_upcoming_fixtures_home)
+    list_of_matches_away = transform.parse_json(json_data=raw_upcoming_fixtures_away)
     list_of_matches = list_of_matches_home + list_of_matches_away
     data = transform.wrangle_list_to_dataframe(list_data=list_of_matches)
     if data.empty:
@@ -158,27 +424,35 @@ def get_team_fixtures_data(team_name, season):
     data_new = transform.wrangle_upcoming_fixtures(dataframe=data)
     data_new['h_a'] = data['side']
     data_new['TeamOfInterest'] = team_name
-    return data_new
+    return schemas.apply_schema(data=data_new, name='team_fixtures')
 
 
-def get_team_players_data(team_name, season, options=None):
+def get_team_fixtures_data(team_name, season):
     """
-    Get Pandas DataFrame of stats of players for a particular team, by ['team_name', 'season']
+    Get Pandas DataFrame of upcoming league fixtures for a particular team, by ['team_name', 'season']
     """
-    json_data = extract.get_team_players(team_name=team_name, season=season, options=options)
-    list_of_players = transform.parse_json(json_data=json_data)
+    return get_client().run(get_team_fixtures_data_async(team_name=team_name, season=season))
+
+
+async def get_team_players_data_async(team_name, season, options=None):
+    raw_data = await extract.get_team_players_async(team_name=team_name, season=season, options=options)
+    list_of_players = transform.parse_json(json_data=raw_data)
     data_team_players = transform.wrangle_list_to_dataframe(list_data=list_of_players)
     data_team_players['season'] = season
-    return data_team_players
+    return schemas.apply_schema(data=data_team_players, name='team_players')
 
 
-def get_team_results_data(team_name, season, options=None):
+def get_team_players_data(team_name, season, options=None):
     """
-    Get Pandas DataFrame of stats of results for a particular team, by ['team_name', 'season']
+    Get Pandas DataFrame of stats of players for a particular team, by ['team_name', 'season']
     """
+    return get_client().run(get_team_players_data_async(team_name=team_name, season=season, options=options))
+
+
+async def get_team_results_data_async(team_name, season, options=None):
     data_team_results = pd.DataFrame()
-    json_data = extract.get_team_results(team_name=team_name, season=season, options=options)
-    list_of_matches = transform.parse_json(json_data=json_data)
+    raw_data = await extract.get_team_results_async(team_name=team_name, season=season, options=options)
+    list_of_matches = transform.parse_json(json_data=raw_data)
     data = transform.wrangle_list_to_dataframe(list_data=list_of_matches)
     data_team_results = transform.wrangle_results(dataframe=data)    
     data_team_results['h_a'] = data['side']
@@ -190,110 +464,251 @@ def get_team_results_data(team_name, season, options=None):
     data_team_results['TeamOfInterest'] = team_name
     data_team_results['season'] = season
     data_team_results.sort_values(by='datetime', ascending=True, inplace=True)
-    return data_team_results
+    return schemas.apply_schema(data=data_team_results, name='team_results')
 
 
-def get_team_stats_data(team_name, season):
+def get_team_results_data(team_name, season, options=None):
     """
-    Get dictionary of stats of results for a particular team, by ['team_name', 'season']
+    Get Pandas DataFrame of stats of results for a particular team, by ['team_name', 'season']
     """
-    json_data = extract.get_team_stats(team_name=team_name, season=season)
-    dict_data = transform.parse_json(json_data=json_data)
+    return get_client().run(get_team_results_data_async(team_name=team_name, season=season, options=options))
+
+
+async def get_team_stats_data_async(team_name, season):
+    raw_data = await extract.get_team_stats_async(team_name=team_name, season=season)
+    dict_data = transform.parse_json(json_data=raw_data)
     dict_team_stats = transform.wrangle_team_stats(dict_raw_team_stats=dict_data,
                                                    team_name=team_name,
                                                    season=season)    
-    return dict_team_stats
+    return schemas.apply_schema(data=dict_team_stats, name='team_stats')
 
 
-def get_teams_data(league_name, season, options=None):
+def get_team_stats_data(team_name, season):
     """
-    Get Pandas DataFrame of just 'id', 'title' columns - Indicating the TeamIDs
+    Get dictionary of stats of results for a particular team, by ['team_name', 'season']
     """
-    json_data = extract.get_teams(league_name=league_name, season=season, options=options)
-    list_data = transform.parse_json(json_data=json_data)
+    return get_client().run(get_team_stats_data_async(team_name=team_name, season=season))
+
+
+async def get_teams_data_async(league_name, season, options=None):
+    raw_data = await extract.get_teams_async(league_name=league_name, season=season, options=options)
+    list_data = transform.parse_json(json_data=raw_data)
     data_teams = pd.DataFrame(data=list_data)
     data_teams = data_teams.loc[:, ['id', 'title']]
-    return data_teams
+    return schemas.apply_schema(data=data_teams, name='teams')
+
+
+def get_teams_data(league_name, season, options=None):
+    """
+    Get Pandas DataFrame of just 'id', 'title' columns - Indicating the TeamIDs
+    """
+    return get_client().run(get_teams_data_async(league_name=league_name, season=season, options=options))
+
+
+
+# Entity (of the `ENTITY_ARGUMENTS`) that each dataset of the pipeline is fetched for
+DATASET_ENTITIES = {
+    'upcoming_league_fixtures': 'league',
+    'league_players': 'league',
+    'league_results': 'league',
+    'match_players': 'match',
+    'match_shots': 'match',
+    'player_grouped_stats': 'player',
+    'player_matches': 'player',
+    'player_shots': 'player',
+    'player_stats': 'player',
+    'stats': 'stats',
+    'upcoming_team_fixtures': 'team',
+    'team_players': 'team',
+    'team_results': 'team',
+    'team_stats': 'team',
+}
+ENTITY_ARGUMENTS = {
+    'league': ['league_name', 'season'],
+    'match': ['match_id'],
+    'player': ['player_id'],
+    'stats': [],
+    'team': ['team_name', 'season'],
+}
+DATASET_FILENAMES = {
+    'upcoming_league_fixtures': 'Upcoming league fixtures - {season_to_store} - {league_name}',
+    'league_players': 'League players - {season_to_store} - {league_name}',
+    'league_results': 'League results - {season_to_store} - {league_name}',
+    'match_players': 'Match players - MatchID{match_id}',
+    'match_shots': 'Match shots - MatchID{match_id}',
+    'player_grouped_stats': 'Player grouped stats - {player_id}{player_name}',
+    'player_matches': 'Player matches - {player_id}{player_name}',
+    'player_shots': 'Player shots - {player_id}{player_name}',
+    'player_stats': 'Player stats - {player_id}{player_name}',
+    'stats': 'All league stats - TimeSeries',
+    'upcoming_team_fixtures': 'Upcoming team fixtures - {season_to_store} - {team_name}',
+    'team_players': 'Team players - {season_to_store} - {team_name}',
+    'team_results': 'Team results - {season_to_store} - {team_name}',
+    'team_stats': 'Team stats - {season_to_store} - {team_name}',
+}
+
+
+def get_dataset_coroutine_function(stat, arguments):
+    """
+    Returns coroutine function (without parameters) that fetches and wrangles the given dataset, for the given
+    arguments of its entity (eg: {'league_name': 'EPL', 'season': 2020})
+    """
+    dict_functions = {
+        'upcoming_league_fixtures': get_league_fixtures_data_async,
+        'league_players': get_league_players_data_async,
+        'league_results': get_league_results_data_async,
+        'match_players': get_match_players_data_async,
+        'match_shots': get_match_shots_data_async,
+        'player_grouped_stats': get_player_grouped_stats_data_async,
+        'player_matches': get_player_matches_data_async,
+        'player_shots': get_player_shots_data_async,
+        'player_stats': get_player_stats_data_async,
+        'stats': functools.partial(get_stats_data_async, sort_by_date=False),
+        'upcoming_team_fixtures': get_team_fixtures_data_async,
+        'team_players': get_team_players_data_async,
+        'team_results': get_team_results_data_async,
+        'team_stats': get_team_stats_data_async,
+    }
+    return functools.partial(dict_functions[stat], **arguments)
 
 
+def get_dataset_filename(stat, arguments, player_name=''):
+    """ Returns storage name of file of the given dataset (eg: 'League results - 2020-21 - EPL') """
+    season_to_store = None
+    if 'season' in arguments:
+        season = int(arguments['season'])
+        season_to_store = f"{str(season)}-{str(season + 1)[2:]}"
+    return DATASET_FILENAMES[stat].format(season_to_store=season_to_store, player_name=player_name, **arguments)
 
-def execute_pipeline():
+
+def get_dataset_scope(stat, arguments):
+    """ Returns scope of the given dataset, i.e; the rows that are replaced when it's upserted into the store """
+    entity = DATASET_ENTITIES[stat]
+    if entity == 'league':
+        return {'league': arguments['league_name'], 'season': arguments['season']}
+    if entity == 'team':
+        return {'team': arguments['team_name'], 'season': arguments['season']}
+    return dict(arguments)
+
+
+def save_dataset(data, name, file_format='csv', store=None, stat=None, scope=None):
+    """
+    Saves dataset to CSV/Parquet/Feather file(s) in the global results folder.
+    Datasets that are dictionaries of DataFrames (eg: 'team_stats') are saved as one file per sub-stat.
+    Empty DataFrames are skipped.
+    If a DataStore is given, the dataset is also upserted into its table named after the stat, replacing
+    the rows of the given scope (eg: {'match_id': '310'}).
+    """
+    if store is not None:
+        store.upsert(name=stat, data=data, scope=scope)
+    if isinstance(data, dict):
+        for sub_stat, sub_df in data.items():
+            if not sub_df.empty:
+                utils.save_data(dataframe=sub_df, name=name + f" - {sub_stat}", file_format=file_format)
+    elif not data.empty:
+        utils.save_data(dataframe=data, name=name, file_format=file_format)
+    return None
+
+
+def report_dataset_error(stat, name, error):
+    """ Prints out the error of a dataset that failed to be fetched, wrangled or saved """
+    print("Problem with stat: {} ({}) --> ErrorMsg: {}".format(stat, name, error))
+    return None
+
+
+async def fetch_and_save_dataset_async(stat, coroutine_function, name, semaphore, file_format='csv', store=None,
+                                       scope=None):
+    """
+    Fetches and wrangles dataset (while holding the semaphore), and saves it as soon as it's ready.
+    Errors are printed out rather than raised, so that one failing stat doesn't affect the others.
+    """
+    try:
+        async with semaphore:
+            data = await coroutine_function()
+        save_dataset(data=data, name=name, file_format=file_format, store=store, stat=stat, scope=scope)
+    except Exception as e:
+        report_dataset_error(stat=stat, name=name, error=e)
+    return None
+
+
+async def execute_concurrently_async(dict_coroutine_functions, dict_filenames_to_store, max_concurrency,
+                                     file_format='csv', store=None, dict_scopes=None):
+    dict_scopes = dict_scopes or dict()
+    semaphore = asyncio.Semaphore(max_concurrency)
+    tasks = [fetch_and_save_dataset_async(stat=stat,
+                                          coroutine_function=coroutine_function,
+                                          name=dict_filenames_to_store[stat],
+                                          semaphore=semaphore,
+                                          file_format=file_format,
+                                          store=store,
+                                          scope=dict_scopes.get(stat)) for stat, coroutine_function in dict_coroutine_functions.items()]
+    await asyncio.gather(*tasks)
+    return None
+
+
+def execute_pipeline(concurrent=False, max_concurrency=5, file_format=None, store_path=None):
     """
     Function that executes the entire pipeline of the following:
         - Extraction of raw JSON data
         - Transformation of raw JSON data into human readable/understandable Excel/CSV files
-        - Storage of these Excel/CSV files into a results folder
+        - Storage of these Excel/CSV (or Parquet/Feather) files into a results folder
+    Parameters:
+        - concurrent (bool): Fetch all datasets together on one event loop if True; one after another if False.
+          In concurrent mode, each dataset is wrangled and stored as soon as its fetch finishes. Default: False
+        - max_concurrency (int): Maximum number of datasets being fetched at once, in concurrent mode. Default: 5
+        - file_format (str): Options: ['csv', 'parquet', 'feather']. If None, it's read from the 'file_format'
+          entry of 'user_inputs.csv' (falling back to 'csv'). Default: None
+        - store_path (str): Path of SQLite file (see `store.DataStore`) that every dataset is also upserted into.
+          If None, it's read from the 'store_path' entry of 'user_inputs.csv' (if any). Default: None
     """
     print("Processing...")
     dict_user_input = get_user_input.read_user_input()
 
     season = int(dict_user_input['season'])
-    season_to_store = f"{str(season)}-{str(season + 1)[2:]}"
     league_name = dict_user_input['league_name']
     team_name = dict_user_input['team_name']
     match_id = str(dict_user_input['match_id'])
     player_id = str(dict_user_input['player_id'])
-    
-    player_ids_all = utils.pickle_load(filename='ids_of_players.pkl')
-    player_name = player_ids_all[player_id].replace(' ', '')
-    options = None
-    positions = None
-
-    dict_function_calls = {
-        'upcoming_league_fixtures': get_league_fixtures_data(league_name=league_name,
-                                                             season=season,
-                                                             options=options),
-        'league_players': get_league_players_data(league_name=league_name,
-                                                  season=season,
-                                                  options=options),
-        'league_results': get_league_results_data(league_name=league_name,
-                                                  season=season,
-                                                  options=options),
-        'match_players': get_match_players_data(match_id=match_id, options=options),
-        'match_shots': get_match_shots_data(match_id=match_id, options=options),
-        'player_grouped_stats': get_player_grouped_stats_data(player_id=player_id),
-        'player_matches': get_player_matches_data(player_id=player_id, options=options),
-        'player_shots': get_player_shots_data(player_id=player_id, options=options),
-        'player_stats': get_player_stats_data(player_id=player_id, positions=positions),
-        'stats': get_stats_data(sort_by_date=False, options=options),
-        'upcoming_team_fixtures': get_team_fixtures_data(team_name=team_name, season=season),
-        'team_players': get_team_players_data(team_name=team_name, season=season, options=options),
-        'team_results': get_team_results_data(team_name=team_name, season=season, options=options),
-        'team_stats': get_team_stats_data(team_name=team_name, season=season)
-    }
-
-    dict_filenames_to_store = {
-        'upcoming_league_fixtures': f'Upcoming league fixtures - {season_to_store} - {league_name}',
-        'league_players': f'League players - {season_to_store} - {league_name}',
-        'league_results': f'League results - {season_to_store} - {league_name}',
-        'match_players': f'Match players - MatchID{match_id}',
-        'match_shots': f'Match shots - MatchID{match_id}',
-        'player_grouped_stats': f'Player grouped stats - {player_id}{player_name}',
-        'player_matches': f'Player matches - {player_id}{player_name}',
-        'player_shots': f'Player shots - {player_id}{player_name}',
-        'player_stats': f'Player stats - {player_id}{player_name}',
-        'stats': f'All league stats - TimeSeries',
-        'upcoming_team_fixtures': f'Upcoming team fixtures - {season_to_store} - {team_name}',
-        'team_players': f'Team players - {season_to_store} - {team_name}',
-        'team_results': f'Team results - {season_to_store} - {team_name}',
-        'team_stats': f'Team stats - {season_to_store} - {team_name}'
+    file_format = file_format or dict_user_input.get('file_format', 'csv')
+    store_path = store_path or dict_user_input.get('store_path')
+
+    player_name = get_client().run(get_player_names_async(player_ids=[player_id]))[player_id]
+    player_name = (player_name or '').replace(' ', '')
+    dict_arguments_by_entity = {
+        'league': {'league_name': league_name, 'season': season},
+        'match': {'match_id': match_id},
+        'player': {'player_id': player_id},
+        'stats': {},
+        'team': {'team_name': team_name, 'season': season}
     }
+    dict_coroutine_functions, dict_filenames_to_store, dict_scopes = dict(), dict(), dict()
+    for stat, entity in DATASET_ENTITIES.items():
+        arguments = dict_arguments_by_entity[entity]
+        dict_coroutine_functions[stat] = get_dataset_coroutine_function(stat=stat, arguments=arguments)
+        dict_filenames_to_store[stat] = get_dataset_filename(stat=stat, arguments=arguments, player_name=player_name)
+        dict_scopes[stat] = get_dataset_scope(stat=stat, arguments=arguments)
 
     utils.create_global_results_folder()
-    
-    for stat, func_call in dict_function_calls.items():
-        try:
-            if stat in ['team_stats', 'player_grouped_stats']:
-                data_dict = func_call
-                for sub_stat, sub_df in data_dict.items():
-                    if not sub_df.empty:
-                        name = dict_filenames_to_store[stat] + f" - {sub_stat}"
-                        utils.save_data_to_csv(dataframe=sub_df, name=name)
-            else:
-                df = func_call
-                if not df.empty:
-                    name = dict_filenames_to_store[stat]
-                    utils.save_data_to_csv(dataframe=df, name=name)
-        except Exception as e:
-            print("Problem with stat: {} --> ErrorMsg: {}".format(stat, e))
+    store = DataStore(path=store_path) if store_path else None
+
+    try:
+        if concurrent:
+            get_client().run(execute_concurrently_async(dict_coroutine_functions=dict_coroutine_functions,
+                                                        dict_filenames_to_store=dict_filenames_to_store,
+                                                        max_concurrency=max_concurrency,
+                                                        file_format=file_format,
+                                                        store=store,
+                                                        dict_scopes=dict_scopes))
+            return None
+
+        for stat, coroutine_function in dict_coroutine_functions.items():
+            try:
+                data = get_client().run(coroutine_function())
+                save_dataset(data=data, name=dict_filenames_to_store[stat], file_format=file_format, store=store,
+                             stat=stat, scope=dict_scopes[stat])
+            except Exception as e:
+                report_dataset_error(stat=stat, name=dict_filenames_to_store[stat], error=e)
+    finally:
+        if store is not None:
+            store.close()
     return None
\ No newline at end of file
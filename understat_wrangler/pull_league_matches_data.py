@@ -1,18 +1,118 @@
-from pipeline import get_league_results_data
+from client import get_client
+import transform
+import utils
+import os
+import sys
+import pandas as pd
+
+FILENAME_WATERMARKS = 'league_results_watermarks.pkl'
+COLUMNS = ['HomeTeam', 'AwayTeam', 'HomeGoals', 'AwayGoals', 'Country', 'League', 'Season', 'Date']
+
+
+def load_watermarks():
+    """
+    Loads dictionary of watermarks, wherein keys are (league_name, season) pairs, and values are dictionaries of
+    the latest 'datetime' and the set of 'match_ids' of the results already stored for that league and season.
+    """
+    if os.path.isfile(FILENAME_WATERMARKS):
+        return utils.pickle_load(filename=FILENAME_WATERMARKS)
+    return dict()
+
+
+def get_new_results(list_of_results, watermark):
+    """ Filters out the raw results that are already stored, as per the given watermark (if any) """
+    if watermark is None:
+        return list_of_results
+    latest_datetime = max((result['datetime'] for result in list_of_results), default=None)
+    if latest_datetime is not None and latest_datetime <= watermark['latest_datetime'] \
+            and len(list_of_results) == len(watermark['match_ids']):
+        return []
+    # Matches are checked by ID (not just by datetime), since postponed matches can be played out of order
+    return [result for result in list_of_results if str(result['id']) not in watermark['match_ids']]
+
+
+def wrangle_league_results(list_of_results, league_name, season_string, country):
+    data = transform.convert_json_to_dataframe(json_data=list_of_results)
+    df_league_results = transform.wrangle_results(dataframe=data)
+    df_league_results['Country'] = country
+    df_league_results['League'] = league_name
+    df_league_results['Season'] = season_string
+    df_league_results.rename({'datetime': 'Date'}, axis=1, inplace=True)
+    df_league_results['Date'] = df_league_results['Date'].dt.strftime(date_format="%Y-%m-%d")
+    df_league_results = df_league_results.loc[:, COLUMNS]
+    return df_league_results
+
+
+def save_league_results(df_league_results, name, file_format, append):
+    """
+    Saves results of a league season, sorted by date; new results are merged into the existing file if `append`
+    is True (the file is rewritten, since postponed matches can be played before results that are already stored)
+    """
+    filepath = f"{name}.{file_format}"
+    if append:
+        df_existing = utils.load_data(filepath=filepath)
+        df_league_results = pd.concat(objs=[df_existing, df_league_results], ignore_index=True)
+    df_league_results = df_league_results.sort_values(by='Date', kind='mergesort', ignore_index=True)
+    if file_format == 'csv':
+        df_league_results.to_csv(filepath, index=False)
+        return None
+    utils.save_data(dataframe=df_league_results, name=name, file_format=file_format, folderpath='.')
+    return None
+
+
+def sync_league_results(league_name, season, country, watermarks, file_format='csv'):
+    """
+    Definition:
+        Merges the results of the given league season that haven't been stored yet into its file, and updates
+        the league season's watermark. Only the new results are wrangled and written.
+        Understat serves a whole season's results in one page, so the page itself is always fetched; and it's
+        fetched afresh (bypassing the response cache), so that results played since the last sync aren't missed.
+    Returns:
+        Number of new results (int)
+    """
+    season_string = f"{season}-{str(season + 1)[2:]}"
+    name = f"{league_name} - {season_string}"
+    watermark = watermarks.get((league_name, season))
+    if not os.path.isfile(f"{name}.{file_format}"):
+        watermark = None
+    client = get_client()
+    list_of_results = client.run(client.get_league_results(league_name=league_name, season=season, refresh=True))
+    list_of_new_results = get_new_results(list_of_results=list_of_results, watermark=watermark)
+    if not list_of_new_results:
+        return 0
+    df_league_results = wrangle_league_results(list_of_results=list_of_new_results,
+                                               league_name=league_name,
+                                               season_string=season_string,
+                                               country=country)
+    save_league_results(df_league_results=df_league_results,
+                        name=name,
+                        file_format=file_format,
+                        append=watermark is not None)
+    match_ids = set() if watermark is None else set(watermark['match_ids'])
+    match_ids.update(str(result['id']) for result in list_of_new_results)
+    latest_datetime = max(result['datetime'] for result in list_of_new_results)
+    if watermark is not None:
+        latest_datetime = max(latest_datetime, watermark['latest_datetime'])
+    watermarks[(league_name, season)] = {'latest_datetime': latest_datetime, 'match_ids': match_ids}
+    return len(list_of_new_results)
 
 
 if __name__ == "__main__":
+    # Pass the file format as an argument (eg: `python pull_league_matches_data.py parquet`). Default: csv
+    # Pass '--full' to refetch and rewrite all results, instead of only merging new ones
+    arguments = [argument for argument in sys.argv[1:] if not argument.startswith('--')]
+    file_format = arguments[0] if arguments else 'csv'
+    incremental = '--full' not in sys.argv[1:]
     leagues = ['Bundesliga', 'EPL', 'La Liga', 'Ligue 1', 'Serie A']
     countries = ['Germany', 'England', 'Spain', 'France', 'Italy']
     seasons = [2020] * len(leagues) # Enter 2014 for 2014-15 season
+    watermarks = load_watermarks() if incremental else dict()
     for league_name, season, country in zip(leagues, seasons, countries):
-        season_string = f"{season}-{str(season + 1)[2:]}"
-        df_league_results = get_league_results_data(league_name=league_name, season=season)
-        df_league_results['Country'] = country
-        df_league_results['League'] = league_name
-        df_league_results['Season'] = season_string
-        df_league_results.rename({'datetime': 'Date'}, axis=1, inplace=True)
-        df_league_results['Date'] = df_league_results['Date'].dt.strftime(date_format="%Y-%m-%d")
-        columns = ['HomeTeam', 'AwayTeam', 'HomeGoals', 'AwayGoals', 'Country', 'League', 'Season', 'Date']
-        df_league_results = df_league_results.loc[:, columns]
-        df_league_results.to_csv(f"{league_name} - {season_string}.csv", index=False)
\ No newline at end of file
+        num_new_results = sync_league_results(league_name=league_name,
+                                              season=season,
+                                              country=country,
+                                              watermarks=watermarks,
+                                              file_format=file_format)
+        # Saved after every league, so that a failure doesn't lose the progress of the others
+        utils.pickle_save(data_obj=watermarks, filename=FILENAME_WATERMARKS)
+        print(f"{league_name} - {season}: {num_new_results} new results")
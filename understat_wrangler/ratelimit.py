@@ -0,0 +1,215 @@
+import metrics
+import asyncio
+import random
+import aiohttp
+
+
+class RateLimiter:
+    """
+    Async context manager that limits how many requests are in flight at once, and how fast they're started.
+    Parameters:
+        - max_concurrency (int): Maximum number of requests in flight at once. Default: 5
+        - requests_per_second (float): Maximum rate at which requests are started. No limit if None. Default: None
+    Usage example:
+        - limiter = RateLimiter(max_concurrency=5, requests_per_second=4)
+        - async with limiter:
+              data = await get_client().get_teams(league_name='EPL', season=2020)
+    """
+
+    def __init__(self, max_concurrency=5, requests_per_second=None):
+        self.max_concurrency = max_concurrency
+        self.requests_per_second = requests_per_second
+        self.semaphore = None
+        self.next_start = 0
+
+    async def __aenter__(self):
+        # Created lazily, so that the semaphore belongs to the loop it's used on
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        await self.semaphore.acquire()
+        if self.requests_per_second:
+            now = asyncio.get_event_loop().time()
+            start = max(now, self.next_start)
+            self.next_start = start + 1 / self.requests_per_second
+            if start > now:
+                await asyncio.sleep(start - now)
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.semaphore.release()
+        return None
+
+
+async def gather_with_limit(coroutines, max_concurrency=5, requests_per_second=None):
+    """
+    Runs coroutines concurrently through a RateLimiter, and returns their results in the given order.
+    """
+    limiter = RateLimiter(max_concurrency=max_concurrency, requests_per_second=requests_per_second)
+
+    async def run_with_limiter(coroutine):
+        async with limiter:
+            return await coroutine
+
+    results = await asyncio.gather(*[run_with_limiter(coroutine) for coroutine in coroutines])
+    return results
+
+
+RETRY_STATUSES = [429, 500, 502, 503, 504]
+
+
+class ThrottledError(Exception):
+    """ Raised when Understat responds with a status that's worth retrying (eg: 429 Too Many Requests) """
+
+    def __init__(self, status, retry_after=None):
+        super().__init__("Understat responded with status {}".format(status))
+        self.status = status
+        self.retry_after = retry_after
+
+
+def is_retryable(error):
+    """ Returns True if the given error is transient (throttling, timeouts, dropped connections) """
+    return isinstance(error, (ThrottledError, asyncio.TimeoutError, aiohttp.ClientConnectionError,
+                              aiohttp.ClientPayloadError))
+
+
+class TokenBucket:
+    """
+    Token bucket that paces requests to an average rate, while allowing short bursts.
+    Parameters:
+        - rate (float): Number of tokens added per second
+        - capacity (float): Maximum number of tokens that can be saved up (i.e; the burst size)
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last_refill = None
+
+    async def acquire(self):
+        """ Takes a token, waiting for it if the bucket is empty. Tokens are reserved in order of arrival """
+        now = asyncio.get_event_loop().time()
+        if self.last_refill is not None:
+            self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+        self.tokens -= 1
+        if self.tokens < 0:
+            await asyncio.sleep(-self.tokens / self.rate)
+        return None
+
+
+class AdaptiveRateLimiter:
+    """
+    Shared limiter of the requests sent to Understat, that combines:
+        - A token bucket, which paces requests to an average rate
+        - An adaptive concurrency limit (AIMD), which grows by 1 after a full window of fast, successful requests,
+          and is halved whenever Understat throttles/drops a request or a request times out
+        - Retries of such transient errors, with jittered exponential backoff
+    Parameters:
+        - requests_per_second (float): Average rate at which requests are started. No pacing if None. Default: 5
+        - burst (int): Number of requests that can be started at once, after a quiet period. Default: 5
+        - initial_concurrency (int): Starting limit of requests in flight at once. Default: 4
+        - min_concurrency (int): Lower bound of the concurrency limit. Default: 1
+        - max_concurrency (int): Upper bound of the concurrency limit. Default: 16
+        - max_retries (int): Maximum number of retries of each request. Default: 4
+        - backoff_base (float): Seconds of backoff before the first retry (doubled for each retry). Default: 0.5
+        - backoff_max (float): Maximum seconds of backoff before any retry. Default: 30
+        - latency_factor (float): The limit stops growing while the average latency is more than this many times
+          the lowest latency seen (i.e; while Understat is slowing down). Default: 2
+    Usage example:
+        - limiter = AdaptiveRateLimiter(requests_per_second=4)
+        - html = await limiter.call(fetch, url)
+    """
+
+    def __init__(self, requests_per_second=5, burst=5, initial_concurrency=4, min_concurrency=1, max_concurrency=16,
+                 max_retries=4, backoff_base=0.5, backoff_max=30, latency_factor=2):
+        self.token_bucket = TokenBucket(rate=requests_per_second, capacity=burst) if requests_per_second else None
+        self.concurrency = initial_concurrency
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.latency_factor = latency_factor
+        self.in_flight = 0
+        self.condition = None
+        self.num_successes_in_window = 0
+        self.average_latency = None
+        self.min_latency = None
+        self.num_requests = 0
+        self.num_retries = 0
+        self.num_errors = 0
+
+    async def acquire(self):
+        # Created lazily, so that the condition belongs to the loop it's used on
+        if self.condition is None:
+            self.condition = asyncio.Condition()
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.in_flight < self.concurrency)
+            self.in_flight += 1
+        return None
+
+    async def release(self):
+        async with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+        return None
+
+    def record_success(self, latency):
+        """ Additive increase: the limit grows by 1 after a full window of successful requests, unless slowed down """
+        self.average_latency = latency if self.average_latency is None else 0.8 * self.average_latency + 0.2 * latency
+        self.min_latency = latency if self.min_latency is None else min(self.min_latency, latency)
+        if self.average_latency > self.latency_factor * self.min_latency:
+            self.num_successes_in_window = 0
+            return None
+        self.num_successes_in_window += 1
+        if self.num_successes_in_window >= self.concurrency:
+            self.concurrency = min(self.max_concurrency, self.concurrency + 1)
+            self.num_successes_in_window = 0
+        return None
+
+    def record_error(self):
+        """ Multiplicative decrease: the limit is halved """
+        self.num_errors += 1
+        self.concurrency = max(self.min_concurrency, self.concurrency // 2)
+        self.num_successes_in_window = 0
+        return None
+
+    def get_backoff(self, attempt, error):
+        """ Returns seconds to wait before the given retry, honouring Understat's 'Retry-After' (if any) """
+        backoff = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        retry_after = getattr(error, 'retry_after', None)
+        if retry_after is not None:
+            backoff = max(backoff, min(self.backoff_max, retry_after))
+        return backoff
+
+    async def call(self, coroutine_function, *args, **kwargs):
+        """
+        Awaits coroutine_function(*args, **kwargs) within the limits, retrying transient errors.
+        The last error is raised once the retries run out.
+        """
+        loop = asyncio.get_event_loop()
+        for attempt in range(self.max_retries + 1):
+            await self.acquire()
+            try:
+                if self.token_bucket is not None:
+                    await self.token_bucket.acquire()
+                start = loop.time()
+                self.num_requests += 1
+                result = await coroutine_function(*args, **kwargs)
+            except Exception as e:
+                if not is_retryable(error=e):
+                    raise
+                self.record_error()
+                if attempt == self.max_retries:
+                    raise
+                error = e
+            else:
+                self.record_success(latency=loop.time() - start)
+                return result
+            finally:
+                await self.release()
+            self.num_retries += 1
+            metrics.record(stage='retry', name=type(error).__name__)
+            await asyncio.sleep(self.get_backoff(attempt=attempt, error=error))
+        return None
@@ -1,75 +1,152 @@
+from checkpoint import Checkpoint, run_unit_async
+from client import get_client
+from ratelimit import RateLimiter
 import utils
-import pipeline
+import asyncio
 import datetime
-import numpy as np
-import pandas as pd
+import functools
+import os
+import sys
 
+LEAGUE_NAMES = ['Bundesliga', 'EPL', 'Serie A', 'La Liga', 'Ligue 1']
+FIRST_SEASON = 2014
+FILENAME_FETCHED_SEASONS = 'ids_fetched_seasons.pkl'
+FOLDER_CHECKPOINT = 'ids_checkpoint'
 
-def get_team_ids_dictionary():
+
+def get_league_season_pairs():
+    """ Returns list of all (league_name, season) pairs since the 2014/15 season, in the order they're merged """
+    current_year = int(datetime.datetime.now().year)
+    seasons = range(FIRST_SEASON, current_year + 1)
+    league_season_pairs = [(league_name, season) for league_name in LEAGUE_NAMES for season in seasons]
+    return league_season_pairs
+
+
+async def fetch_ids_by_league_season_async(league_name, season, limiter):
+    client = get_client()
+    async with limiter:
+        teams, players = await asyncio.gather(client.get_teams(league_name=league_name, season=season),
+                                              client.get_league_players(league_name=league_name, season=season))
+    dict_team_ids = {str(team['id']): team['title'] for team in teams}
+    dict_player_ids = {str(player['id']): player['player_name'] for player in players}
+    return dict_team_ids, dict_player_ids
+
+
+async def get_ids_by_league_season_async(league_name, season, limiter, checkpoint=None):
     """
-    Gets dictionary of Team-IDs wherein keys are IDs and values are Team-names.
+    Returns tuple of 2 dictionaries (Team-IDs, Player-IDs) of the given league in the given season;
+    wherein keys are IDs and values are names.
+    Teams and players are read from the same league page, which is fetched once.
+    The league season is loaded from the checkpoint (if any) if it has already been fetched, or else it's
+    checkpointed as soon as it's fetched.
     """
-    df_team_id_data = pd.DataFrame()
-    current_year = int(datetime.datetime.now().year)
-    seasons = np.arange(start=2014, stop=current_year+1, step=1)
-    league_names = ['Bundesliga', 'EPL', 'Serie A', 'La Liga', 'Ligue 1']
-    for league_name in league_names:
-        for season in seasons:
-            df_teams_data_by_league = pipeline.get_teams_data(league_name=league_name,
-                                                              season=season,
-                                                              options=None)
-            df_team_id_data = pd.concat(objs=[df_team_id_data, df_teams_data_by_league],
-                                        ignore_index=True,
-                                        sort=False)
-    df_team_id_data = utils.convert_dtypes(dataframe=df_team_id_data,
-                                           columns=['id'],
-                                           dtypes=[str])
-    df_team_id_data.drop_duplicates(subset=['id'], keep='first', inplace=True)
-    dict_team_id_data = df_team_id_data.set_index('id').to_dict()['title']
-    return dict_team_id_data
-
-
-def get_player_ids_dictionary():
+    coroutine_function = functools.partial(fetch_ids_by_league_season_async,
+                                           league_name=league_name,
+                                           season=season,
+                                           limiter=limiter)
+    return await run_unit_async(checkpoint=checkpoint,
+                                unit=(league_name, season),
+                                coroutine_function=coroutine_function)
+
+
+async def get_ids_dictionaries_async(league_season_pairs, max_concurrency, requests_per_second, checkpoint=None):
+    limiter = RateLimiter(max_concurrency=max_concurrency, requests_per_second=requests_per_second)
+    tasks = [get_ids_by_league_season_async(league_name=league_name, season=season, limiter=limiter,
+                                            checkpoint=checkpoint)
+             for league_name, season in league_season_pairs]
+    # A failing league season doesn't stop the others, so they're all checkpointed before the error is raised
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return results
+
+
+def get_ids_dictionaries(league_season_pairs, dict_team_ids=None, dict_player_ids=None,
+                         max_concurrency=5, requests_per_second=5, checkpoint=None):
     """
-    Gets dictionary of Player-IDs wherein keys are IDs and values are Player-names.
+    Definition:
+        Fetches Team-IDs and Player-IDs of the given (league_name, season) pairs concurrently (with rate limiting),
+        and merges them into the given dictionaries (if any).
+        IDs that are already present are left untouched, and new IDs are merged in the order of the given
+        pairs; so the first name seen for an ID is the one that's kept.
+        Each pair is checkpointed as soon as it's fetched, if a Checkpoint is given; and pairs that are already
+        in the checkpoint are loaded from it, rather than fetched again.
+    Returns:
+        Tuple of 2 dictionaries (Team-IDs, Player-IDs); wherein keys are IDs and values are names.
     """
-    df_player_id_data = pd.DataFrame()
-    current_year = int(datetime.datetime.now().year)
-    seasons = np.arange(start=2014, stop=current_year+1, step=1)
-    league_names = ['Bundesliga', 'EPL', 'Serie A', 'La Liga', 'Ligue 1']
-    for league_name in league_names:
-        for season in seasons:
-            df_players_data_by_league = pipeline.get_league_players_data(league_name=league_name,
-                                                                         season=season,
-                                                                         options=None)
-            df_players_data_by_league = df_players_data_by_league.loc[:, ['id', 'player_name']]
-            df_player_id_data = pd.concat(objs=[df_player_id_data, df_players_data_by_league],
-                                          ignore_index=True,
-                                          sort=False)
-    df_player_id_data = utils.convert_dtypes(dataframe=df_player_id_data,
-                                             columns=['id'],
-                                             dtypes=[str])
-    df_player_id_data.drop_duplicates(subset=['id'], keep='first', inplace=True)
-    dict_player_id_data = df_player_id_data.set_index('id').to_dict()['player_name']
-    return dict_player_id_data
-
-
-def generate_all_ids():
-    """ Generate and store IDs of Teams and Players """
-    # Teams
-    dict_team_ids = get_team_ids_dictionary()
+    dict_team_ids = dict(dict_team_ids or {})
+    dict_player_ids = dict(dict_player_ids or {})
+    results = get_client().run(get_ids_dictionaries_async(league_season_pairs=league_season_pairs,
+                                                          max_concurrency=max_concurrency,
+                                                          requests_per_second=requests_per_second,
+                                                          checkpoint=checkpoint))
+    for dict_team_ids_by_league, dict_player_ids_by_league in results:
+        for team_id, team_name in dict_team_ids_by_league.items():
+            dict_team_ids.setdefault(team_id, team_name)
+        for player_id, player_name in dict_player_ids_by_league.items():
+            dict_player_ids.setdefault(player_id, player_name)
+    return dict_team_ids, dict_player_ids
+
+
+def generate_all_ids(incremental=True, max_concurrency=5, requests_per_second=5, resume=True):
+    """
+    Generate and store IDs of Teams and Players.
+    Finished league seasons that have been fetched are recorded in the 'ids_fetched_seasons.pkl' state file, which
+    incremental runs read to skip them. Without the state file (eg: on the first run after upgrading), all league
+    seasons are fetched.
+    League seasons are checkpointed (in the 'ids_checkpoint' folder) as soon as they're fetched, so that a run that
+    fails or is interrupted can be resumed; the checkpoint is cleared once all IDs have been stored.
+    Parameters:
+        - incremental (bool): If True, merges into the existing Pickle files, and only fetches the seasons that
+          are still open or haven't been fetched yet. If False, regenerates all IDs from scratch. Default: True
+        - max_concurrency (int): Maximum number of requests in flight at once. Default: 5
+        - requests_per_second (float): Maximum rate at which requests are started. Default: 5
+        - resume (bool): If True, league seasons checkpointed by a previous run that didn't complete aren't fetched
+          again. If False, the checkpoint is discarded first. Default: True
+    """
+    checkpoint = Checkpoint(folderpath=FOLDER_CHECKPOINT)
+    if not resume:
+        checkpoint.clear()
+    league_season_pairs = get_league_season_pairs()
+    dict_team_ids, dict_player_ids, fetched_seasons = {}, {}, set()
+    if incremental:
+        if os.path.isfile('ids_of_teams.pkl'):
+            dict_team_ids = utils.pickle_load(filename='ids_of_teams.pkl')
+        if os.path.isfile('ids_of_players.pkl'):
+            dict_player_ids = utils.pickle_load(filename='ids_of_players.pkl')
+        if os.path.isfile(FILENAME_FETCHED_SEASONS):
+            fetched_seasons = utils.pickle_load(filename=FILENAME_FETCHED_SEASONS)
+        else:
+            print("No record of fetched seasons ('{}') yet, so all league seasons are fetched".format(
+                FILENAME_FETCHED_SEASONS))
+    league_season_pairs_to_fetch = [pair for pair in league_season_pairs if pair not in fetched_seasons]
+
+    dict_team_ids, dict_player_ids = get_ids_dictionaries(league_season_pairs=league_season_pairs_to_fetch,
+                                                          dict_team_ids=dict_team_ids,
+                                                          dict_player_ids=dict_player_ids,
+                                                          max_concurrency=max_concurrency,
+                                                          requests_per_second=requests_per_second,
+                                                          checkpoint=checkpoint)
+    # Only finished seasons are never fetched again
+    fetched_seasons.update(pair for pair in league_season_pairs_to_fetch if utils.is_season_finished(season=pair[1]))
     utils.pickle_save(data_obj=dict_team_ids, filename='ids_of_teams.pkl')
-    
-    # Players
-    dict_player_ids = get_player_ids_dictionary()
     utils.pickle_save(data_obj=dict_player_ids, filename='ids_of_players.pkl')
+    utils.pickle_save(data_obj=fetched_seasons, filename=FILENAME_FETCHED_SEASONS)
+    checkpoint.clear()
     return None
 
 
 if __name__ == "__main__":
+    # Pass '--full' to regenerate all IDs from scratch, instead of skipping the finished seasons recorded in
+    # 'ids_fetched_seasons.pkl'
+    # Pass '--restart' to discard the league seasons checkpointed by a previous run that failed, instead of resuming
+    incremental = '--full' not in sys.argv[1:]
+    resume = '--restart' not in sys.argv[1:]
     try:
-        time_taken = utils.run_and_timeit(func=generate_all_ids)
+        utils.run_and_timeit(func=lambda: generate_all_ids(incremental=incremental, resume=resume))
         print("IDs for teams and players have been re-generated and stored in Pickle files")
-        print("Time taken: {} minutes".format(time_taken))
     except Exception as e:
-        print("Failed! ErrorMsg: {}".format(e))
\ No newline at end of file
+        print("Failed! ErrorMsg: {}".format(e))
+        print("League seasons fetched so far are checkpointed in the '{}' folder; run again to resume".format(
+            FOLDER_CHECKPOINT))
@@ -0,0 +1,101 @@
+import utils
+import numpy as np
+
+
+class IdRegistry:
+    """
+    Compact in-memory registry of Understat IDs and names (of teams or players), supporting lookups both ways.
+    IDs are stored as a sorted numpy array of integers alongside an array of names (instead of a dictionary of
+    strings), and are looked up via binary search. IDs added after loading are kept in a small dictionary.
+    Parameters:
+        - dict_ids (dict): Dictionary wherein keys are IDs, and values are names (as stored in the Pickle files)
+    """
+
+    def __init__(self, dict_ids):
+        ids = np.array([int(id_) for id_ in dict_ids.keys()], dtype=np.int32)
+        order = np.argsort(ids, kind='mergesort')
+        names = np.array(list(dict_ids.values()), dtype=object)
+        self.ids = ids[order]
+        self.names = names[order]
+        self.added_names = dict()
+        self.ids_by_name = None
+
+    def __len__(self):
+        return len(self.ids) + len(self.added_names)
+
+    def __contains__(self, id_):
+        return self.get_name(id_) is not None
+
+    def __getitem__(self, id_):
+        name = self.get_name(id_)
+        if name is None:
+            raise KeyError(id_)
+        return name
+
+    def get_name(self, id_, default=None):
+        """ Returns name of the given ID (int or str), or default if it isn't registered """
+        id_ = int(id_)
+        index = np.searchsorted(self.ids, id_)
+        if index < len(self.ids) and self.ids[index] == id_:
+            return self.names[index]
+        return self.added_names.get(id_, default)
+
+    def get_names(self, ids, default=None):
+        """ Returns list of names of the given IDs (in the given order), via one binary search of all of them """
+        ids = np.asarray(ids).astype(np.int64)
+        if len(self.ids) == 0:
+            return [self.added_names.get(id_, default) for id_ in ids.tolist()]
+        indices = np.minimum(np.searchsorted(self.ids, ids), len(self.ids) - 1)
+        is_registered = self.ids[indices] == ids
+        return [name if registered else self.added_names.get(id_, default)
+                for id_, name, registered in zip(ids.tolist(), self.names[indices].tolist(), is_registered.tolist())]
+
+    def get_id(self, name, default=None):
+        """ Returns ID (str) of the given name, or default if it isn't registered. The reverse index is built on first use """
+        if self.ids_by_name is None:
+            self.ids_by_name = dict()
+            for id_, registered_name in zip(self.ids.tolist(), self.names):
+                self.ids_by_name.setdefault(registered_name, str(id_))
+            for id_, registered_name in self.added_names.items():
+                self.ids_by_name.setdefault(registered_name, str(id_))
+        return self.ids_by_name.get(name, default)
+
+    def add(self, id_, name):
+        """ Registers name of an ID that wasn't registered yet (registered names are left untouched) """
+        if id_ in self or name is None:
+            return None
+        self.added_names[int(id_)] = name
+        if self.ids_by_name is not None:
+            self.ids_by_name.setdefault(name, str(id_))
+        return None
+
+    def to_dict(self):
+        """ Returns dictionary wherein keys are IDs (str) and values are names, in the format of the Pickle files """
+        dict_ids = {str(id_): name for id_, name in zip(self.ids.tolist(), self.names)}
+        for id_, name in self.added_names.items():
+            dict_ids[str(id_)] = name
+        return dict_ids
+
+
+_registries = dict()
+
+
+def get_registry(filename):
+    """ Returns IdRegistry of the given Pickle file, which is only loaded once per process """
+    if filename not in _registries:
+        _registries[filename] = IdRegistry(dict_ids=utils.pickle_load(filename=filename))
+    return _registries[filename]
+
+
+def get_team_registry():
+    return get_registry(filename='ids_of_teams.pkl')
+
+
+def get_player_registry():
+    return get_registry(filename='ids_of_players.pkl')
+
+
+def clear_registries():
+    """ Forgets the loaded registries, so that they're reloaded from the Pickle files on next use """
+    _registries.clear()
+    return None
@@ -1,9 +1,22 @@
+import metrics
 import utils
+import functools
+import sys
+from manifest import run_manifest
 from pipeline import execute_pipeline
 
 if __name__ == "__main__":
+    # Pass '--metrics-jsonl <filepath>' to also write metrics of every call as JSON lines
+    if '--metrics-jsonl' in sys.argv[1:]:
+        metrics.configure_metrics(jsonl_path=sys.argv[sys.argv.index('--metrics-jsonl') + 1])
+    # Pass '--manifest <filepath>' to fetch all the datasets of a manifest (see `manifest.py`), instead of 'user_inputs.csv'
+    if '--manifest' in sys.argv[1:]:
+        func = functools.partial(run_manifest, filepath=sys.argv[sys.argv.index('--manifest') + 1])
+    else:
+        func = functools.partial(execute_pipeline, concurrent=True)
     try:
-        utils.run_and_timeit(func=execute_pipeline)
+        utils.run_and_timeit(func=func)
         print("Data has been extracted and wrangled!")
     except Exception as e:
-        print("Failed! ErrorMsg: {}".format(e))
\ No newline at end of file
+        print("Failed! ErrorMsg: {}".format(e))
+    metrics.get_recorder().print_summary()
@@ -0,0 +1,120 @@
+import metrics
+import numpy as np
+import pandas as pd
+
+FLOAT = 'float32'
+SMALL_INT = 'int16'
+INT = 'int32'
+CATEGORY = 'category'
+DATETIME = 'datetime64[ns]'
+
+# Columns shared by several datasets
+PLAYER_SEASON_STATS = {
+    'games': SMALL_INT, 'time': INT, 'goals': SMALL_INT, 'xG': FLOAT, 'assists': SMALL_INT, 'xA': FLOAT,
+    'shots': SMALL_INT, 'key_passes': SMALL_INT, 'yellow_cards': SMALL_INT, 'red_cards': SMALL_INT,
+    'position': CATEGORY, 'team_title': CATEGORY, 'npg': SMALL_INT, 'npxG': FLOAT, 'xGChain': FLOAT, 'xGBuildup': FLOAT,
+}
+SHOTS = {
+    'minute': SMALL_INT, 'result': CATEGORY, 'X': FLOAT, 'Y': FLOAT, 'xG': FLOAT, 'h_a': CATEGORY,
+    'situation': CATEGORY, 'season': SMALL_INT, 'shotType': CATEGORY, 'h_team': CATEGORY, 'a_team': CATEGORY,
+    'h_goals': SMALL_INT, 'a_goals': SMALL_INT, 'date': DATETIME, 'lastAction': CATEGORY,
+}
+FIXTURES = {'datetime': DATETIME, 'HomeTeam': CATEGORY, 'AwayTeam': CATEGORY}
+RESULTS = dict(FIXTURES, **{
+    'HomeGoals': SMALL_INT, 'AwayGoals': SMALL_INT, 'Home_xG': FLOAT, 'Away_xG': FLOAT,
+    'ForecastedHomeWinPercent': FLOAT, 'ForecastedAwayWinPercent': FLOAT, 'ForecastedDrawPercent': FLOAT,
+})
+GROUPED_STATS = {
+    'shots': SMALL_INT, 'goals': SMALL_INT, 'xG': FLOAT, 'assists': SMALL_INT, 'key_passes': SMALL_INT, 'xA': FLOAT,
+    'npg': SMALL_INT, 'npxG': FLOAT, 'time': INT, 'season': SMALL_INT,
+}
+MIN_MAX_STATS = ['goals', 'xG', 'shots', 'assists', 'xA', 'key_passes', 'xGChain', 'xGBuildup']
+
+# Datatypes of the columns of each dataset (named after the `pipeline.get_<name>_data` functions).
+# Columns that aren't in a dataset's schema (eg: IDs and names) are left as they are.
+SCHEMAS = {
+    'league_fixtures': FIXTURES,
+    'league_players': PLAYER_SEASON_STATS,
+    'league_results': RESULTS,
+    'match_players': {
+        'goals': SMALL_INT, 'own_goals': SMALL_INT, 'shots': SMALL_INT, 'xG': FLOAT, 'time': SMALL_INT,
+        'position': CATEGORY, 'h_a': CATEGORY, 'yellow_card': SMALL_INT, 'red_card': SMALL_INT,
+        'key_passes': SMALL_INT, 'assists': SMALL_INT, 'xA': FLOAT, 'xGChain': FLOAT, 'xGBuildup': FLOAT,
+        'positionOrder': SMALL_INT, 'team_name': CATEGORY,
+    },
+    'match_shots': SHOTS,
+    # Applied to each of the sub-stats ['season', 'position', 'situation', 'shotZones', 'shotTypes']
+    'player_grouped_stats': dict(PLAYER_SEASON_STATS, **GROUPED_STATS, **{
+        'yellow': SMALL_INT, 'red': SMALL_INT, 'team': CATEGORY, 'situation': CATEGORY, 'shotZones': CATEGORY,
+        'shotTypes': CATEGORY,
+    }),
+    'player_matches': {
+        'goals': SMALL_INT, 'shots': SMALL_INT, 'xG': FLOAT, 'time': SMALL_INT, 'position': CATEGORY,
+        'h_team': CATEGORY, 'a_team': CATEGORY, 'h_goals': SMALL_INT, 'a_goals': SMALL_INT, 'date': DATETIME,
+        'season': SMALL_INT, 'xA': FLOAT, 'assists': SMALL_INT, 'key_passes': SMALL_INT, 'npg': SMALL_INT,
+        'npxG': FLOAT, 'xGChain': FLOAT, 'xGBuildup': FLOAT,
+    },
+    'player_shots': SHOTS,
+    'player_stats': dict({"{}_{}".format(stat, aggregate): FLOAT for stat in MIN_MAX_STATS
+                          for aggregate in ['maximum', 'minimum', 'average']}, position=CATEGORY),
+    'stats': {
+        'league': CATEGORY, 'h': FLOAT, 'a': FLOAT, 'hxg': FLOAT, 'axg': FLOAT, 'year': SMALL_INT, 'month': SMALL_INT,
+        'matches': SMALL_INT, 'datetime': DATETIME,
+    },
+    'team_fixtures': dict(FIXTURES, h_a=CATEGORY, TeamOfInterest=CATEGORY),
+    'team_players': dict(PLAYER_SEASON_STATS, season=SMALL_INT),
+    'team_results': dict(RESULTS, h_a=CATEGORY, result=CATEGORY, TeamOfInterest=CATEGORY, season=SMALL_INT),
+    # Applied to each of the sub-stats ['situation', 'formation', 'gameState', 'timing', 'shotZone', 'attackSpeed',
+    # 'result'], whose first column is the sub-stat's values
+    'team_stats': {
+        'situation': CATEGORY, 'formation': CATEGORY, 'gameState': CATEGORY, 'timing': CATEGORY,
+        'shotZone': CATEGORY, 'attackSpeed': CATEGORY, 'result': CATEGORY, 'stat': CATEGORY, 'time': INT,
+        'shots': SMALL_INT, 'goals': SMALL_INT, 'xG': FLOAT, 'shots_against': SMALL_INT,
+        'goals_against': SMALL_INT, 'xG_against': FLOAT, 'team_name': CATEGORY, 'season': SMALL_INT,
+    },
+    'teams': {'title': CATEGORY},
+}
+
+
+def convert_series(series, dtype):
+    """
+    Converts Pandas Series (of numbers, numeric strings, or date strings) to the given datatype.
+    Integer columns that have missing or fractional values become floats instead, and integer columns whose
+    values don't fit into the given datatype keep 64-bit integers.
+    Values that can't be converted become NaN/NaT.
+    """
+    if dtype == CATEGORY:
+        return series.astype(CATEGORY)
+    if dtype == DATETIME:
+        return pd.to_datetime(series, errors='coerce')
+    series = pd.to_numeric(series, errors='coerce')
+    if np.issubdtype(np.dtype(dtype), np.integer):
+        if series.isna().any() or (series % 1 != 0).any():
+            return series.astype(FLOAT)
+        info = np.iinfo(dtype)
+        if not series.empty and (series.min() < info.min or series.max() > info.max):
+            return series.astype('int64')
+    return series.astype(dtype)
+
+
+@metrics.timed(stage='transform')
+def apply_schema(data, name):
+    """
+    Definition:
+        Converts columns of the given dataset (DataFrame, or dictionary of DataFrames) in place, to the compact
+        datatypes of its schema in `SCHEMAS`; i.e; 32-bit floats, 16/32-bit integers, categoricals for teams,
+        positions, situations, shot types and results, and datetimes.
+    Parameters:
+        - data (Pandas DataFrame or dict): Dataset
+        - name (str): Name of the dataset's schema (eg: 'match_shots')
+    Returns:
+        The same dataset.
+    """
+    if isinstance(data, dict):
+        for dataframe in data.values():
+            apply_schema(data=dataframe, name=name)
+        return data
+    for column, dtype in SCHEMAS[name].items():
+        if column in data.columns and str(data[column].dtype) != dtype:
+            data[column] = convert_series(series=data[column], dtype=dtype)
+    return data
@@ -0,0 +1,207 @@
+from client import get_client
+import metrics
+import pipeline
+import registry
+import utils
+import asyncio
+import inspect
+import json
+import sys
+from aiohttp import web
+
+HOST = '127.0.0.1'
+PORT = 8765
+ARROW_CONTENT_TYPE = 'application/vnd.apache.arrow.stream'
+# Names of the DataFrames of endpoints that return tuples of DataFrames
+TUPLE_RESULT_NAMES = {'matches': ['match_players', 'match_shots'],
+                      'league_season_matches': ['match_players', 'match_shots']}
+
+
+def parse_bool(value):
+    if value.lower() in ['true', '1', 'yes']:
+        return True
+    if value.lower() in ['false', '0', 'no']:
+        return False
+    raise ValueError("Invalid boolean: '{}'".format(value))
+
+
+def parse_list(value):
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+# Converters of query parameters (strings) into arguments of the pipeline functions. Other parameters are strings
+PARAMETER_CONVERTERS = {
+    'season': int,
+    'max_concurrency': int,
+    'sort_by_date': parse_bool,
+    'use_processes': parse_bool,
+    'match_ids': parse_list,
+    'player_ids': parse_list,
+    'positions': parse_list,
+    'options': json.loads,
+}
+
+
+# Names of the endpoints, wherein each endpoint serves the `pipeline.get_<name>_data_async` function. Only the
+# functions listed here are served, so that internal helpers of the pipeline (eg: `get_match_raw_data_async`) aren't
+ENDPOINT_NAMES = [
+    'league_fixtures', 'league_players', 'league_results', 'league_season_matches', 'match_players',
+    'match_players_batch', 'match_shots', 'match_shots_batch', 'matches', 'player_grouped_stats',
+    'player_grouped_stats_batch', 'player_matches', 'player_shots', 'player_stats', 'player_stats_batch', 'stats',
+    'team_fixtures', 'team_players', 'team_results', 'team_stats', 'teams',
+]
+
+
+def get_endpoints():
+    """
+    Returns dictionary wherein keys are endpoint names (eg: 'league_results'), and values are the
+    `pipeline.get_<name>_data_async` functions they serve
+    """
+    return {name: getattr(pipeline, "get_{}_data_async".format(name)) for name in ENDPOINT_NAMES}
+
+
+def get_arguments(function, query):
+    """ Converts query parameters into keyword arguments of the function. Raises ValueError for invalid parameters """
+    parameters = inspect.signature(function).parameters
+    unknown = [name for name in query if name not in parameters]
+    if unknown:
+        raise ValueError("Unknown parameters: {}. Options: {}".format(unknown, list(parameters)))
+    missing = [name for name, parameter in parameters.items()
+               if parameter.default is inspect.Parameter.empty and name not in query]
+    if missing:
+        raise ValueError("Missing parameters: {}".format(missing))
+    return {name: PARAMETER_CONVERTERS.get(name, str)(value) for name, value in query.items()}
+
+
+def to_json_body(data):
+    """ JSON of DataFrame (list of records), or dictionary of DataFrames (dictionary of lists of records) """
+    if isinstance(data, dict):
+        return '{' + ', '.join("{}: {}".format(json.dumps(key), to_json_body(data=value))
+                               for key, value in data.items()) + '}'
+    return data.to_json(orient='records', date_format='iso')
+
+
+def to_arrow_body(dataframe):
+    """ Arrow IPC stream of DataFrame """
+    pa = utils.import_pyarrow()
+    table = pa.Table.from_pandas(df=dataframe, preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def json_error(status, message):
+    return web.json_response(data={'error': message}, status=status)
+
+
+async def handle_endpoint(request):
+    """
+    Serves data of one pipeline function, with the query parameters as its arguments.
+    Special query parameters:
+        - format (str): Options: ['json', 'arrow']. Default: 'json'
+        - table (str): Name of the DataFrame to return, for endpoints that return several (eg: 'team_stats').
+          Needed for the Arrow format
+    """
+    name = request.match_info['name']
+    endpoints = request.app['endpoints']
+    if name not in endpoints:
+        return json_error(status=404, message="Unknown endpoint: '{}'. Options: {}".format(name, list(endpoints)))
+    query = dict(request.query)
+    response_format = query.pop('format', 'json').lower()
+    table = query.pop('table', None)
+    if response_format not in ['json', 'arrow']:
+        return json_error(status=400, message="Invalid format: '{}'. Options: ['json', 'arrow']".format(response_format))
+    try:
+        arguments = get_arguments(function=endpoints[name], query=query)
+    except ValueError as e:
+        return json_error(status=400, message=str(e))
+    try:
+        data = await endpoints[name](**arguments)
+    except Exception as e:
+        return json_error(status=500, message="{}: {}".format(type(e).__name__, e))
+
+    if isinstance(data, tuple):
+        data = dict(zip(TUPLE_RESULT_NAMES.get(name, [str(index) for index in range(len(data))]), data))
+    if isinstance(data, dict) and table is not None:
+        if table not in data:
+            return json_error(status=400, message="Invalid table: '{}'. Options: {}".format(table, list(data)))
+        data = data[table]
+    if response_format == 'json':
+        try:
+            text = to_json_body(data=data)
+        except Exception as e:
+            return json_error(status=500, message="{}: {}".format(type(e).__name__, e))
+        return web.Response(text=text, content_type='application/json')
+    if isinstance(data, dict):
+        return json_error(status=400, message="The 'table' parameter is needed for the Arrow format. "
+                                              "Options: {}".format(list(data)))
+    try:
+        body = await asyncio.get_running_loop().run_in_executor(None, to_arrow_body, data)
+    except ImportError as e:
+        return json_error(status=501, message=str(e))
+    except Exception as e:
+        return json_error(status=500, message="{}: {}".format(type(e).__name__, e))
+    return web.Response(body=body, content_type=ARROW_CONTENT_TYPE)
+
+
+async def handle_index(request):
+    """ Lists the endpoints and their parameters """
+    return web.json_response(data={'/' + name: list(inspect.signature(function).parameters)
+                                   for name, function in request.app['endpoints'].items()})
+
+
+async def handle_metrics(request):
+    """ Returns summary (by stage) of the metrics recorded since the server started """
+    return web.json_response(data=metrics.get_recorder().get_summary())
+
+
+def create_app():
+    app = web.Application()
+    app['endpoints'] = get_endpoints()
+    app.router.add_get('/', handle_index)
+    app.router.add_get('/metrics', handle_metrics)
+    app.router.add_get('/{name}', handle_endpoint)
+    return app
+
+
+async def start_server_async(host=HOST, port=PORT):
+    runner = web.AppRunner(create_app())
+    await runner.setup()
+    await web.TCPSite(runner, host=host, port=port).start()
+    return runner
+
+
+async def wait_forever_async():
+    await asyncio.get_running_loop().create_future()
+
+
+def serve(host=HOST, port=PORT):
+    """
+    Serves the `pipeline.get_*_data` functions over a local HTTP API, until interrupted.
+    The server runs on the process-wide client's event loop, so the pooled session, the ID registries and
+    the response cache stay warm across queries.
+    Usage examples (with the server running):
+        - GET http://127.0.0.1:8765/league_results?league_name=EPL&season=2020
+        - GET http://127.0.0.1:8765/team_stats?team_name=Arsenal&season=2020&table=situation&format=arrow
+        - GET http://127.0.0.1:8765/player_stats_batch?player_ids=647,1250
+    """
+    registry.get_team_registry()
+    registry.get_player_registry()
+    client = get_client()
+    runner = client.run(start_server_async(host=host, port=port))
+    print("Serving on http://{}:{}/ (press Ctrl+C to stop)".format(host, port))
+    try:
+        client.run(wait_forever_async())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        client.run(runner.cleanup())
+    return None
+
+
+if __name__ == "__main__":
+    # Pass '--host <host>' and/or '--port <port>' to serve elsewhere than on http://127.0.0.1:8765/
+    host = sys.argv[sys.argv.index('--host') + 1] if '--host' in sys.argv[1:] else HOST
+    port = int(sys.argv[sys.argv.index('--port') + 1]) if '--port' in sys.argv[1:] else PORT
+    serve(host=host, port=port)
@@ -0,0 +1,152 @@
+import metrics
+import json
+import re
+import sqlite3
+import time
+import pandas as pd
+
+# Columns that are indexed in every table that has them
+INDEXED_COLUMNS = ['match_id', 'player_id', 'team', 'team_name', 'team_title', 'TeamOfInterest', 'h_team', 'a_team',
+                   'HomeTeam', 'AwayTeam', 'league', 'season']
+
+
+def get_sql_type(series):
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_integer_dtype(series):
+        return 'INTEGER'
+    if pd.api.types.is_float_dtype(series):
+        return 'REAL'
+    return 'TEXT'
+
+
+def to_sql_values(dataframe):
+    """ Converts DataFrame into list of tuples of values that SQLite can store (datetimes as ISO strings, NaN as NULL) """
+    dataframe = dataframe.copy()
+    for column in dataframe.columns:
+        series = dataframe[column]
+        if pd.api.types.is_datetime64_any_dtype(series):
+            dataframe[column] = series.dt.strftime("%Y-%m-%d %H:%M:%S")
+        elif series.dtype == object:
+            dataframe[column] = [json.dumps(value) if isinstance(value, (dict, list)) else value for value in series]
+    dataframe = dataframe.astype(object).where(dataframe.notna(), None)
+    return list(dataframe.itertuples(index=False, name=None))
+
+
+def quote(name):
+    return '"{}"'.format(name.replace('"', '""'))
+
+
+def get_table_name(name):
+    """ Returns name of table of the given dataset (eg: 'team_stats - situation' -> 'team_stats_situation') """
+    return re.sub(r'\W+', '_', name).strip('_')
+
+
+class DataStore:
+    """
+    Embedded (SQLite) analytical store of the pipeline's datasets, with one table per dataset (and sub-stat).
+    Upserting a dataset replaces its rows of the same scope (eg: league and season) in one transaction, so that
+    re-running the pipeline never duplicates rows. Tables are indexed on the match, player, team, league and season
+    columns that they have; so reads are indexed queries, rather than scans of CSV files.
+    Parameters:
+        - path (str): Path of the SQLite file. Default: 'understat_data.sqlite'
+    Usage example:
+        - store = DataStore()
+        - store.upsert(name='match_shots', data=data_match_shots, scope={'match_id': '14090'})
+        - df = store.read(name='match_shots', h_team='Bayern Munich')
+    """
+
+    def __init__(self, path='understat_data.sqlite'):
+        self.path = path
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return None
+
+    def get_columns(self, table_name):
+        return [row[1] for row in self.connection.execute("PRAGMA table_info({})".format(quote(table_name)))]
+
+    def ensure_table(self, table_name, dataframe):
+        """ Creates table (and its indexes) for the DataFrame, or adds the DataFrame's new columns to it """
+        existing_columns = self.get_columns(table_name=table_name)
+        if not existing_columns:
+            columns_sql = ', '.join("{} {}".format(quote(column), get_sql_type(dataframe[column]))
+                                    for column in dataframe.columns)
+            self.connection.execute("CREATE TABLE {} ({})".format(quote(table_name), columns_sql))
+        else:
+            for column in dataframe.columns:
+                if column not in existing_columns:
+                    self.connection.execute("ALTER TABLE {} ADD COLUMN {} {}".format(
+                        quote(table_name), quote(column), get_sql_type(dataframe[column])))
+        for column in INDEXED_COLUMNS:
+            if column in dataframe.columns:
+                index_name = "idx_{}_{}".format(table_name, column)
+                self.connection.execute("CREATE INDEX IF NOT EXISTS {} ON {} ({})".format(
+                    quote(index_name), quote(table_name), quote(column)))
+        return None
+
+    def upsert_dataframe(self, table_name, dataframe, scope):
+        if dataframe.empty:
+            return None
+        dataframe = dataframe.copy()
+        # Scope columns are added to datasets that don't have them (eg: 'league' to league results)
+        for column, value in scope.items():
+            if column not in dataframe.columns:
+                dataframe[column] = value
+        self.ensure_table(table_name=table_name, dataframe=dataframe)
+        where_sql = ' AND '.join("{} = ?".format(quote(column)) for column in scope) or '1'
+        self.connection.execute("DELETE FROM {} WHERE {}".format(quote(table_name), where_sql), list(scope.values()))
+        insert_sql = "INSERT INTO {} ({}) VALUES ({})".format(quote(table_name),
+                                                            ', '.join(quote(column) for column in dataframe.columns),
+                                                            ', '.join('?' * len(dataframe.columns)))
+        self.connection.executemany(insert_sql, to_sql_values(dataframe=dataframe))
+        return None
+
+    def upsert(self, name, data, scope):
+        """
+        Upserts dataset (DataFrame, or dictionary of DataFrames) into the store.
+        Parameters:
+            - name (str): Name of the dataset (eg: 'league_results'). Dictionaries of DataFrames are stored as one
+              table per sub-stat (eg: 'team_stats_situation')
+            - data (Pandas DataFrame or dict): Dataset to upsert. Empty DataFrames are skipped
+            - scope (dict): Columns and values (eg: {'league': 'EPL', 'season': 2020}) of the rows to replace.
+              Scope columns that the data doesn't have are added to it. All rows are replaced if empty
+        """
+        start = time.perf_counter()
+        if isinstance(data, dict):
+            dict_data = {"{}_{}".format(name, sub_stat): sub_df for sub_stat, sub_df in data.items()}
+        else:
+            dict_data = {name: data}
+        with self.connection:
+            for table_name, dataframe in dict_data.items():
+                self.upsert_dataframe(table_name=get_table_name(name=table_name), dataframe=dataframe, scope=scope)
+        metrics.record(stage='save', name='store', seconds=time.perf_counter() - start,
+                       num_rows=metrics.get_num_rows(data))
+        return None
+
+    def query(self, sql, params=()):
+        """ Returns Pandas DataFrame of the results of the given SQL query """
+        return pd.read_sql_query(sql, self.connection, params=params)
+
+    def read(self, name, columns=None, **filters):
+        """
+        Returns Pandas DataFrame of the rows of the given dataset/table that match all the filters (column=value).
+        Usage example:
+            - store.read(name='league_results', columns=['HomeTeam', 'AwayTeam'], league='EPL', season=2020)
+        """
+        table_name = get_table_name(name=name)
+        columns_sql = ', '.join(quote(column) for column in columns) if columns else '*'
+        where_sql = ' AND '.join("{} = ?".format(quote(column)) for column in filters) or '1'
+        return self.query(sql="SELECT {} FROM {} WHERE {}".format(columns_sql, quote(table_name), where_sql),
+                          params=list(filters.values()))
+
+    def get_table_names(self):
+        return [row[0] for row in self.connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+
+    def close(self):
+        self.connection.close()
+        return None
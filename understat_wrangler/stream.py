@@ -0,0 +1,301 @@
+from checkpoint import run_unit_async
+from client import get_client
+import metrics
+import pipeline
+import schemas
+import utils
+import asyncio
+import functools
+import os
+import time
+
+# Names of the schemas (in `schemas.SCHEMAS`) of the streamed datasets that aren't named after their schema
+SCHEMA_NAMES = {'Match players': 'match_players', 'Match shots': 'match_shots'}
+
+
+def get_declared_dtypes(name):
+    """
+    Returns the declared datatypes (see `schemas.SCHEMAS`) of the columns of the streamed dataset of the given name
+    (eg: 'Match shots', or 'player_grouped_stats - season' for a sub-stat), or an empty dictionary if it has none
+    """
+    name = name.split(' - ')[0]
+    return schemas.SCHEMAS.get(SCHEMA_NAMES.get(name, name), dict())
+
+
+class BatchWriter:
+    """
+    Writer that appends batches (DataFrames) of one dataset to a single CSV/Parquet/Feather file, as they arrive.
+    The columns of the file are those of the first non-empty batch; later batches are aligned to them (wherein
+    missing columns are left empty), and a later batch with columns that the file doesn't have raises ValueError,
+    rather than having them dropped.
+    Nothing is written if all the batches are empty.
+    For Parquet/Feather, the datatypes of the file are the declared ones (see `get_arrow_type`), rather than the
+    ones of the first batch; as a batch can have a column narrowed to a smaller type, or with no values at all.
+    Parameters:
+        - name (str): Storage name of file (without extension)
+        - file_format (str): Options: ['csv', 'parquet', 'feather']. Default: 'csv'
+        - folderpath (str): Path of folder to save the file in. Default: None (global results folder)
+        - dtypes (dict): Declared datatypes of the columns (eg: `schemas.SCHEMAS['match_shots']`). Columns that
+          aren't declared keep the datatypes of the first batch. Default: None
+        - encoding (str): Encoding of CSV files (see `utils.save_data_to_csv`). Default: 'utf-8'
+    """
+
+    def __init__(self, name, file_format='csv', folderpath=None, dtypes=None, encoding=utils.CSV_ENCODING):
+        file_format = file_format.strip().lower()
+        if file_format not in utils.OUTPUT_BACKENDS:
+            raise ValueError("Invalid file_format: '{}'. Options: {}".format(file_format,
+                                                                          list(utils.OUTPUT_BACKENDS.keys())))
+        folderpath = folderpath or utils.get_global_results_folderpath()
+        self.filepath = os.path.join(folderpath, "{}.{}".format(name, file_format))
+        self.file_format = file_format
+        self.dtypes = dtypes or dict()
+        self.encoding = encoding
+        self.columns = None
+        self.schema = None
+        self.writer = None
+        self.num_rows = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return None
+
+    def get_arrow_type(self, pyarrow, dtype):
+        """
+        Returns Arrow type of a column of the given declared datatype. Integers are stored as 64-bit integers, as
+        batches can have values beyond the declared width (see `schemas.convert_series`); which Parquet encodes
+        compactly anyway. Categoricals are strings.
+        """
+        if dtype == schemas.CATEGORY:
+            return pyarrow.string()
+        if dtype == schemas.DATETIME:
+            return pyarrow.timestamp('ns')
+        if dtype == schemas.FLOAT:
+            return pyarrow.float32()
+        return pyarrow.int64()
+
+    def get_schema(self, pyarrow, schema):
+        """
+        Returns schema of the file, as per the declared datatypes, and the schema of the first batch for the other
+        columns (wherein columns without any values are strings). Categorical columns get 32-bit dictionary
+        indices in Parquet files, as later batches can have more categories; and are stored as plain values in
+        Feather files, as Arrow IPC files can't have different dictionaries (categories) in different batches.
+        """
+        fields = []
+        for field in schema:
+            if field.name in self.dtypes:
+                field = field.with_type(self.get_arrow_type(pyarrow=pyarrow, dtype=self.dtypes[field.name]))
+            elif pyarrow.types.is_null(field.type):
+                field = field.with_type(pyarrow.string())
+            elif pyarrow.types.is_dictionary(field.type):
+                field = field.with_type(field.type.value_type)
+            if self.file_format == 'parquet' and (pyarrow.types.is_dictionary(field.type)
+                                                   or self.dtypes.get(field.name) == schemas.CATEGORY):
+                field = field.with_type(pyarrow.dictionary(pyarrow.int32(), pyarrow.string()))
+            fields.append(field)
+        return pyarrow.schema(fields, metadata=schema.metadata)
+
+    def write(self, dataframe):
+        """ Appends the given DataFrame to the file """
+        if dataframe.empty:
+            return None
+        start = time.perf_counter()
+        if self.columns is None:
+            self.columns = list(dataframe.columns)
+        unexpected_columns = [column for column in dataframe.columns if column not in self.columns]
+        if unexpected_columns:
+            raise ValueError("Batch has columns that the file '{}' doesn't have: {}. Columns: {}".format(
+                self.filepath, unexpected_columns, self.columns))
+        dataframe = dataframe.reindex(columns=self.columns)
+        if self.file_format == 'csv':
+            dataframe.to_csv(self.filepath,
+                             mode='w' if self.num_rows == 0 else 'a',
+                             header=self.num_rows == 0,
+                             index=False,
+                             sep=',',
+                             encoding=self.encoding)
+        else:
+            pyarrow = utils.import_pyarrow()
+            table = pyarrow.Table.from_pandas(dataframe, schema=self.schema, preserve_index=False)
+            if self.writer is None:
+                self.schema = self.get_schema(pyarrow=pyarrow, schema=table.schema)
+                table = table.cast(self.schema)
+                if self.file_format == 'parquet':
+                    self.writer = pyarrow.parquet.ParquetWriter(self.filepath, schema=self.schema, compression='zstd')
+                else:
+                    # Feather (v2) files are Arrow IPC files, which can be written batch by batch
+                    options = pyarrow.ipc.IpcWriteOptions(compression='zstd')
+                    self.writer = pyarrow.ipc.new_file(self.filepath, schema=self.schema, options=options)
+            self.writer.write_table(table)
+        self.num_rows += len(dataframe)
+        metrics.record(stage='save', name=self.file_format + '_append', seconds=time.perf_counter() - start,
+                       num_rows=len(dataframe))
+        return None
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        return None
+
+
+class DatasetSink:
+    """
+    Sink of streamed batches, that appends each batch to disk as it arrives (via one BatchWriter per dataset).
+    Each batch is a dictionary wherein keys are dataset names, and values are DataFrames; or dictionaries
+    of DataFrames (eg: 'player_grouped_stats'), which are stored as one file per sub-stat (as in `pipeline.save_dataset`).
+    Parameters:
+        - file_format (str): Options: ['csv', 'parquet', 'feather']. Default: 'csv'
+        - folderpath (str): Path of folder to save the files in. Default: None (global results folder)
+    """
+
+    def __init__(self, file_format='csv', folderpath=None):
+        self.file_format = file_format
+        self.folderpath = folderpath
+        self.writers = dict()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return None
+
+    def write_dataframe(self, dataframe, name):
+        if name not in self.writers:
+            self.writers[name] = BatchWriter(name=name, file_format=self.file_format, folderpath=self.folderpath,
+                                             dtypes=get_declared_dtypes(name=name))
+        self.writers[name].write(dataframe=dataframe)
+        return None
+
+    def write(self, batch):
+        """ Appends each dataset of the given batch to its file """
+        for name, data in batch.items():
+            if isinstance(data, dict):
+                for sub_stat, sub_df in data.items():
+                    self.write_dataframe(dataframe=sub_df, name=name + f" - {sub_stat}")
+            else:
+                self.write_dataframe(dataframe=data, name=name)
+        return None
+
+    def get_num_rows(self):
+        """ Returns dictionary wherein keys are file names, and values are the number of rows written to them """
+        return {name: writer.num_rows for name, writer in self.writers.items()}
+
+    def close(self):
+        for writer in self.writers.values():
+            writer.close()
+        return None
+
+
+def get_chunks(items, chunk_size):
+    """ Splits list into consecutive chunks of (at most) the given size """
+    return [items[index:index + chunk_size] for index in range(0, len(items), chunk_size)]
+
+
+async def generate_batches_async(entity_ids, get_batch_data_async, name, batch_size=50, max_concurrency=5,
+                                 checkpoint=None):
+    """
+    Async generator that extracts and transforms the given entities (eg: player IDs) chunk by chunk, via one of the
+    batch functions of `pipeline` (eg: `pipeline.get_player_stats_batch_data_async`), and yields each chunk's
+    data as a batch of {name: data}.
+    If a Checkpoint (see `checkpoint.py`) is given, each chunk's data is checkpointed as soon as it's ready; and
+    chunks that are already in the checkpoint (eg: from a crawl that failed) are loaded from it, rather than fetched.
+    """
+    for chunk in get_chunks(items=list(entity_ids), chunk_size=batch_size):
+        data = await run_unit_async(checkpoint=checkpoint,
+                                    unit=(name, *chunk),
+                                    coroutine_function=functools.partial(get_batch_data_async, chunk,
+                                                                         max_concurrency=max_concurrency))
+        yield {name: data}
+
+
+async def generate_match_batches_async(league_season_pairs, batch_size=50, max_concurrency=5, use_processes=False,
+                                       checkpoint=None):
+    """
+    Async generator that extracts and transforms all matches played (so far) in the given (league_name, season) pairs,
+    chunk by chunk, and yields each chunk's data as a batch of {'Match players': ..., 'Match shots': ...}.
+    Each chunk is wrangled in the process pool (see `parallel.py`) if `use_processes` is True.
+    If a Checkpoint (see `checkpoint.py`) is given, the match IDs of each league season and the data of each chunk
+    are checkpointed as soon as they're ready; and the ones that are already in the checkpoint (eg: from a crawl
+    that failed) are loaded from it, rather than fetched. Usage example of a resumable crawl:
+        - checkpoint = Checkpoint(folderpath='checkpoints/matches')
+        - batches = generate_match_batches_async(league_season_pairs=[('EPL', 2020)], checkpoint=checkpoint)
+        - stream_to_files(batches=batches, file_format='parquet')
+        - checkpoint.clear()
+    """
+    for league_name, season in league_season_pairs:
+        match_ids = await run_unit_async(checkpoint=checkpoint,
+                                         unit=('match_ids', league_name, season),
+                                         coroutine_function=functools.partial(pipeline.get_played_match_ids_async,
+                                                                              league_name=league_name,
+                                                                              season=season))
+        for chunk in get_chunks(items=match_ids, chunk_size=batch_size):
+            coroutine_function = functools.partial(pipeline.get_matches_data_async,
+                                                   match_ids=chunk,
+                                                   max_concurrency=max_concurrency,
+                                                   use_processes=use_processes)
+            data_match_players, data_match_shots = await run_unit_async(checkpoint=checkpoint,
+                                                                        unit=('matches', *chunk),
+                                                                        coroutine_function=coroutine_function)
+            yield {'Match players': data_match_players, 'Match shots': data_match_shots}
+
+
+async def stream_to_sink_async(batches, sink, max_pending_batches=1):
+    """
+    Drains the given async generator of batches into the sink.
+    The next batch is extracted and transformed while the current one is being written, but at most
+    `max_pending_batches` batches are held in memory at once.
+    """
+    queue = asyncio.Queue(maxsize=max_pending_batches)
+
+    async def produce():
+        # Errors are handed over to the consumer, which raises them
+        try:
+            async for batch in batches:
+                await queue.put(batch)
+        except Exception as e:
+            await queue.put(e)
+            return None
+        await queue.put(None)
+        return None
+
+    producer = asyncio.ensure_future(produce())
+    try:
+        while True:
+            batch = await queue.get()
+            if batch is None:
+                break
+            if isinstance(batch, Exception):
+                raise batch
+            sink.write(batch=batch)
+    finally:
+        producer.cancel()
+    return sink.get_num_rows()
+
+
+def stream_to_files(batches, file_format='csv', folderpath=None, max_pending_batches=1):
+    """
+    Definition:
+        Runs a streaming crawl (extract -> transform -> sink), appending each batch to disk as it arrives,
+        so that peak memory stays constant regardless of the number of entities being processed.
+    Parameters:
+        - batches: Async generator of batches (eg: from `generate_match_batches_async`)
+        - file_format (str): Options: ['csv', 'parquet', 'feather']. Default: 'csv'
+        - folderpath (str): Path of folder to save the files in. Default: None (global results folder)
+        - max_pending_batches (int): Maximum number of batches held in memory, waiting to be written. Default: 1
+    Returns:
+        Dictionary wherein keys are file names, and values are the number of rows written to them.
+    Usage example:
+        - batches = generate_match_batches_async(league_season_pairs=[('EPL', 2019), ('EPL', 2020)])
+        - stream_to_files(batches=batches, file_format='parquet')
+    """
+    if folderpath is None:
+        utils.create_global_results_folder()
+    with DatasetSink(file_format=file_format, folderpath=folderpath) as sink:
+        dict_num_rows = get_client().run(stream_to_sink_async(batches=batches,
+                                                              sink=sink,
+                                                              max_pending_batches=max_pending_batches))
+    return dict_num_rows
@@ -1,81 +1,64 @@
+import metrics
 import json
 import pandas as pd
 
+@metrics.timed(stage='transform')
 def parse_json(json_data):
-    """ Takes in raw JSON data, and returns Python list/dictionary """
-    data = json_data.replace('\'', '\"')
-    parsed_data = json.loads(data)
-    return parsed_data
-
-
-def convert_json_to_dataframe(json_data):
     """
-    Converts raw JSON data into Pandas DataFrame.
+    Takes in raw data, and returns Python list/dictionary.
+    The raw data can either be a JSON string, or Python list/dictionary (which is returned as is).
     """
-    dataframe = pd.read_json(json_data)
-    return dataframe
+    if isinstance(json_data, (str, bytes)):
+        return json.loads(json_data)
+    return json_data
 
 
-def get_team_name_from_dict(data):
+def infer_dtypes(dataframe):
     """
     Definition:
-        Gets name of team from JSON dictionary, wherein the key is 'title'.
-        i.e; Parses the JSON; searches for key='title', and returns name of team.
-    Parameters:
-        - Takes in JSON string as input.
-    Returns:
-        Name of team (str)
+        Converts datatypes of columns, the same way `pd.read_json` does.
+        i.e; Date-like columns ['date', 'datetime'] are converted to datetimes, and columns of numeric strings
+        are converted to floats (or to integers, if all the values are whole numbers).
+        Columns that can't be converted are left as is.
     """
-    data = str(data).replace('\'', '\"')
-    data = json.loads(data)
-    team_name = data['title']
-    return team_name
+    for column in dataframe.columns.tolist():
+        series = dataframe[column]
+        if column in ['date', 'datetime']:
+            try:
+                dataframe[column] = pd.to_datetime(series)
+                continue
+            except (TypeError, ValueError, OverflowError):
+                pass
+        if series.dtype != 'object' or series.empty:
+            continue
+        try:
+            series = series.astype('float64')
+        except (TypeError, ValueError):
+            continue
+        try:
+            series_int = series.astype('int64')
+            if (series_int == series).all():
+                series = series_int
+        except (TypeError, ValueError, OverflowError):
+            pass
+        dataframe[column] = series
+    return dataframe
 
 
-def get_home_away_info(data, flag):
+@metrics.timed(stage='transform')
+def convert_json_to_dataframe(json_data):
     """
-    Definition:
-        Gets home/away info from JSON dictionary, wherein the keys are 'h' and 'a'
-    Parameters:
-        flag options are: ['H', 'A'] to get the HomeInfo and AwayInfo respectively.
-    """
-    flag = flag.strip().upper()
-    data = str(data).replace('\'', '\"')
-    data = json.loads(data)
-    home = data['h']
-    away = data['a']
-    if flag == 'H':
-        return home
-    elif flag == 'A':
-        return away
-    return None
-
-
-def get_forecast_info(data, flag):
+    Converts raw data into Pandas DataFrame.
+    The raw data can either be a JSON string, or Python list of dictionaries (which isn't re-serialized).
     """
-    Definition:
-        Gets forecast info from JSON dictionary, wherein the keys are 'w', 'l' and 'd'
-    Parameters:
-        flag options are: ['H', 'A', 'D'] to get the forcasted HomeWinPercent, AwayWinPercent
-        and DrawPercent respectively.
-    Returns:
-        Number (float) rounded off to 2 points, indicating either HomeWinPercent/AwayWinPercent/DrawPercent
-    """
-    flag = flag.strip().upper()
-    data = str(data).replace('\'', '\"')
-    data = json.loads(data)
-    home_win_percent = round(float(data['w']) * 100, 2)
-    away_win_percent = round(float(data['l']) * 100, 2)
-    draw_percent = round(float(data['d']) * 100, 2)
-    if flag == 'H':
-        return home_win_percent
-    elif flag == 'A':
-        return away_win_percent
-    elif flag == 'D':
-        return draw_percent
-    return None
+    if isinstance(json_data, (str, bytes)):
+        return pd.read_json(json_data)
+    dataframe = pd.DataFrame(data=json_data)
+    dataframe = infer_dtypes(dataframe=dataframe)
+    return dataframe
 
 
+@metrics.timed(stage='transform')
 def wrangle_list_to_dataframe(list_data):
     """
     Definition:
@@ -91,111 +74,174 @@ def wrangle_list_to_dataframe(list_data):
     return dataframe
 
 
+def flatten_dict_columns(dataframe, columns):
+    """
+    Definition:
+        Flattens columns whose values are dictionaries (eg: {'h': '2', 'a': '1'}) in one pass, into a
+        DataFrame having one column per key, named '<column>_<key>' (eg: 'goals_h', 'goals_a').
+        The values are taken as is, without any re-parsing.
+    """
+    list_flattened = [pd.DataFrame(data=dataframe[column].tolist(), index=dataframe.index).add_prefix(column + '_')
+                      for column in columns]
+    dataframe_flattened = pd.concat(objs=list_flattened, axis=1)
+    return dataframe_flattened
+
+
+def convert_to_percentages(series):
+    """ Converts Pandas Series of probabilities (eg: '0.5737') to list of percentages rounded off to 2 points (eg: 57.37) """
+    return [round(probability * 100, 2) for probability in series.astype(float).tolist()]
+
+
+@metrics.timed(stage='transform')
 def wrangle_upcoming_fixtures(dataframe):
     """
     Definition:
         Wrangle/pre-process upcoming fixtures data.
         Sorts datetime column in ascending order.
     """
+    dataframe_flattened = flatten_dict_columns(dataframe=dataframe, columns=['h', 'a'])
     dataframe_new = pd.DataFrame()
     dataframe_new['datetime'] = dataframe['datetime']
-    dataframe_new['HomeTeam'] = dataframe['h'].apply(get_team_name_from_dict)
-    dataframe_new['AwayTeam'] = dataframe['a'].apply(get_team_name_from_dict)
+    dataframe_new['HomeTeam'] = dataframe_flattened['h_title']
+    dataframe_new['AwayTeam'] = dataframe_flattened['a_title']
     dataframe_new = dataframe_new.sort_values(by='datetime', ascending=True).reset_index(drop=True)
     return dataframe_new
 
 
+@metrics.timed(stage='transform')
 def wrangle_results(dataframe):
     """
     Definition:
         Wrangle/pre-process results data.
         Sorts datetime column in ascending order.
     """
+    dataframe_flattened = flatten_dict_columns(dataframe=dataframe, columns=['h', 'a', 'goals', 'xG', 'forecast'])
     dataframe_new = pd.DataFrame()
     dataframe_new['datetime'] = dataframe['datetime']
-    dataframe_new['HomeTeam'] = dataframe['h'].apply(get_team_name_from_dict)
-    dataframe_new['AwayTeam'] = dataframe['a'].apply(get_team_name_from_dict)
-    dataframe_new['HomeGoals'] = dataframe['goals'].apply(get_home_away_info, args=['H'])
-    dataframe_new['AwayGoals'] = dataframe['goals'].apply(get_home_away_info, args=['A'])
-    dataframe_new['Home_xG'] = dataframe['xG'].apply(get_home_away_info, args=['H'])
-    dataframe_new['Away_xG'] = dataframe['xG'].apply(get_home_away_info, args=['A'])
-    dataframe_new['ForecastedHomeWinPercent'] = dataframe['forecast'].apply(get_forecast_info, args=['H'])
-    dataframe_new['ForecastedAwayWinPercent'] = dataframe['forecast'].apply(get_forecast_info, args=['A'])
-    dataframe_new['ForecastedDrawPercent'] = dataframe['forecast'].apply(get_forecast_info, args=['D'])
+    dataframe_new['HomeTeam'] = dataframe_flattened['h_title']
+    dataframe_new['AwayTeam'] = dataframe_flattened['a_title']
+    dataframe_new['HomeGoals'] = dataframe_flattened['goals_h']
+    dataframe_new['AwayGoals'] = dataframe_flattened['goals_a']
+    dataframe_new['Home_xG'] = dataframe_flattened['xG_h']
+    dataframe_new['Away_xG'] = dataframe_flattened['xG_a']
+    dataframe_new['ForecastedHomeWinPercent'] = convert_to_percentages(series=dataframe_flattened['forecast_w'])
+    dataframe_new['ForecastedAwayWinPercent'] = convert_to_percentages(series=dataframe_flattened['forecast_l'])
+    dataframe_new['ForecastedDrawPercent'] = convert_to_percentages(series=dataframe_flattened['forecast_d'])
     dataframe_new = dataframe_new.sort_values(by='datetime', ascending=True).reset_index(drop=True)
     return dataframe_new
 
 
+def get_match_players_records(dict_data):
+    """ Gets list of players' records (dictionaries) from raw match players data, home players first """
+    return [player for h_a in ['h', 'a'] for player in dict_data[h_a].values()]
+
+
+@metrics.timed(stage='transform')
 def wrangle_match_players(dict_data):
     """
     Definition:
         Wrangle/pre-process match player data i.e; players' data in particular match.
     """
-    dataframe = pd.DataFrame()
-    flag_home_away = ['h', 'a']
-    for flag_h_a in flag_home_away:
-        for h_a in list(dict_data[flag_h_a].keys()):
-            dataframe_temp = pd.DataFrame(data=dict_data[flag_h_a][h_a], index=[0])
-            dataframe = pd.concat(objs=[dataframe, dataframe_temp], ignore_index=True, sort=False)
+    dataframe = pd.DataFrame(data=get_match_players_records(dict_data=dict_data))
     return dataframe
 
 
+@metrics.timed(stage='transform')
+def wrangle_match_players_batch(dict_data_by_match):
+    """
+    Definition:
+        Wrangle/pre-process match player data of many matches at once.
+    Parameters:
+        - dict_data_by_match (dict): Dictionary wherein keys are match IDs, and values are raw match players data
+    Returns:
+        Pandas DataFrame of players' data of all the given matches (in the given order), with a 'match_id' column.
+    """
+    records, match_ids = [], []
+    for match_id, dict_data in dict_data_by_match.items():
+        records_by_match = get_match_players_records(dict_data=dict_data)
+        records.extend(records_by_match)
+        match_ids.extend([match_id] * len(records_by_match))
+    dataframe = pd.DataFrame(data=records)
+    dataframe['match_id'] = match_ids
+    return dataframe
+
+
+@metrics.timed(stage='transform')
 def wrangle_match_shots(dict_data):
     """
     Definition:
         Wrangle/pre-process match shots data i.e; players' shots-data in particular match.
     """
-    dataframe = pd.DataFrame()
-    flag_home_away = ['h', 'a']
-    for h_a in flag_home_away:
-        dataframe_temp = pd.DataFrame(data=dict_data[h_a])
-        dataframe = pd.concat(objs=[dataframe, dataframe_temp], ignore_index=True, sort=False)
-    dataframe = dataframe.sort_values(by='minute', ascending=True).reset_index(drop=True)
+    dataframe = pd.DataFrame(data=dict_data['h'] + dict_data['a'])
+    # Minutes are strings in the raw data, so they're sorted as numbers (eg: '9' comes before '10')
+    dataframe = dataframe.iloc[dataframe['minute'].astype(int).argsort(kind='mergesort')].reset_index(drop=True)
     return dataframe
 
 
-def get_max_min_avg_exploded(data, flag):
+@metrics.timed(stage='transform')
+def wrangle_match_shots_batch(dict_data_by_match):
     """
     Definition:
-        Helper function that gets data from JSON dictionary, wherein the keys are 'max', 'min' and 'avg'.
+        Wrangle/pre-process match shots data of many matches at once.
     Parameters:
-        flag options are: ['maximum', 'minimum', 'average'] to get the maximum, minimum
-        and average values respectively.
-    """
-    flag = flag.strip().lower()
-    data = str(data).replace('\'', '\"')
-    data = json.loads(data)
-    maximum = float(data['max'])
-    minimum = float(data['min'])
-    average = float(data['avg'])
-    if flag == 'maximum':
-        return maximum
-    elif flag == 'minimum':
-        return minimum
-    elif flag == 'average':
-        return average
-    return None
+        - dict_data_by_match (dict): Dictionary wherein keys are match IDs, and values are raw match shots data
+    Returns:
+        Pandas DataFrame of shots-data of all the given matches (in the given order), sorted by minute within
+        each match. The 'match_id' column comes from the shots-data itself.
+    """
+    records = []
+    for dict_data in dict_data_by_match.values():
+        records.extend(sorted(dict_data['h'] + dict_data['a'], key=lambda shot: int(shot['minute'])))
+    dataframe = pd.DataFrame(data=records)
+    return dataframe
 
 
+@metrics.timed(stage='transform')
 def wrangle_max_min_avg(dataframe):
     """
     Definition:
         Takes in Pandas DataFrame, explodes the columns which contain dictionaries
-        as values, and returns cleaned ['maximum', 'minimum', 'average'] data.
+        as values, and returns cleaned ['maximum', 'minimum', 'average'] data (as float columns).
+        Each dictionary is unpacked once, into all 3 of its columns.
     """
-    dataframe_new = pd.DataFrame()
+    dict_exploded = dict()
     columns_to_explode = dataframe.columns.tolist()
-    flags = ['maximum', 'minimum', 'average']
     if 'position' in columns_to_explode:
         columns_to_explode.remove('position')
     for column in columns_to_explode:
-        for flag in flags:
-            column_new = column + '_' + flag
-            dataframe_new[column_new] = dataframe[column].apply(get_max_min_avg_exploded, args=[flag])
+        maximums, minimums, averages = [], [], []
+        for data in dataframe[column].tolist():
+            maximums.append(float(data['max']))
+            minimums.append(float(data['min']))
+            averages.append(float(data['avg']))
+        dict_exploded[column + '_maximum'] = maximums
+        dict_exploded[column + '_minimum'] = minimums
+        dict_exploded[column + '_average'] = averages
+    dataframe_new = pd.DataFrame(data=dict_exploded, index=dataframe.index, dtype=float)
     dataframe_new['position'] = dataframe['position']
     return dataframe_new
 
 
+@metrics.timed(stage='transform')
+def wrangle_player_stats_batch(dict_data_by_player):
+    """
+    Definition:
+        Stacks raw max, min, avg stats (per position) of many players at once into one cleaned DataFrame.
+    Parameters:
+        - dict_data_by_player (dict): Dictionary wherein keys are player IDs, and values are raw player stats
+    Returns:
+        Pandas DataFrame of cleaned ['maximum', 'minimum', 'average'] data of all the given players
+        (in the given order), with a 'player_id' column.
+    """
+    records, player_ids = [], []
+    for player_id, list_data in dict_data_by_player.items():
+        records.extend(list_data)
+        player_ids.extend([player_id] * len(list_data))
+    dataframe = wrangle_max_min_avg(dataframe=pd.DataFrame(data=records))
+    dataframe['player_id'] = player_ids
+    return dataframe
+
+
 def get_shots_goals_xg(data_dict, flag):
     """
     Helper function to get 'shots', 'goals', 'xG' from dictionary
@@ -223,6 +269,7 @@ def wrangle_against_data(dataframe):
     return dataframe
 
 
+@metrics.timed(stage='transform')
 def wrangle_team_stats(dict_raw_team_stats, team_name, season):
     """
     Definition:
@@ -244,6 +291,20 @@ def wrangle_team_stats(dict_raw_team_stats, team_name, season):
 
 
 
+def get_grouped_stats_records(dict_substat):
+    """
+    Definition:
+        Gets list of records (dictionaries) from raw data of a player's grouped substat (eg: 'position'),
+        which is a dictionary of dictionaries; wherein keys are seasons, and then the substat's values (eg: 'FW').
+        Records are ordered by the substat's values (in order of appearance), and then by season.
+    """
+    substat_values = list(dict.fromkeys(value for dict_by_season in dict_substat.values() for value in dict_by_season))
+    records = [dict_substat[season][value] for value in substat_values for season in dict_substat
+               if isinstance(dict_substat[season].get(value), dict)]
+    return records
+
+
+@metrics.timed(stage='transform')
 def wrangle_player_grouped_stats(dict_player_grouped_stats):
     """
     Definition:
@@ -258,19 +319,38 @@ def wrangle_player_grouped_stats(dict_player_grouped_stats):
     
     substats_to_cleanup = ['position', 'situation', 'shotZones', 'shotTypes']
     for substat in substats_to_cleanup:
-        data_dirty = pd.DataFrame(data=dict_player_grouped_stats[substat])
-        rows, cols = data_dirty.shape
-        
-        df_by_substat_cleaned = pd.DataFrame()
-        for row in range(rows):
-            for col in range(cols):
-                data_dict = data_dirty.iloc[row].iloc[col]
-                if type(data_dict) == dict:
-                    data_by_subdict = pd.DataFrame(data=data_dict, index=[0])
-                    df_by_substat_cleaned = pd.concat(objs=[df_by_substat_cleaned, data_by_subdict],
-                                                      ignore_index=True,
-                                                      sort=False)
+        records = get_grouped_stats_records(dict_substat=dict_player_grouped_stats[substat])
+        df_by_substat_cleaned = pd.DataFrame(data=records)
         if 'season' in df_by_substat_cleaned.columns.tolist():
             df_by_substat_cleaned.sort_values(by='season', ascending=True, inplace=True)
         dictionary_player_grouped_stats[substat] = df_by_substat_cleaned
-    return dictionary_player_grouped_stats
\ No newline at end of file
+    return dictionary_player_grouped_stats
+
+
+@metrics.timed(stage='transform')
+def wrangle_player_grouped_stats_batch(dict_data_by_player):
+    """
+    Definition:
+        Takes in raw dictionaries of grouped stats of many players at once.
+    Parameters:
+        - dict_data_by_player (dict): Dictionary wherein keys are player IDs, and values are raw player grouped stats
+    Returns:
+        Cleaned dictionary; wherein keys are stats, and values are long-format DataFrames of the same for all the
+        given players (in the given order, and sorted by season within each player), with a 'player_id' column.
+    """
+    substats = ['season', 'position', 'situation', 'shotZones', 'shotTypes']
+    dictionary_player_grouped_stats = dict()
+    for substat in substats:
+        records, player_ids = [], []
+        for player_id, dict_player_grouped_stats in dict_data_by_player.items():
+            if substat == 'season':
+                records_by_player = list(dict_player_grouped_stats['season'])
+            else:
+                records_by_player = get_grouped_stats_records(dict_substat=dict_player_grouped_stats[substat])
+            records_by_player.sort(key=lambda record: record.get('season', ''))
+            records.extend(records_by_player)
+            player_ids.extend([player_id] * len(records_by_player))
+        dataframe = pd.DataFrame(data=records)
+        dataframe['player_id'] = player_ids
+        dictionary_player_grouped_stats[substat] = dataframe
+    return dictionary_player_grouped_stats
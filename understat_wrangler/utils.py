@@ -1,3 +1,4 @@
+import metrics
 import os
 import joblib
 import warnings
@@ -17,31 +18,128 @@ if use_timestamp:
 else:
     global_foldername = "results"
 
+# Encoding of CSV files
+CSV_ENCODING = 'utf-8'
+
 
 
 def create_global_results_folder():
     try:
-        os.mkdir('../{}'.format(global_foldername))
+        os.mkdir(get_global_results_folderpath())
     except FileExistsError:
         pass
     return None
 
 
-def save_data_to_csv(dataframe, name):
+def get_global_results_folderpath():
+    return "../{}".format(global_foldername)
+
+
+def save_data_to_csv(dataframe, name, folderpath=None, encoding=CSV_ENCODING):
     """
-    Saves DataFrame to Excel/CSV file (in current working directory).
+    Saves DataFrame to Excel/CSV file (in the global results folder, by default).
     Parameters:
         - dataframe (Pandas DataFrame): DataFrame to save
         - name (str): Storage name of Excel/CSV file
+        - folderpath (str): Path of folder to save the file in. Default: None (global results folder)
+        - encoding (str): Encoding of the file. Pass 'latin-1' for the encoding of files saved by earlier versions
+          (which can't encode all player names). Default: 'utf-8'
     """
-
-    dataframe.to_csv("../{}/{}.csv".format(global_foldername, name),
+    folderpath = folderpath or get_global_results_folderpath()
+    dataframe.to_csv("{}/{}.csv".format(folderpath, name),
                      index=False,
                      sep=',',
-                     encoding='latin-1')
+                     encoding=encoding)
+    return None
+
+
+def import_pyarrow():
+    """ Imports the pyarrow module, which is needed for Parquet/Feather files (and only imported for them) """
+    try:
+        import pyarrow
+        import pyarrow.feather
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Parquet/Feather files need the 'pyarrow' module. Install it via `pip install pyarrow`")
+    return pyarrow
+
+
+def save_data_to_parquet(dataframe, name, folderpath=None):
+    """
+    Saves DataFrame to Parquet file (in the global results folder, by default), with its datatypes intact.
+    The file is compressed via zstd, and is stored column-wise; so columns can be loaded selectively.
+    Parameters:
+        - dataframe (Pandas DataFrame): DataFrame to save
+        - name (str): Storage name of Parquet file
+        - folderpath (str): Path of folder to save the file in. Default: None (global results folder)
+    """
+    pyarrow = import_pyarrow()
+    folderpath = folderpath or get_global_results_folderpath()
+    table = pyarrow.Table.from_pandas(dataframe, preserve_index=False)
+    pyarrow.parquet.write_table(table, "{}/{}.parquet".format(folderpath, name), compression='zstd')
+    return None
+
+
+def save_data_to_feather(dataframe, name, folderpath=None):
+    """
+    Saves DataFrame to Feather (Arrow IPC) file (in the global results folder, by default), with its datatypes intact.
+    The file is compressed via zstd, and is stored column-wise; so columns can be loaded selectively.
+    Parameters:
+        - dataframe (Pandas DataFrame): DataFrame to save
+        - name (str): Storage name of Feather file
+        - folderpath (str): Path of folder to save the file in. Default: None (global results folder)
+    """
+    pyarrow = import_pyarrow()
+    folderpath = folderpath or get_global_results_folderpath()
+    table = pyarrow.Table.from_pandas(dataframe, preserve_index=False)
+    pyarrow.feather.write_feather(table, "{}/{}.feather".format(folderpath, name), compression='zstd')
     return None
 
 
+OUTPUT_BACKENDS = {
+    'csv': save_data_to_csv,
+    'parquet': save_data_to_parquet,
+    'feather': save_data_to_feather,
+}
+
+
+def save_data(dataframe, name, file_format='csv', folderpath=None):
+    """
+    Saves DataFrame via the output backend of the given file format.
+    Parameters:
+        - dataframe (Pandas DataFrame): DataFrame to save
+        - name (str): Storage name of file (without extension)
+        - file_format (str): Options: ['csv', 'parquet', 'feather']. Default: 'csv'
+        - folderpath (str): Path of folder to save the file in. Default: None (global results folder)
+    """
+    file_format = file_format.strip().lower()
+    if file_format not in OUTPUT_BACKENDS:
+        raise ValueError("Invalid file_format: '{}'. Options: {}".format(file_format, list(OUTPUT_BACKENDS.keys())))
+    start = time.perf_counter()
+    OUTPUT_BACKENDS[file_format](dataframe=dataframe, name=name, folderpath=folderpath)
+    filepath = "{}/{}.{}".format(folderpath or get_global_results_folderpath(), name, file_format)
+    metrics.record(stage='save', name=file_format, seconds=time.perf_counter() - start,
+                   num_bytes=os.path.getsize(filepath), num_rows=len(dataframe))
+    return None
+
+
+def load_data(filepath, columns=None, encoding=CSV_ENCODING):
+    """
+    Loads DataFrame from CSV/Parquet/Feather file (as per the file's extension).
+    Parameters:
+        - filepath (str): Path of file
+        - columns (list): Names of the columns to load. Loads all columns if None. Default: None
+          Only these columns are read from disk for Parquet/Feather files.
+        - encoding (str): Encoding of CSV files (see `save_data_to_csv`). Default: 'utf-8'
+    """
+    extension = os.path.splitext(filepath)[1].lower()
+    if extension == '.parquet':
+        return pd.read_parquet(filepath, columns=columns)
+    if extension == '.feather':
+        return pd.read_feather(filepath, columns=columns)
+    return pd.read_csv(filepath, usecols=columns, encoding=encoding)
+
+
 def pickle_load(filename):
     """ Loads data from pickle file, via joblib module """
     data_obj = joblib.load(filename=filename)
@@ -49,8 +147,21 @@ def pickle_load(filename):
 
 
 def pickle_save(data_obj, filename):
-    """ Stores data as pickle file, via joblib module """
-    joblib.dump(value=data_obj, filename=filename)
+    """
+    Stores data as pickle file, via joblib module.
+    The file is written atomically (to a temporary file that then replaces it), so that an interrupted save never
+    leaves a truncated file behind.
+    """
+    temp_filename = "{}.{}.tmp".format(filename, os.getpid())
+    try:
+        with open(temp_filename, 'wb') as file:
+            joblib.dump(value=data_obj, filename=file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_filename, filename)
+    finally:
+        if os.path.isfile(temp_filename):
+            os.remove(temp_filename)
     return None
 
 
@@ -73,6 +184,14 @@ def convert_dtypes(dataframe, columns, dtypes):
     return dataframe_altered
 
 
+def is_season_finished(season):
+    """
+    Returns True if the given season (eg: 2019 for the 2019/20 season) has finished, and False otherwise.
+    A season is considered to have finished from the 1st of July of the following year.
+    """
+    return datetime.date.today() >= datetime.date(int(season) + 1, 7, 1)
+
+
 def get_timetaken_fstring(num_seconds):
     """ Returns formatted-string of time elapsed, given the number of seconds (int) elapsed """
     if num_seconds < 60: